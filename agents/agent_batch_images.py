@@ -0,0 +1,258 @@
+import argparse
+import asyncio
+import json
+import random
+import statistics
+import time
+from collections.abc import Iterable
+from dataclasses import dataclass
+from pathlib import Path
+from typing import TYPE_CHECKING, Any
+
+from bootstrap import agent_client, load_environment, warm_up
+
+if TYPE_CHECKING:
+    from agent_framework import ChatAgent
+
+    from image_cache import ImagePreprocessor
+
+"""
+Batch image description: runs an agent over every image of a folder or manifest.
+
+Keeps up to --concurrency agent runs in flight, retries failed runs with exponential backoff and
+jitter, and appends one JSON line per image to the output file as soon as it is done. A batch that
+crashed or was stopped resumes where it left off: images with a description in the output are skipped
+and failed ones are tried again. Prints images per second and latency percentiles at the end.
+
+    python agent_batch_images.py photos/ --output descriptions.jsonl --concurrency 16
+    python agent_batch_images.py manifest.txt
+
+A manifest lists one local path or http(s) URL per line, or JSON lines with an "image" field. Paths are
+relative to the manifest.
+"""
+
+IMAGE_EXTENSIONS = {".jpg", ".jpeg", ".png", ".webp", ".gif", ".bmp", ".tif", ".tiff"}
+PROMPT = "Describe this image in two or three sentences."
+INSTRUCTIONS = "You are a helpful assistant that can analyze images and describe what you see."
+
+
+@dataclass
+class BatchStats:
+    """Outcome of one BatchImageRunner.run call."""
+
+    images: int
+    succeeded: int
+    failed: int
+    # Already described in the output file by an earlier run
+    skipped: int
+    retries: int
+    seconds: float
+    images_per_second: float
+    # Seconds per image from its start to its result, retries and backoff included
+    p50: float
+    p95: float
+    p99: float
+
+
+def list_images(source: str | Path) -> list[str]:
+    """Return the images of a folder, searched recursively, or of a manifest file."""
+    source = Path(source)
+    if source.is_dir():
+        return sorted(str(path) for path in source.rglob("*") if path.suffix.lower() in IMAGE_EXTENSIONS)
+    images = []
+    for line in source.read_text(encoding="utf-8").splitlines():
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        image = json.loads(line)["image"] if line.startswith("{") else line
+        if not image.startswith(("http://", "https://")):
+            image = str(source.parent / image)
+        images.append(image)
+    return images
+
+
+def described_images(output: Path) -> set[str]:
+    """Return the images with a description in an output file, ignoring a line cut short by a crash."""
+    done: set[str] = set()
+    if not output.exists():
+        return done
+    with open(output, encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            if "description" in record:
+                done.add(record["image"])
+    return done
+
+
+def _ends_mid_line(path: Path) -> bool:
+    if path.stat().st_size == 0:
+        return False
+    with open(path, "rb") as f:
+        f.seek(-1, 2)
+        return f.read(1) != b"\n"
+
+
+class BatchImageRunner:
+    """Describes many images with one agent, with bounded concurrency, retries and a resumable output."""
+
+    def __init__(
+        self,
+        agent: "ChatAgent",
+        prompt: str = PROMPT,
+        concurrency: int = 8,
+        max_attempts: int = 4,
+        backoff: float = 1.0,
+        max_backoff: float = 30.0,
+        timeout: float | None = 120.0,
+        preprocessor: "ImagePreprocessor | None" = None,
+    ) -> None:
+        """Initialize the runner.
+
+        Args:
+            agent: The agent describing the images. Every image gets a new thread.
+            prompt: The text sent along with every image.
+            concurrency: Agent runs in flight at once.
+            max_attempts: Runs per image before it is recorded as failed.
+            backoff: Upper bound in seconds of the random delay before the first retry. It doubles with
+                    every further retry, up to max_backoff.
+            max_backoff: Upper bound in seconds of any retry delay.
+            timeout: Seconds an attempt may take before it is cancelled and counted as failed. None waits.
+            preprocessor: Turns an image path or URL into message content. Defaults to an ImagePreprocessor,
+                         so images are downscaled and cached before they are sent.
+        """
+        if preprocessor is None:
+            from image_cache import ImagePreprocessor
+
+            preprocessor = ImagePreprocessor()
+        self.agent = agent
+        self.prompt = prompt
+        self.concurrency = concurrency
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.timeout = timeout
+        self.preprocessor = preprocessor
+        self.retries = 0
+
+    async def run(self, images: Iterable[str], output: str | Path) -> BatchStats:
+        """Describe every image not described in output yet, appending one JSON line per image to it."""
+        output = Path(output)
+        done = described_images(output)
+        images = list(images)
+        pending = [image for image in images if image not in done]
+        latencies: list[float] = []
+        failed = 0
+        self.retries = 0
+        semaphore = asyncio.Semaphore(self.concurrency)
+        tasks: set[asyncio.Task[None]] = set()
+        start = time.perf_counter()
+
+        with open(output, "a", encoding="utf-8") as f:
+            if _ends_mid_line(output):
+                # Left by a crash in the middle of a write. The next record starts a line of its own.
+                f.write("\n")
+
+            async def process(image: str) -> None:
+                nonlocal failed
+                try:
+                    record = await self._describe(image)
+                    # One write per line and a flush, so a crash loses at most the line being written
+                    f.write(json.dumps(record) + "\n")
+                    f.flush()
+                    if "description" in record:
+                        latencies.append(record["seconds"])
+                    else:
+                        failed += 1
+                finally:
+                    semaphore.release()
+
+            try:
+                for image in pending:
+                    # Taken before the task is made, so a huge batch does not create all its tasks up front
+                    await semaphore.acquire()
+                    task = asyncio.create_task(process(image))
+                    tasks.add(task)
+                    task.add_done_callback(tasks.discard)
+                await asyncio.gather(*tasks)
+            finally:
+                for task in tasks:
+                    task.cancel()
+
+        seconds = time.perf_counter() - start
+        if len(latencies) > 1:
+            quantiles = statistics.quantiles(latencies, n=100)
+        else:
+            quantiles = (latencies or [0.0]) * 99
+        return BatchStats(
+            images=len(images),
+            succeeded=len(latencies),
+            failed=failed,
+            skipped=len(images) - len(pending),
+            retries=self.retries,
+            seconds=seconds,
+            images_per_second=len(pending) / seconds if seconds else 0.0,
+            p50=quantiles[49],
+            p95=quantiles[94],
+            p99=quantiles[98],
+        )
+
+    async def _describe(self, image: str) -> dict[str, Any]:
+        from agent_framework import ChatMessage, Role, TextContent
+
+        start = time.perf_counter()
+        try:
+            content = await self.preprocessor.prepare(image)
+        except Exception as ex:
+            # A missing or unreadable file fails the same way every time, so it is not retried
+            return {"image": image, "error": repr(ex), "attempts": 0}
+        message = ChatMessage(role=Role.USER, contents=[TextContent(text=self.prompt), content])
+
+        attempt = 0
+        while True:
+            attempt += 1
+            try:
+                async with asyncio.timeout(self.timeout):
+                    result = await self.agent.run(message)
+                return {
+                    "image": image,
+                    "description": result.text,
+                    "attempts": attempt,
+                    "seconds": time.perf_counter() - start,
+                }
+            except Exception as ex:
+                if attempt >= self.max_attempts:
+                    return {"image": image, "error": repr(ex), "attempts": attempt}
+            self.retries += 1
+            # Full jitter, so images failing together, on a rate limit for example, do not retry together
+            await asyncio.sleep(random.uniform(0, min(self.max_backoff, self.backoff * 2 ** (attempt - 1))))
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Describe every image of a folder or manifest.")
+    parser.add_argument("source", help="folder of images, or manifest file")
+    parser.add_argument("--output", default="descriptions.jsonl", help="JSON lines file, appended to and resumed")
+    parser.add_argument("--concurrency", type=int, default=8, help="agent runs in flight at once")
+    parser.add_argument("--attempts", type=int, default=4, help="runs per image before giving up on it")
+    parser.add_argument("--prompt", default=PROMPT)
+    args = parser.parse_args()
+
+    load_environment()
+    await warm_up()
+    from agent_framework import ChatAgent
+
+    images = list_images(args.source)
+    print(f"{len(images)} images, {args.concurrency} at a time, writing to {args.output}")
+    async with ChatAgent(chat_client=agent_client(), instructions=INSTRUCTIONS) as agent:
+        runner = BatchImageRunner(agent, prompt=args.prompt, concurrency=args.concurrency, max_attempts=args.attempts)
+        stats = await runner.run(images, args.output)
+    print(
+        f"{stats.succeeded} described, {stats.failed} failed, {stats.skipped} skipped, {stats.retries} retries "
+        f"in {stats.seconds:.1f}s: {stats.images_per_second:.2f} images/s, "
+        f"p50={stats.p50:.2f}s p95={stats.p95:.2f}s p99={stats.p99:.2f}s"
+    )
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,369 @@
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import time
+from collections.abc import AsyncIterable, Callable, MutableSequence
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any
+
+from agent_framework import ChatMessage, ChatOptions, ChatResponseUpdate
+from agent_framework.azure import AzureAIAgentClient
+from azure.ai.agents.models import Agent
+from azure.core.exceptions import ResourceNotFoundError
+
+from credential_cache import _file_lock
+
+"""
+Cache of server-side agent definitions, so identical agents are created once and reused across restarts.
+
+AzureAIAgentClient creates a new agent in the Azure AI project on the first run of every client, and
+deletes it on close, which adds a create call before the first message of every process and workflow
+build. CachedAgentClient looks the definition up first: a hash of the fields the agent is created from
+(model, name, instructions, tools, tool resources and response format) maps to the id of an agent
+created earlier, in a JSON file shared by all processes of the user. Only a miss creates an agent, and
+the agent is kept when the client closes. Entries unused for max_age seconds are stale: a background
+task deletes their agents, and an agent found deleted on the service is created again.
+
+An entry keeps the agent's instructions, tools and tool resources, so a hit gives the client the same
+definition a create would have, hosted tools and their files included, without fetching it. The file is
+read and written under its lock on a worker thread, never on the event loop.
+"""
+
+DEFAULT_CACHE_PATH = Path.home() / ".cache" / "agent-samples" / "agent_definitions.json"
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class AgentDefinitionStats:
+    """Counters of an AgentDefinitionCache."""
+
+    hits: int
+    misses: int
+    # Cached agents found deleted on the service, created again
+    invalidated: int
+    # Stale agents deleted by the background cleanup
+    deleted: int
+    entries: int
+
+
+class AgentDefinitionCache:
+    """Agent ids by definition hash, in memory and in a file shared across processes."""
+
+    def __init__(
+        self,
+        cache_path: str | Path | None = DEFAULT_CACHE_PATH,
+        max_age: float = 7 * 24 * 3600,
+        cleanup_interval: float = 3600,
+    ) -> None:
+        """Initialize the cache.
+
+        Args:
+            cache_path: JSON file shared across processes. None keeps ids in memory only, for this process.
+            max_age: Seconds an agent may go unused before the cleanup deletes it.
+            cleanup_interval: Seconds between two cleanups of the same endpoint, across processes.
+        """
+        self.cache_path = Path(cache_path) if cache_path is not None else None
+        self.max_age = max_age
+        self.cleanup_interval = cleanup_interval
+        self.hits = 0
+        self.misses = 0
+        self.invalidated = 0
+        self.deleted = 0
+        # Entries seen by this process, so most lookups skip the file
+        self._entries: dict[str, dict[str, Any]] = {}
+        # Used instead of the file when there is none
+        self._data: dict[str, Any] = {"agents": {}, "cleanups": {}}
+        self._locks: dict[str, asyncio.Lock] = {}
+        self._cleanups: dict[str, asyncio.Task[int]] = {}
+        # Endpoint -> when this process last looked at its cleanup time in the file
+        self._cleanup_checked: dict[str, float] = {}
+
+    @staticmethod
+    def definition_key(endpoint: str, agent_args: dict[str, Any]) -> str:
+        """Return the hash of an agent definition in a project.
+
+        Args:
+            endpoint: The project endpoint, since agent ids are only valid in their project.
+            agent_args: The arguments the agent is created with.
+        """
+        canonical = json.dumps(
+            {"endpoint": endpoint, **{name: _as_json(value) for name, value in agent_args.items()}},
+            sort_keys=True,
+            default=str,
+        )
+        return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+    def lock(self, key: str) -> asyncio.Lock:
+        """Return the lock of a definition, so clients of this process create each agent once."""
+        return self._locks.setdefault(key, asyncio.Lock())
+
+    async def lookup(self, key: str) -> dict[str, Any] | None:
+        """Return the entry of a definition and mark it used, or None."""
+        entry = self._entries.get(key)
+        # Touching the file on every hit would make processes queue on its lock, now and then is enough
+        if entry is None or time.time() - entry["last_used"] > min(3600, self.max_age / 4):
+            entry = await self._update(lambda data: _touch(data["agents"], key))
+        if entry is None:
+            self._entries.pop(key, None)
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._entries[key] = entry
+        return entry
+
+    async def store(self, key: str, agent_id: str, endpoint: str, agent_args: dict[str, Any]) -> str:
+        """Record the agent created for a definition and return the agent id to use.
+
+        If another process stored an agent for the same definition meanwhile, its id is returned.
+
+        Args:
+            key: The definition hash.
+            agent_id: The id of the agent created for it.
+            endpoint: The project endpoint.
+            agent_args: The arguments the agent was created with. Its instructions, tools and tool resources
+                       are kept, to give the definition back on hits.
+        """
+        new_entry = {
+            "agent_id": agent_id,
+            "endpoint": endpoint,
+            "instructions": agent_args.get("instructions"),
+            "tools": _as_json(agent_args.get("tools") or []),
+            "tool_resources": _as_json(agent_args.get("tool_resources")),
+        }
+
+        def add(data: dict[str, Any]) -> dict[str, Any]:
+            entry = data["agents"].setdefault(key, new_entry)
+            entry["last_used"] = time.time()
+            return entry
+
+        entry = self._entries[key] = await self._update(add)
+        return entry["agent_id"]
+
+    async def invalidate(self, key: str, agent_id: str) -> None:
+        """Forget a definition whose agent is gone, unless it has been replaced already."""
+
+        def remove(data: dict[str, Any]) -> None:
+            if data["agents"].get(key, {}).get("agent_id") == agent_id:
+                del data["agents"][key]
+
+        self.invalidated += 1
+        if self._entries.get(key, {}).get("agent_id") == agent_id:
+            del self._entries[key]
+        await self._update(remove)
+
+    async def start_cleanup(self, agents_client: Any, endpoint: str) -> None:
+        """Delete the stale agents of endpoint in the background, at most once per cleanup_interval."""
+        task = self._cleanups.get(endpoint)
+        if task is not None and not task.done():
+            return
+        if time.time() - self._cleanup_checked.get(endpoint, 0) < self.cleanup_interval:
+            # Checked the file recently, no need to take its lock on every agent start
+            return
+        self._cleanup_checked[endpoint] = time.time()
+        last = await self._update(lambda data: data["cleanups"].get(endpoint, 0))
+        if time.time() - last < self.cleanup_interval:
+            return
+        task = self._cleanups[endpoint] = asyncio.create_task(self.cleanup(agents_client, endpoint))
+
+        def done(task: asyncio.Task[int]) -> None:
+            if not task.cancelled() and task.exception() is not None:
+                logger.warning("Agent definition cleanup failed: %s", task.exception())
+
+        task.add_done_callback(done)
+
+    async def cleanup(self, agents_client: Any, endpoint: str) -> int:
+        """Delete the agents of endpoint unused for max_age seconds and drop their entries.
+
+        Args:
+            agents_client: The project client's agents client.
+            endpoint: The project endpoint.
+
+        Returns:
+            The number of agents deleted.
+        """
+
+        def claim(data: dict[str, Any]) -> list[str]:
+            # Entries are dropped before their agents are deleted, so a lookup meanwhile creates a new agent
+            # rather than getting one that is about to go. Recording the time keeps other processes from
+            # starting the same cleanup.
+            data["cleanups"][endpoint] = time.time()
+            cutoff = time.time() - self.max_age
+            stale = [
+                key
+                for key, entry in data["agents"].items()
+                if entry["endpoint"] == endpoint and entry["last_used"] < cutoff
+            ]
+            return [data["agents"].pop(key)["agent_id"] for key in stale]
+
+        stale = await self._update(claim)
+        deleted = 0
+        for agent_id in stale:
+            try:
+                await agents_client.delete_agent(agent_id)
+                deleted += 1
+            except ResourceNotFoundError:
+                pass
+        self._entries = {key: entry for key, entry in self._entries.items() if entry["agent_id"] not in stale}
+        self.deleted += deleted
+        return deleted
+
+    async def _update(self, change: Callable[[dict[str, Any]], Any]) -> Any:
+        """Apply change to the cache data, under the file lock and saved when there is a file, and return its result.
+
+        The file is read and written on a worker thread, where change runs too.
+        """
+        if self.cache_path is None:
+            return change(self._data)
+        return await asyncio.to_thread(self._update_file, change)
+
+    def _update_file(self, change: Callable[[dict[str, Any]], Any]) -> Any:
+        with _file_lock(self.cache_path):
+            try:
+                with open(self.cache_path, encoding="utf-8") as f:
+                    data = json.load(f)
+            except (FileNotFoundError, json.JSONDecodeError):
+                data = {}
+            data.setdefault("agents", {})
+            data.setdefault("cleanups", {})
+            before = json.dumps(data, sort_keys=True)
+            result = change(data)
+            if json.dumps(data, sort_keys=True) != before:
+                # Write a new file and swap it in, so a crash never leaves half a cache behind
+                temp_path = self.cache_path.with_name(f"{self.cache_path.name}.tmp")
+                with open(temp_path, "w", encoding="utf-8") as f:
+                    json.dump(data, f)
+                os.replace(temp_path, self.cache_path)
+        return result
+
+    def stats(self) -> AgentDefinitionStats:
+        """Return the current counters."""
+        return AgentDefinitionStats(
+            hits=self.hits,
+            misses=self.misses,
+            invalidated=self.invalidated,
+            deleted=self.deleted,
+            entries=len(self._entries),
+        )
+
+
+def _as_json(value: Any) -> Any:
+    """Turn SDK models like tool definitions into plain JSON values, for hashing."""
+    if hasattr(value, "as_dict"):
+        return value.as_dict()
+    if isinstance(value, (list, tuple)):
+        return [_as_json(item) for item in value]
+    if isinstance(value, dict):
+        return {name: _as_json(item) for name, item in value.items()}
+    return value
+
+
+def _touch(entries: dict[str, dict[str, Any]], key: str) -> dict[str, Any] | None:
+    entry = entries.get(key)
+    if entry is not None:
+        entry["last_used"] = time.time()
+    return entry
+
+
+class CachedAgentClient(AzureAIAgentClient):
+    """AzureAIAgentClient reusing the agent of an AgentDefinitionCache entry instead of creating one.
+
+    Agents it creates are recorded in the cache and not deleted on close. The cache's cleanup deletes them
+    once unused for its max_age.
+    """
+
+    def __init__(self, *, definition_cache: AgentDefinitionCache, endpoint: str, **kwargs: Any) -> None:
+        """Initialize the client.
+
+        Args:
+            definition_cache: The cache to look definitions up in.
+            endpoint: The endpoint of the project client, part of every definition.
+            **kwargs: Passed to AzureAIAgentClient.
+        """
+        super().__init__(**kwargs)
+        self.definition_cache = definition_cache
+        self.endpoint = endpoint
+        # Definition the current agent_id came from, if it came from the cache
+        self._cached_key: str | None = None
+
+    def _agent_args(self, run_options: dict[str, Any]) -> dict[str, Any]:
+        """Return the arguments AzureAIAgentClient creates the agent of these run options with."""
+        args: dict[str, Any] = {"model": run_options.get("model"), "name": self.agent_name or "UnnamedAgent"}
+        for name in ("tools", "tool_resources", "instructions", "response_format"):
+            if name in run_options:
+                args[name] = run_options[name]
+        return args
+
+    async def _get_agent_id_or_create(self, run_options: dict[str, Any] | None = None) -> str:
+        if self.agent_id is not None:
+            return self.agent_id
+        run_options = run_options or {}
+        args = self._agent_args(run_options)
+        key = self.definition_cache.definition_key(self.endpoint, args)
+        async with self.definition_cache.lock(key):
+            entry = await self.definition_cache.lookup(key)
+            if entry is not None:
+                self.agent_id = entry["agent_id"]
+                self._cached_key = key
+                # What a create would have returned, so the next run does not fetch it. Runs add the hosted
+                # tools and tool resources of the definition, so they must be there too. Entries written
+                # before they were kept leave it to the client to fetch the definition.
+                self._agent_definition = (
+                    Agent(
+                        id=self.agent_id,
+                        model=args["model"],
+                        name=args["name"],
+                        instructions=entry["instructions"],
+                        tools=entry["tools"],
+                        tool_resources=entry["tool_resources"],
+                    )
+                    if "tools" in entry
+                    else None
+                )
+            else:
+                created_id = await super()._get_agent_id_or_create(run_options)
+                self.agent_id = await self.definition_cache.store(key, created_id, self.endpoint, args)
+                # Kept for later runs and processes. The cache's cleanup deletes it once unused.
+                self._should_delete_agent = False
+                if self.agent_id != created_id:
+                    # Another process created the same agent first
+                    await self.project_client.agents.delete_agent(created_id)
+                    self._agent_definition = None
+        await self.definition_cache.start_cleanup(self.project_client.agents, self.endpoint)
+        return self.agent_id
+
+    async def _inner_get_streaming_response(
+        self,
+        *,
+        messages: MutableSequence[ChatMessage],
+        chat_options: ChatOptions,
+        **kwargs: Any,
+    ) -> AsyncIterable[ChatResponseUpdate]:
+        started = False
+        try:
+            async for update in super()._inner_get_streaming_response(
+                messages=messages, chat_options=chat_options, **kwargs
+            ):
+                started = True
+                yield update
+            return
+        except ResourceNotFoundError:
+            if started or self._cached_key is None or not await self._cached_agent_deleted():
+                raise
+        # The cached agent was deleted on the service, so create it again and retry
+        await self.definition_cache.invalidate(self._cached_key, self.agent_id)
+        self.agent_id, self._agent_definition, self._cached_key = None, None, None
+        async for update in super()._inner_get_streaming_response(
+            messages=messages, chat_options=chat_options, **kwargs
+        ):
+            yield update
+
+    async def _cached_agent_deleted(self) -> bool:
+        try:
+            await self.project_client.agents.get_agent(self.agent_id)
+        except ResourceNotFoundError:
+            return True
+        return False
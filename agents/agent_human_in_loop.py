@@ -1,19 +1,14 @@
 import asyncio
 from agent_framework import ChatAgent
-from agent_framework.azure import AzureAIAgentClient
-from azure.identity.aio import AzureCliCredential
-from azure.ai.projects.aio import AIProjectClient
-import os
-from pathlib import Path
-from dotenv import load_dotenv
 from typing import Annotated
 from agent_framework import ai_function
-from agent_framework import ChatMessage, Role
+import uuid
+from agent_framework import FunctionApprovalRequestContent
+from approval_policy import ApprovalPolicy, ApprovalPolicyMiddleware, run_with_approvals
+from bootstrap import agent_client, load_environment
+from tool_cache import ToolResultCache
 
-# Load .env file from the parent directory
-script_dir = Path(__file__).parent
-load_dotenv(script_dir.parent / "maf.env")
-print(f"Using endpoint: {os.environ['AZURE_AI_PROJECT_ENDPOINT']}")
+load_environment()
 
 @ai_function(approval_mode="always_require")
 def get_weather_detail(location: Annotated[str, "The city and state, e.g. San Francisco, CA"]) -> str:
@@ -25,62 +20,52 @@ def get_weather(location: Annotated[str, "The city and state, e.g. San Francisco
     """Get the current weather for a given location."""
     return f"The weather in {location} is cloudy with a high of 15°C."
 
+# Weather lookups are reused for 10 minutes. get_weather_detail requires approval, so it is never cached.
+tool_cache = ToolResultCache(ttls={"get_weather": 600})
+# Remembers "always" and "never" answers, so repeated calls skip the prompt and the extra agent run
+approval_policy = ApprovalPolicy(default_ttl=3600)
+
+async def ask_user(request: FunctionApprovalRequestContent) -> bool:
+    """Ask the user about one approval request, remembering "always" and "never" for this session."""
+    call = request.function_call
+    print(f"Approval needed for: {call.name}")
+    print(f"Arguments: {call.arguments}")
+    answer = (await asyncio.to_thread(input, "Do you approve this request? (yes/no/always/never): ")).strip().lower()
+    if answer in ("always", "never"):
+        approval_policy.remember(call.name, call.parse_arguments(), approved=answer == "always")
+    return answer in ("yes", "always")
+
 async def main():
-    async with AzureCliCredential() as credential:
-        # Create the project client from the endpoint
-        project_client = AIProjectClient(
-            endpoint=os.environ["AZURE_AI_PROJECT_ENDPOINT"],
-            credential=credential
-        )
+    # Create the agent with the process's shared client
+    async with ChatAgent(
+        chat_client=agent_client(),
+        instructions="You are a weather assistant that provides weather information to users.",
+        tools=[get_weather, get_weather_detail],
+        middleware=[tool_cache, ApprovalPolicyMiddleware(approval_policy)],
+    ) as agent:
+        thread = agent.get_new_thread()
+        session_id = str(uuid.uuid4())
+        
+        print("Chat started! Type 'end' to exit.\n")
         
-        # Create the agent with the project client
-        async with ChatAgent(
-            chat_client=AzureAIAgentClient(
-                project_client=project_client, 
-                model_deployment_name=os.environ["AZURE_AI_MODEL_DEPLOYMENT_NAME"],
-                async_credential=credential
-            ),
-            instructions="You are a weather assistant that provides weather information to users.",
-            tools=[get_weather, get_weather_detail]
-        ) as agent:
-            thread = agent.get_new_thread()
+        while True:
+            user_input = await asyncio.to_thread(input, "You: ")
             
-            print("Chat started! Type 'end' to exit.\n")
+            if user_input.lower() == "end":
+                print(f"Tool cache: {tool_cache.stats()}")
+                print(f"Approvals: {approval_policy.stats()}")
+                print("Goodbye!")
+                break
+            
+            if not user_input.strip():
+                continue
+            
+            # Remembered approvals run inside this turn. Other requests are answered by the policy
+            # or the user, and sent back with a second run.
+            with approval_policy.session(session_id):
+                result = await run_with_approvals(agent, user_input, thread, approval_policy, ask_user)
+            print(f"Assistant: {result.text}\n")
             
-            while True:
-                user_input = input("You: ")
-                
-                if user_input.lower() == "end":
-                    print("Goodbye!")
-                    break
-                
-                if not user_input.strip():
-                    continue
-                
-                result = await agent.run(user_input, thread=thread)
-
-                if not result.user_input_requests:
-                    # No more approvals needed, return the final result
-                    print(f"Assistant: {result.text}\n")
-                else:
-                    new_inputs = [user_input]
-                    for user_input_needed in result.user_input_requests:
-                        print(f"Approval needed for: {user_input_needed.function_call.name}")
-                        print(f"Arguments: {user_input_needed.function_call.arguments}")
-
-                        # Add the assistant message with the approval request
-                        new_inputs.append(ChatMessage(role=Role.ASSISTANT, contents=[user_input_needed]))
-
-                        # Get user approval
-                        user_approval = input("Do you approve this request? (yes/no): ").strip().lower() == "yes"
-
-                        # Add the user's approval response
-                        new_inputs.append(
-                            ChatMessage(role=Role.USER, contents=[user_input_needed.create_response(user_approval)])
-                        )
-
-                    final_result = await agent.run(new_inputs, thread=thread)
-                    print(final_result.text)
-                
 
-asyncio.run(main())
\ No newline at end of file
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -1,71 +1,55 @@
 import asyncio
-from collections.abc import Awaitable
-from typing import Callable
 from agent_framework import ChatAgent
-from agent_framework.azure import AzureAIAgentClient
-from azure.identity.aio import AzureCliCredential
-from azure.ai.projects.aio import AIProjectClient
-import os
-from pathlib import Path
-from dotenv import load_dotenv
 from agent_framework import AgentRunContext
-from agent_framework import FunctionInvocationContext
+from bootstrap import agent_client, load_environment
+from tool_executor import ToolExecutor
+from tool_metrics import ToolMetrics
 
-# Load .env file from the parent directory
-script_dir = Path(__file__).parent
-load_dotenv(script_dir.parent / "maf.env")
-print(f"Using endpoint: {os.environ['AZURE_AI_PROJECT_ENDPOINT']}")
+load_environment()
 
 def get_time():
     """Get the current time."""
     from datetime import datetime
     return datetime.now().strftime("%H:%M:%S")
 
-async def logging_agent_middleware(
-    context: FunctionInvocationContext,
-    next: Callable[[FunctionInvocationContext], Awaitable[None]],
-) -> None:
-    """Middleware that logs function calls."""
-    print(f"Calling function: {context.function.name}")
-
-    await next(context)
-
-    print(f"Function result: {context.result}")
+# Records call counts, errors and latency histograms per tool instead of printing every call
+tool_metrics = ToolMetrics()
+# Runs sync tools like get_time on worker threads, so calls in one response overlap.
+tool_executor = ToolExecutor(max_workers=8)
 
 async def main():
-    async with AzureCliCredential() as credential:
-        # Create the project client from the endpoint
-        project_client = AIProjectClient(
-            endpoint=os.environ["AZURE_AI_PROJECT_ENDPOINT"],
-            credential=credential
-        )
+    # Create the agent with the process's shared client
+    async with ChatAgent(
+        chat_client=agent_client(),
+        instructions="You are a helpful assistant that can analyze images and describe what you see.",
+        tools=[get_time],
+        middleware=[tool_metrics, tool_executor],
+    ) as agent:
+        thread = agent.get_new_thread()
+        
+        print("Chat started! Type 'end' to exit.\n")
         
-        # Create the agent with the project client
-        async with ChatAgent(
-            chat_client=AzureAIAgentClient(
-                project_client=project_client, 
-                model_deployment_name=os.environ["AZURE_AI_MODEL_DEPLOYMENT_NAME"],
-                async_credential=credential,
-            ),
-            instructions="You are a helpful assistant that can analyze images and describe what you see.",
-            tools=[get_time],
-            middleware=[logging_agent_middleware],
-        ) as agent:
-            thread = agent.get_new_thread()
+        while True:
+            # Read input off the event loop so it keeps serving the agent while the user types
+            user_input = await asyncio.to_thread(input, "You: ")
             
-            print("Chat started! Type 'end' to exit.\n")
+            if user_input.lower() == "end":
+                for name, stats in tool_metrics.snapshot().items():
+                    print(
+                        f"{name}: {stats.calls} calls, {stats.errors} errors, "
+                        f"p50={stats.p50 * 1000:.2f}ms p99={stats.p99 * 1000:.2f}ms"
+                    )
+                print("Goodbye!")
+                break
             
-            while True:
-                user_input = input("You: ")
-                
-                if user_input.lower() == "end":
-                    print("Goodbye!")
-                    break
-                
-                if not user_input.strip():
-                    continue
+            if not user_input.strip():
+                continue
 
-                result = await agent.run(user_input, thread=thread)
-                print(f"Assistant: {result.text}\n")
+            # Print the reply as it is generated instead of waiting for the full text
+            print("Assistant: ", end="", flush=True)
+            async for update in agent.run_stream(user_input, thread=thread):
+                print(update.text, end="", flush=True)
+            print("\n")
 
-asyncio.run(main())
\ No newline at end of file
+if __name__ == "__main__":
+    asyncio.run(main())
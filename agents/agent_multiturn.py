@@ -1,49 +1,40 @@
 import asyncio
-from agent_framework import ChatAgent
-from agent_framework.azure import AzureAIAgentClient
-from azure.identity.aio import AzureCliCredential
-from azure.ai.projects.aio import AIProjectClient
-import os
-from pathlib import Path
-from dotenv import load_dotenv
+from bootstrap import agent_client, load_environment, warm_up
 
-# Load .env file from the parent directory
-script_dir = Path(__file__).parent
-load_dotenv(script_dir.parent / "maf.env")
-print(f"Using endpoint: {os.environ['AZURE_AI_PROJECT_ENDPOINT']}")
+load_environment()
 
 async def main():
-    async with AzureCliCredential() as credential:
-        # Create the project client from the endpoint
-        project_client = AIProjectClient(
-            endpoint=os.environ["AZURE_AI_PROJECT_ENDPOINT"],
-            credential=credential
-        )
+    # Imports the SDK on a thread while the first token is fetched
+    await warm_up()
+    from agent_framework import ChatAgent
+
+    # Create the agent with the process's shared client
+    async with ChatAgent(
+        chat_client=agent_client(),
+        instructions="You are a helpful assistant that can analyze images and describe what you see.",
+        # No chat_message_store_factory: the agent service keeps the history in its thread, and a thread
+        # cannot have both. TokenBudgetChatMessageStore is for clients that keep the history locally.
+    ) as agent:
+        thread = agent.get_new_thread()
+        
+        print("Chat started! Type 'end' to exit.\n")
         
-        # Create the agent with the project client
-        async with ChatAgent(
-            chat_client=AzureAIAgentClient(
-                project_client=project_client, 
-                model_deployment_name=os.environ["AZURE_AI_MODEL_DEPLOYMENT_NAME"],
-                async_credential=credential
-            ),
-            instructions="You are a helpful assistant that can analyze images and describe what you see."
-        ) as agent:
-            thread = agent.get_new_thread()
+        while True:
+            # Read input off the event loop so it keeps serving the agent while the user types
+            user_input = await asyncio.to_thread(input, "You: ")
+            
+            if user_input.lower() == "end":
+                print("Goodbye!")
+                break
             
-            print("Chat started! Type 'end' to exit.\n")
+            if not user_input.strip():
+                continue
             
-            while True:
-                user_input = input("You: ")
-                
-                if user_input.lower() == "end":
-                    print("Goodbye!")
-                    break
-                
-                if not user_input.strip():
-                    continue
-                
-                result = await agent.run(user_input, thread=thread)
-                print(f"Assistant: {result.text}\n")
+            # Print the reply as it is generated instead of waiting for the full text
+            print("Assistant: ", end="", flush=True)
+            async for update in agent.run_stream(user_input, thread=thread):
+                print(update.text, end="", flush=True)
+            print("\n")
 
-asyncio.run(main())
\ No newline at end of file
+if __name__ == "__main__":
+    asyncio.run(main())
\ No newline at end of file
@@ -1,56 +1,49 @@
 import asyncio
 from agent_framework import ChatAgent
-from agent_framework.azure import AzureAIAgentClient
-from azure.identity.aio import AzureCliCredential
-from azure.ai.projects.aio import AIProjectClient
 import os
-from pathlib import Path
-from dotenv import load_dotenv
-from agent_framework.observability import setup_observability
+from bootstrap import agent_client, load_environment
+from trace_sampling import setup_sampled_observability
 
-# Load .env file from the parent directory
-script_dir = Path(__file__).parent
-load_dotenv(script_dir.parent / "maf.env")
-print(f"Using endpoint: {os.environ['AZURE_AI_PROJECT_ENDPOINT']}")
+load_environment()
 
-# Setup observability - export traces and metrics to Application Insights
-setup_observability(
+# Setup observability - export traces and metrics to Application Insights.
+# Exports every failed or slow turn and one in ten of the others, with prompts and completions cut to
+# a few KB, in batches of up to 512 spans every 10 seconds.
+setup_sampled_observability(
     enable_sensitive_data=True,
-    applicationinsights_connection_string=os.environ["APP_INSIGHT_INSTRUMENTATION_KEY"]
+    applicationinsights_connection_string=os.environ["APP_INSIGHT_INSTRUMENTATION_KEY"],
+    keep_ratio=float(os.environ.get("TRACE_KEEP_RATIO", "0.1")),
+    slow_turn_seconds=float(os.environ.get("TRACE_SLOW_TURN_SECONDS", "20")),
+    schedule_delay_millis=10000,
+    max_export_batch_size=512,
 )
 
 async def main():
-    async with AzureCliCredential() as credential:
-        # Create the project client from the endpoint
-        project_client = AIProjectClient(
-            endpoint=os.environ["AZURE_AI_PROJECT_ENDPOINT"],
-            credential=credential
-        )
+    # Create the agent with the process's shared client
+    async with ChatAgent(
+        chat_client=agent_client(),
+        instructions="You are a helpful assistant that can analyze images and describe what you see."
+    ) as agent:
+        thread = agent.get_new_thread()
         
-        # Create the agent with the project client
-        async with ChatAgent(
-            chat_client=AzureAIAgentClient(
-                project_client=project_client, 
-                model_deployment_name=os.environ["AZURE_AI_MODEL_DEPLOYMENT_NAME"],
-                async_credential=credential
-            ),
-            instructions="You are a helpful assistant that can analyze images and describe what you see."
-        ) as agent:
-            thread = agent.get_new_thread()
+        print("Chat started! Type 'end' to exit.\n")
+        
+        while True:
+            # Read input off the event loop so it keeps serving the agent while the user types
+            user_input = await asyncio.to_thread(input, "You: ")
+            
+            if user_input.lower() == "end":
+                print("Goodbye!")
+                break
             
-            print("Chat started! Type 'end' to exit.\n")
+            if not user_input.strip():
+                continue
             
-            while True:
-                user_input = input("You: ")
-                
-                if user_input.lower() == "end":
-                    print("Goodbye!")
-                    break
-                
-                if not user_input.strip():
-                    continue
-                
-                result = await agent.run(user_input, thread=thread)
-                print(f"Assistant: {result.text}\n")
+            # Print the reply as it is generated instead of waiting for the full text
+            print("Assistant: ", end="", flush=True)
+            async for update in agent.run_stream(user_input, thread=thread):
+                print(update.text, end="", flush=True)
+            print("\n")
 
-asyncio.run(main())
\ No newline at end of file
+if __name__ == "__main__":
+    asyncio.run(main())
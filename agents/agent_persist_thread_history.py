@@ -1,73 +1,75 @@
 import asyncio
-from concurrent.futures import thread
-from agent_framework import ChatAgent
-from agent_framework.azure import AzureAIAgentClient
-from azure.identity.aio import AzureCliCredential
-from azure.ai.projects.aio import AIProjectClient
-import os
-from pathlib import Path
-from dotenv import load_dotenv
 import json
-import tempfile
+import os
+from bootstrap import agent_client, load_environment, warm_up
 
-# Load .env file from the parent directory
-script_dir = Path(__file__).parent
-load_dotenv(script_dir.parent / "maf.env")
-print(f"Using endpoint: {os.environ['AZURE_AI_PROJECT_ENDPOINT']}")
+load_environment()
 
 async def main():
-    async with AzureCliCredential() as credential:
-        # Create the project client from the endpoint
-        project_client = AIProjectClient(
-            endpoint=os.environ["AZURE_AI_PROJECT_ENDPOINT"],
-            credential=credential
+    temp_dir = os.getcwd()
+
+    # Imports the SDK on a thread while the first token is fetched
+    await warm_up()
+    from agent_framework import ChatAgent
+
+    local_history = bool(os.environ.get("AZURE_OPENAI_ENDPOINT"))
+    if local_history:
+        # Chat completions keep the history locally: each turn appends only its new messages to the journal,
+        # so nothing is lost on a crash
+        from agent_framework.azure import AzureOpenAIChatClient
+        from azure.identity import AzureCliCredential
+        from thread_journal import JournalChatMessageStore
+
+        file_path = os.path.join(temp_dir, "agent_thread")
+        credential = None if os.environ.get("AZURE_OPENAI_API_KEY") else AzureCliCredential()
+        agent = ChatAgent(
+            chat_client=AzureOpenAIChatClient(credential=credential),
+            instructions="You are a helpful assistant that can analyze images and describe what you see.",
+            chat_message_store_factory=lambda: JournalChatMessageStore(file_path),
         )
-        
-        # Create the agent with the project client
-        async with ChatAgent(
-            chat_client=AzureAIAgentClient(
-                project_client=project_client, 
-                model_deployment_name=os.environ["AZURE_AI_MODEL_DEPLOYMENT_NAME"],
-                async_credential=credential
-            ),
-            instructions="You are a helpful assistant that can analyze images and describe what you see."
-        ) as agent:
+    else:
+        # The agent service keeps the history in its thread, so only the thread id is saved. A thread
+        # cannot have both a service thread id and a message store.
+        file_path = os.path.join(temp_dir, "agent_thread.json")
+        agent = ChatAgent(
+            chat_client=agent_client(),
+            instructions="You are a helpful assistant that can analyze images and describe what you see.",
+        )
+
+    async with agent:
+        if not local_history and os.path.exists(file_path):
+            print("Loading existing thread from file...")
+            with open(file_path, "r") as f:
+                thread = await agent.deserialize_thread(json.load(f))
+        else:
+            # The journal store loads the snapshot and replays the journal written after it, if any
+            thread = agent.get_new_thread()
+            if local_history and thread.message_store.messages:
+                print(f"Loaded existing thread with {len(thread.message_store.messages)} messages.")
+
+        print("Chat started! Type 'end' to exit.\n")
+
+        while True:
+            user_input = await asyncio.to_thread(input, "You: ")
+
+            if user_input.lower() == "end":
+                print("Goodbye!")
+                break
 
-            temp_dir = os.getcwd()#tempfile.gettempdir()
-            file_path = os.path.join(temp_dir, "agent_thread.json")
+            if not user_input.strip():
+                continue
 
-            if os.path.exists(file_path):
-                # File exists, load it
-                print("Loading existing thread from file...")
-                with open(file_path, "r") as f:
-                    loaded_json = f.read()
-                reloaded_data = json.loads(loaded_json)
-                thread = await agent.deserialize_thread(reloaded_data)
-            else:
-                # File doesn't exist, create new thread
-                thread = agent.get_new_thread()
-            
-            print("Chat started! Type 'end' to exit.\n")
-            
-            while True:
-                user_input = input("You: ")
-                
-                if user_input.lower() == "end":
-                    print("Goodbye!")
-                    break
-                
-                if not user_input.strip():
-                    continue
-                
-                result = await agent.run(user_input, thread=thread)
-                print(f"Assistant: {result.text}\n")
+            # Print the reply as it is generated instead of waiting for the full text
+            print("Assistant: ", end="", flush=True)
+            async for update in agent.run_stream(user_input, thread=thread):
+                print(update.text, end="", flush=True)
+            print("\n")
 
-            # Serialize the thread state
-            serialized_thread = await thread.serialize()
-            serialized_json = json.dumps(serialized_thread)
+            if thread.service_thread_id is not None:
+                # Saved after every turn, so a crash does not lose the thread. It is only the id.
+                with open(file_path, "w") as f:
+                    json.dump(await thread.serialize(), f)
 
-            # Example: save to a local file (replace with DB or blob storage in production)
-            with open(file_path, "w") as f:
-                f.write(serialized_json)
 
-asyncio.run(main())
\ No newline at end of file
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,308 @@
+import asyncio
+import json
+import logging
+import os
+import time
+from collections import OrderedDict
+from collections.abc import AsyncIterator
+from contextlib import aclosing, asynccontextmanager
+from dataclasses import asdict, dataclass, field
+
+from agent_framework import AgentThread, ChatAgent
+from aiohttp import WSMsgType, web
+
+from bootstrap import agent_client, load_environment
+from tool_metrics import ToolMetrics
+
+"""
+Multi-session HTTP and WebSocket server for one shared ChatAgent.
+
+The REPL samples drive one conversation per process. This server hosts a single agent for many
+users: every session ID maps to its own AgentThread, turns within a session run one at a time,
+agent runs across sessions are bounded by a semaphore, and idle sessions are evicted.
+
+Endpoints:
+- POST /sessions/{session_id}/messages with {"text": "..."} returns {"text": "..."}. With ?stream=1
+  the reply is streamed as newline-delimited JSON: {"delta": "..."} lines, then {"done": true}.
+- GET /sessions/{session_id}/ws opens a WebSocket. Every text frame is a user turn, answered with
+  a {"text": "..."} frame, or with ?stream=1 by {"delta": "..."} frames and a {"done": true} frame.
+  A turn that fails is answered with an {"error": "..."} frame and the socket stays open.
+- DELETE /sessions/{session_id} ends a session
+- GET /stats returns session, run and CPU counters
+- GET /metrics returns tool call metrics in the Prometheus text format, when a ToolMetrics is given
+"""
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class Session:
+    """One conversation hosted by the server."""
+
+    thread: AgentThread
+    last_used: float
+    # Held for the duration of a turn, since a thread cannot run two turns at once
+    lock: asyncio.Lock = field(default_factory=asyncio.Lock)
+
+
+@dataclass
+class ServerStats:
+    """Point-in-time counters of an AgentSessionHost."""
+
+    sessions: int
+    active_runs: int
+    waiting_runs: int
+    turns: int
+    evictions: int
+    # CPU time used by the whole process, for computing sessions per core
+    cpu_seconds: float
+
+
+class AgentSessionHost:
+    """Maps session IDs to threads of one shared agent and bounds how many runs execute at once."""
+
+    def __init__(
+        self,
+        agent: ChatAgent,
+        max_concurrent_runs: int = 32,
+        idle_timeout: float = 1800,
+        max_sessions: int = 10_000,
+    ) -> None:
+        """Initialize the host.
+
+        Args:
+            agent: The agent shared by all sessions.
+            max_concurrent_runs: Agent runs allowed in flight at once. Further turns wait their turn.
+            idle_timeout: Seconds without a turn after which a session is evicted.
+            max_sessions: Sessions kept at most. The least recently used idle session is evicted first.
+        """
+        self.agent = agent
+        self.max_concurrent_runs = max_concurrent_runs
+        self.idle_timeout = idle_timeout
+        self.max_sessions = max_sessions
+        self.turns = 0
+        self.evictions = 0
+        # Least recently used first, so eviction only looks at the front
+        self._sessions: OrderedDict[str, Session] = OrderedDict()
+        self._semaphore = asyncio.Semaphore(max_concurrent_runs)
+        self._active_runs = 0
+        self._waiting_runs = 0
+
+    def get_session(self, session_id: str) -> Session:
+        """Return the session for session_id, starting a new thread if it does not exist."""
+        session = self._sessions.get(session_id)
+        if session is None:
+            session = self._sessions[session_id] = Session(self.agent.get_new_thread(), time.monotonic())
+            if len(self._sessions) > self.max_sessions:
+                self._evict(lambda session: True, limit=len(self._sessions) - self.max_sessions)
+        else:
+            self._sessions.move_to_end(session_id)
+        return session
+
+    def end_session(self, session_id: str) -> bool:
+        """Forget a session. Returns False if it did not exist."""
+        return self._sessions.pop(session_id, None) is not None
+
+    @asynccontextmanager
+    async def _turn(self, session_id: str) -> AsyncIterator[Session]:
+        """Hold the session's lock and a run slot for the duration of one turn."""
+        session = self.get_session(session_id)
+        async with session.lock:
+            self._waiting_runs += 1
+            try:
+                await self._semaphore.acquire()
+            finally:
+                self._waiting_runs -= 1
+            self._active_runs += 1
+            try:
+                yield session
+            finally:
+                self._active_runs -= 1
+                self._semaphore.release()
+            session.last_used = time.monotonic()
+            self.turns += 1
+
+    async def run_turn(self, session_id: str, text: str) -> str:
+        """Run one user turn in a session and return the agent's reply."""
+        async with self._turn(session_id) as session:
+            result = await self.agent.run(text, thread=session.thread)
+        return result.text
+
+    async def stream_turn(self, session_id: str, text: str) -> AsyncIterator[str]:
+        """Run one user turn in a session, yielding the reply text as the model produces it.
+
+        The next update is only pulled from the model once the caller asks for it, so a slow
+        consumer slows the stream down instead of making it buffer. Close the iterator (for example
+        with contextlib.aclosing) when stopping early, to release the session and its run slot.
+        """
+        async with self._turn(session_id) as session:
+            async for update in self.agent.run_stream(text, thread=session.thread):
+                if update.text:
+                    yield update.text
+
+    def evict_idle(self) -> int:
+        """Drop sessions idle for longer than idle_timeout. Returns how many were dropped."""
+        cutoff = time.monotonic() - self.idle_timeout
+        return self._evict(lambda session: session.last_used < cutoff)
+
+    def _evict(self, is_evictable, limit: int | None = None) -> int:
+        evicted = []
+        for session_id, session in self._sessions.items():
+            if limit is not None and len(evicted) >= limit:
+                break
+            if session.lock.locked():
+                continue
+            if not is_evictable(session):
+                # Sessions are ordered by last use, so every later one is more recent
+                break
+            evicted.append(session_id)
+        for session_id in evicted:
+            del self._sessions[session_id]
+        self.evictions += len(evicted)
+        return len(evicted)
+
+    async def run_evictions(self, interval: float = 60) -> None:
+        """Evict idle sessions every interval seconds until cancelled."""
+        while True:
+            await asyncio.sleep(interval)
+            self.evict_idle()
+
+    def stats(self) -> ServerStats:
+        """Return the current counters."""
+        return ServerStats(
+            sessions=len(self._sessions),
+            active_runs=self._active_runs,
+            waiting_runs=self._waiting_runs,
+            turns=self.turns,
+            evictions=self.evictions,
+            cpu_seconds=time.process_time(),
+        )
+
+
+def create_app(
+    host: AgentSessionHost,
+    eviction_interval: float = 60,
+    send_timeout: float = 30,
+    metrics: ToolMetrics | None = None,
+) -> web.Application:
+    """Build the aiohttp application serving host.
+
+    Args:
+        host: The sessions to serve.
+        eviction_interval: Seconds between sweeps for idle sessions.
+        send_timeout: Seconds a client may take to accept one streamed chunk. aiohttp waits for the
+                     socket to drain once 64 KiB are buffered, so a client that stops reading stalls
+                     the stream until this timeout drops its connection.
+        metrics: Tool metrics middleware of the agent, exported on /metrics.
+    """
+
+    async def stream_reply(session_id: str, text: str, send) -> None:
+        async with aclosing(host.stream_turn(session_id, text)) as deltas:
+            async for delta in deltas:
+                await asyncio.wait_for(send({"delta": delta}), send_timeout)
+        await asyncio.wait_for(send({"done": True}), send_timeout)
+
+    async def post_message(request: web.Request) -> web.StreamResponse:
+        try:
+            body = await request.json()
+        except (json.JSONDecodeError, UnicodeDecodeError):
+            raise web.HTTPBadRequest(text="Expected a JSON body with a non-empty 'text'") from None
+        text = body.get("text") if isinstance(body, dict) else None
+        if not isinstance(text, str) or not text.strip():
+            raise web.HTTPBadRequest(text="Expected a JSON body with a non-empty 'text'")
+        session_id = request.match_info["session_id"]
+        if request.query.get("stream") != "1":
+            return web.json_response({"text": await host.run_turn(session_id, text)})
+
+        response = web.StreamResponse(headers={"Content-Type": "application/x-ndjson"})
+        await response.prepare(request)
+        try:
+            await stream_reply(session_id, text, lambda data: response.write(json.dumps(data).encode() + b"\n"))
+        except asyncio.TimeoutError:
+            request.transport.abort()
+            return response
+        await response.write_eof()
+        return response
+
+    async def websocket(request: web.Request) -> web.WebSocketResponse:
+        session_id = request.match_info["session_id"]
+        stream = request.query.get("stream") == "1"
+        ws = web.WebSocketResponse(heartbeat=30)
+        await ws.prepare(request)
+        async for message in ws:
+            if message.type != WSMsgType.TEXT or not message.data.strip():
+                continue
+            try:
+                if stream:
+                    await stream_reply(session_id, message.data, ws.send_json)
+                else:
+                    await ws.send_json({"text": await host.run_turn(session_id, message.data)})
+            except asyncio.TimeoutError:
+                # The client stopped reading
+                request.transport.abort()
+                break
+            except Exception as ex:
+                # One failed turn, for example a service error, must not end the session's socket
+                logger.exception("Turn of session %s failed", session_id)
+                await ws.send_json({"error": f"{type(ex).__name__}: {ex}"})
+        return ws
+
+    async def delete_session(request: web.Request) -> web.Response:
+        if not host.end_session(request.match_info["session_id"]):
+            raise web.HTTPNotFound()
+        return web.Response(status=204)
+
+    async def get_stats(request: web.Request) -> web.Response:
+        return web.json_response(asdict(host.stats()))
+
+    async def get_metrics(request: web.Request) -> web.Response:
+        return web.Response(text=metrics.prometheus_text(), content_type="text/plain", charset="utf-8")
+
+    async def eviction_context(app: web.Application):
+        task = asyncio.create_task(host.run_evictions(eviction_interval))
+        yield
+        task.cancel()
+
+    app = web.Application()
+    app.add_routes(
+        [
+            web.post("/sessions/{session_id}/messages", post_message),
+            web.get("/sessions/{session_id}/ws", websocket),
+            web.delete("/sessions/{session_id}", delete_session),
+            web.get("/stats", get_stats),
+        ]
+    )
+    if metrics is not None:
+        app.router.add_get("/metrics", get_metrics)
+    app.cleanup_ctx.append(eviction_context)
+    return app
+
+
+async def serve(app: web.Application, host: str, port: int) -> None:
+    """Serve app until cancelled."""
+    runner = web.AppRunner(app)
+    await runner.setup()
+    try:
+        await web.TCPSite(runner, host, port).start()
+        print(f"Serving on http://{host}:{port}")
+        await asyncio.Event().wait()
+    finally:
+        await runner.cleanup()
+
+
+async def main():
+    load_environment()
+    tool_metrics = ToolMetrics()
+    # One agent serves every session, each with its own thread. The agent service keeps the history of
+    # every thread, so there is no local message store: a thread cannot have both.
+    async with ChatAgent(
+        chat_client=agent_client(),
+        instructions="You are a helpful assistant that can analyze images and describe what you see.",
+        middleware=[tool_metrics],
+    ) as agent:
+        app = create_app(AgentSessionHost(agent), metrics=tool_metrics)
+        host = os.environ.get("AGENT_SERVER_HOST", "127.0.0.1")
+        await serve(app, host, int(os.environ.get("AGENT_SERVER_PORT", 8080)))
+
+if __name__ == "__main__":
+    asyncio.run(main())
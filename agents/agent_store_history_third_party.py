@@ -1,23 +1,409 @@
 import asyncio
 from agent_framework import ChatAgent
-from agent_framework.azure import AzureAIAgentClient
-from azure.identity.aio import AzureCliCredential
-from azure.ai.projects.aio import AIProjectClient
 import os
-from pathlib import Path
-from dotenv import load_dotenv
-from collections.abc import Sequence
-from typing import Any
+from collections.abc import AsyncIterator, Awaitable, Callable, Sequence
+from dataclasses import dataclass
+from typing import Any, Protocol
 from uuid import uuid4
 from pydantic import BaseModel
 import json
+import time
+from collections import OrderedDict
+import msgpack
 import redis.asyncio as redis
-from agent_framework import ChatMessage
+from redis.asyncio.connection import parse_url
+from agent_framework import ChatMessage, FunctionCallContent, FunctionResultContent, TextContent
+from bootstrap import agent_client, load_environment
+from chat_history_budget import drop_orphan_results, estimate_tokens
+
+try:
+    import zstandard
+except ImportError:  # zstd compression of large entries is optional
+    zstandard = None
+
+# Prefix-wide keys live under <key_prefix>:__index__:, which no thread ID may start with, so no
+# thread's keys can collide with them
+INDEX_SEGMENT = "__index__"
+
+# Append ARGV[3] entries (ARGV[6..]) to the list, stamp the thread's version (KEYS[2]) with the next value
+# of the prefix-wide sequence (KEYS[6]) and record ARGV[4] as the last activity of thread ARGV[5] in the
+# activity index (KEYS[5]). ARGV[1] is the message limit and ARGV[2] the token budget, empty for none. With
+# a token budget the per-entry estimates (the ARGV[3] values after the entries) are kept in a parallel list
+# (KEYS[3]) with their running total (KEYS[4]), and the oldest entries are popped until both limits hold,
+# always keeping the newest. Returns {new LLEN, previous version, new version}.
+APPEND_AND_TRIM_SCRIPT = """
+local count = tonumber(ARGV[3])
+local max_messages = tonumber(ARGV[1])
+local max_tokens = tonumber(ARGV[2])
+local length = redis.call('RPUSH', KEYS[1], unpack(ARGV, 6, 5 + count))
+if max_tokens then
+    local tracked = redis.call('LLEN', KEYS[3])
+    if tracked ~= length - count then
+        -- Entries written before token tracking was enabled count as zero
+        redis.call('DEL', KEYS[3], KEYS[4])
+        for i = 1, length - count do
+            redis.call('RPUSH', KEYS[3], 0)
+        end
+    end
+    redis.call('RPUSH', KEYS[3], unpack(ARGV, 6 + count, 5 + 2 * count))
+    local total = tonumber(redis.call('GET', KEYS[4]) or 0)
+    for i = 6 + count, 5 + 2 * count do
+        total = total + tonumber(ARGV[i])
+    end
+    while length > 1 and (total > max_tokens or (max_messages and length > max_messages)) do
+        redis.call('LPOP', KEYS[1])
+        total = total - tonumber(redis.call('LPOP', KEYS[3]))
+        length = length - 1
+    end
+    redis.call('SET', KEYS[4], total)
+elseif max_messages then
+    redis.call('LTRIM', KEYS[1], -max_messages, -1)
+    length = redis.call('LLEN', KEYS[1])
+end
+local previous = tonumber(redis.call('GET', KEYS[2]) or 0)
+local version = redis.call('INCR', KEYS[6])
+redis.call('SET', KEYS[2], version)
+redis.call('ZADD', KEYS[5], ARGV[4], ARGV[5])
+return {length, previous, version}
+"""
+
+# Walk the list from the newest entry in pages of 32, collecting entries until ARGV[1] messages or
+# ARGV[2] bytes would be exceeded (0 disables a limit). The newest entry is always returned. Oldest first.
+TAIL_WINDOW_SCRIPT = """
+local max_count = tonumber(ARGV[1])
+local max_bytes = tonumber(ARGV[2])
+local page = 32
+local window, used, offset, done = {}, 0, 0, false
+repeat
+    local entries = redis.call('LRANGE', KEYS[1], -(offset + page), -(offset + 1))
+    for i = #entries, 1, -1 do
+        local size = #entries[i]
+        if (max_count > 0 and #window >= max_count) or (max_bytes > 0 and #window > 0 and used + size > max_bytes) then
+            done = true
+            break
+        end
+        used = used + size
+        window[#window + 1] = entries[i]
+    end
+    offset = offset + page
+until done or #entries < page
+local result = {}
+for i = #window, 1, -1 do
+    result[#result + 1] = window[i]
+end
+return result
+"""
+
+# Delete the keys of thread ARGV[1] (KEYS[2..5]) and drop it from the activity index (KEYS[1]), unless its
+# last activity is newer than ARGV[2]. Returns 1 if the thread was deleted, 0 if it became active again.
+EXPIRE_IF_IDLE_SCRIPT = """
+local score = redis.call('ZSCORE', KEYS[1], ARGV[1])
+if score and tonumber(score) > tonumber(ARGV[2]) then
+    return 0
+end
+redis.call('DEL', KEYS[2], KEYS[3], KEYS[4], KEYS[5])
+redis.call('ZREM', KEYS[1], ARGV[1])
+return 1
+"""
+
+
+@dataclass
+class RedisPoolStats:
+    """Point-in-time metrics for one shared Redis connection pool."""
+
+    endpoint: str
+    in_use: int
+    idle: int
+    max_connections: int
+    # Number of connection leases and the time callers spent waiting for them (including connects)
+    acquisitions: int
+    total_wait_seconds: float
+    max_wait_seconds: float
+
+
+class InstrumentedConnectionPool(redis.BlockingConnectionPool):
+    """Blocking connection pool that records how long callers wait to lease a connection."""
+
+    def __init__(self, **kwargs: Any) -> None:
+        super().__init__(**kwargs)
+        self.acquisitions = 0
+        self.total_wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+
+    async def get_connection(self, *args: Any, **kwargs: Any):
+        start = time.perf_counter()
+        connection = await super().get_connection(*args, **kwargs)
+        waited = time.perf_counter() - start
+        self.acquisitions += 1
+        self.total_wait_seconds += waited
+        self.max_wait_seconds = max(self.max_wait_seconds, waited)
+        return connection
+
+    def stats(self, endpoint: str) -> RedisPoolStats:
+        in_use = len(self._in_use_connections)
+        return RedisPoolStats(
+            endpoint=endpoint,
+            in_use=in_use,
+            idle=len(self._available_connections),
+            max_connections=self.max_connections,
+            acquisitions=self.acquisitions,
+            total_wait_seconds=self.total_wait_seconds,
+            max_wait_seconds=self.max_wait_seconds,
+        )
+
+
+class RedisPoolRegistry:
+    """Process-wide registry handing out one connection pool per Redis endpoint and credential set.
+
+    Every store leases its client from here, so thousands of threads share a bounded number of
+    sockets (and TLS handshakes) instead of opening one client each.
+    """
+
+    def __init__(self, max_connections: int = 64, timeout: float | None = 20) -> None:
+        """Initialize the registry.
+
+        Args:
+            max_connections: Upper bound on open connections per pool. Callers beyond it wait.
+            timeout: Seconds to wait for a free connection before raising, or None to wait forever.
+        """
+        self.max_connections = max_connections
+        self.timeout = timeout
+        self._pools: dict[tuple[Any, ...], tuple[str, InstrumentedConnectionPool]] = {}
+
+    def get_client(
+        self,
+        redis_url: str,
+        port: int = 13635,
+        username: str | None = "default",
+        password: str | None = None,
+        decode_responses: bool = True,
+    ) -> redis.Redis:
+        """Return a client backed by the shared pool for this endpoint.
+
+        Args:
+            redis_url: Either a bare host name or a full redis:// or rediss:// URL. Values in a URL
+                      take precedence over port, username and password.
+            port: Port used with a bare host name.
+            username: Username used with a bare host name.
+            password: Password used with a bare host name.
+            decode_responses: Return str instead of bytes. Clients with different values use separate pools.
+        """
+        if "://" in redis_url:
+            connection_kwargs = {"port": port, "username": username, "password": password, **parse_url(redis_url)}
+        else:
+            connection_kwargs = {"host": redis_url, "port": port, "username": username, "password": password}
+        connection_kwargs["decode_responses"] = decode_responses
+
+        key = tuple(sorted(connection_kwargs.items(), key=lambda item: item[0]))
+        if key not in self._pools:
+            host, db = connection_kwargs.get("host", "localhost"), connection_kwargs.get("db", 0)
+            endpoint = f"{host}:{connection_kwargs['port']}/{db}"
+            pool = InstrumentedConnectionPool(
+                max_connections=self.max_connections, timeout=self.timeout, **connection_kwargs
+            )
+            self._pools[key] = (endpoint, pool)
+        return redis.Redis(connection_pool=self._pools[key][1])
+
+    def stats(self) -> list[RedisPoolStats]:
+        """Return metrics for every pool created so far."""
+        return [pool.stats(endpoint) for endpoint, pool in self._pools.values()]
+
+    async def aclose(self) -> None:
+        """Disconnect every pool. Clients leased earlier reconnect on next use."""
+        for _, pool in self._pools.values():
+            await pool.aclose()
+        self._pools.clear()
+
+
+# Shared by every RedisChatMessageStore in the process
+redis_pools = RedisPoolRegistry()
+
+
+class MessageCodec(Protocol):
+    """Converts chat messages to and from the entries stored in Redis."""
+
+    def encode(self, message: ChatMessage) -> bytes | str: ...
+
+    def decode(self, data: bytes | str) -> ChatMessage: ...
+
+
+class JsonMessageCodec:
+    """Stores each message as its to_dict() JSON, readable by any client."""
+
+    def encode(self, message: ChatMessage) -> str:
+        return json.dumps(message.to_dict(), separators=(",", ":"))
+
+    def decode(self, data: bytes | str) -> ChatMessage:
+        return ChatMessage.from_dict(json.loads(data))
+
+
+# Leading version byte of entries written by MsgpackMessageCodec. JSON entries always start with "{".
+MSGPACK_FORMAT = 0x01
+MSGPACK_ZSTD_FORMAT = 0x02
+
+
+class MsgpackMessageCodec:
+    """Compact binary codec for stored messages.
+
+    A message is packed with msgpack as [role, author_name, message_id, contents, additional_properties].
+    Plain text contents are stored as bare strings, plain function calls and string function results are
+    flattened directly, and every other content uses its to_dict() form. This skips most of the generic
+    serialization work for ordinary turns. Packed messages larger than
+    ``compress_threshold`` bytes are compressed with zstd when the zstandard package is installed.
+
+    Every entry starts with a version byte, and entries without one are decoded as the original JSON
+    format, so existing histories stay readable.
+    """
+
+    def __init__(self, compress_threshold: int | None = 1024, compression_level: int = 3) -> None:
+        """Initialize the codec.
+
+        Args:
+            compress_threshold: Packed size in bytes above which entries are zstd compressed.
+                               None disables compression.
+            compression_level: zstd compression level.
+        """
+        self.compress_threshold = compress_threshold if zstandard is not None else None
+        if zstandard is not None:
+            self._compressor = zstandard.ZstdCompressor(level=compression_level)
+            self._decompressor = zstandard.ZstdDecompressor()
+
+    @staticmethod
+    def _pack_content(content: Any) -> str | dict[str, Any]:
+        if content.annotations or content.additional_properties:
+            return content.to_dict()
+        content_type = type(content)
+        if content_type is TextContent:
+            return content.text
+        if content_type is FunctionCallContent and content.exception is None:
+            return {
+                "type": "function_call",
+                "call_id": content.call_id,
+                "name": content.name,
+                "arguments": content.arguments,
+            }
+        if content_type is FunctionResultContent and content.exception is None and isinstance(content.result, str):
+            return {"type": "function_result", "call_id": content.call_id, "result": content.result}
+        return content.to_dict()
+
+    def encode(self, message: ChatMessage) -> bytes:
+        contents = [self._pack_content(content) for content in message.contents]
+        properties = message.additional_properties or None
+        packed = msgpack.packb([message.role.value, message.author_name, message.message_id, contents, properties])
+        if self.compress_threshold is not None and len(packed) > self.compress_threshold:
+            return bytes([MSGPACK_ZSTD_FORMAT]) + self._compressor.compress(packed)
+        return bytes([MSGPACK_FORMAT]) + packed
+
+    def decode(self, data: bytes | str) -> ChatMessage:
+        if isinstance(data, str) or data[0] not in (MSGPACK_FORMAT, MSGPACK_ZSTD_FORMAT):
+            return ChatMessage.from_dict(json.loads(data))
+
+        payload = memoryview(data)[1:]
+        if data[0] == MSGPACK_ZSTD_FORMAT:
+            if zstandard is None:
+                raise RuntimeError("The zstandard package is required to read compressed chat messages.")
+            payload = self._decompressor.decompress(payload)
+        role, author_name, message_id, contents, additional_properties = msgpack.unpackb(payload)
+        return ChatMessage(
+            role=role,
+            contents=[TextContent(text=content) if isinstance(content, str) else content for content in contents],
+            author_name=author_name,
+            message_id=message_id,
+            additional_properties=additional_properties,
+        )
+
+
+@dataclass
+class CachedHistory:
+    """A thread's stored messages as of one version of its Redis list."""
+
+    version: int
+    messages: list[ChatMessage]
+    # Stored size in bytes of each message, used for byte windows and the cache budget
+    sizes: list[int]
+    loaded_at: float
+    validated_at: float
+
+    @property
+    def size(self) -> int:
+        return sum(self.sizes)
+
+
+class HistoryNearCache:
+    """In-process LRU cache of deserialized thread histories, bounded by their stored size in bytes.
+
+    Entries carry the per-thread version counter that every append increments in Redis. Reads compare
+    it with a single GET (no list transfer, no deserialization), so writes from other replicas are
+    picked up on the next read. Appends made through this process update the cached entry in place.
+    Share one instance between all stores of a process so threads survive store re-creation.
+    """
+
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024, ttl: float | None = 300, max_staleness: float = 0) -> None:
+        """Initialize the cache.
+
+        Args:
+            max_bytes: Total stored size of cached histories. Least recently used threads are evicted first.
+            ttl: Seconds after loading from Redis before an entry is dropped, or None to keep it until evicted.
+            max_staleness: Seconds after a version check during which reads skip the check entirely.
+                          Only use a non-zero value for sticky sessions where one replica owns a thread.
+        """
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.max_staleness = max_staleness
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[str, CachedHistory] = OrderedDict()
+        self._size = 0
+
+    def get(self, key: str) -> CachedHistory | None:
+        """Return the entry for key if present and not expired."""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if self.ttl is not None and time.monotonic() - entry.loaded_at > self.ttl:
+            self.discard(key)
+            return None
+        self._entries.move_to_end(key)
+        return entry
+
+    def put(self, key: str, entry: CachedHistory) -> None:
+        """Store entry for key, evicting least recently used entries beyond max_bytes."""
+        self.discard(key)
+        if entry.size > self.max_bytes:
+            return
+        self._entries[key] = entry
+        self._size += entry.size
+        while self._size > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self._size -= evicted.size
+
+    def discard(self, key: str) -> None:
+        """Drop the entry for key, if any."""
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._size -= entry.size
+
+
+def index_key(key_prefix: str, name: str) -> str:
+    """Get the Redis key of a prefix-wide index, kept apart from the ``<key_prefix>:<thread_id>`` keys."""
+    return f"{key_prefix}:{INDEX_SEGMENT}:{name}"
+
+
+def select_tail(
+    messages: list[ChatMessage], sizes: list[int], max_messages: int | None, max_bytes: int | None
+) -> list[ChatMessage]:
+    """Apply the same tail window as TAIL_WINDOW_SCRIPT to an in-memory history."""
+    start = len(messages) - max_messages if max_messages else 0
+    start = max(start, 0)
+    if max_bytes:
+        used = 0
+        for index in range(len(messages) - 1, start - 1, -1):
+            used += sizes[index]
+            if used > max_bytes and index < len(messages) - 1:
+                start = index + 1
+                break
+    return messages[start:]
 
-# Load .env file from the parent directory
-script_dir = Path(__file__).parent
-load_dotenv(script_dir.parent / "maf.env")
-print(f"Using endpoint: {os.environ['AZURE_AI_PROJECT_ENDPOINT']}")
 
 class RedisStoreState(BaseModel):
     """State model for serializing and deserializing Redis chat message store data."""
@@ -27,6 +413,10 @@ class RedisStoreState(BaseModel):
     key_prefix: str = "chat_messages"
     max_messages: int | None = None
     redis_psw: str | None = None
+    redis_port: int = 13635
+    history_window: int | None = None
+    history_window_bytes: int | None = None
+    max_tokens: int | None = None
 
 
 class RedisChatMessageStore:
@@ -38,74 +428,225 @@ class RedisChatMessageStore:
         thread_id: str | None = None,
         key_prefix: str = "chat_messages",
         max_messages: int | None = None,
-        redis_psw: str | None = None
-
+        redis_psw: str | None = None,
+        redis_port: int = 13635,
+        history_window: int | None = None,
+        history_window_bytes: int | None = None,
+        codec: MessageCodec | None = None,
+        near_cache: HistoryNearCache | None = None,
+        max_tokens: int | None = None,
     ) -> None:
         """Initialize the Redis chat message store.
 
         Args:
             redis_url: Redis connection URL (for example, "redis://localhost:6379").
-            thread_id: Unique identifier for this conversation thread.
+            thread_id: Unique identifier for this conversation thread. It may not start with ``__index__``.
                       If not provided, a UUID will be auto-generated.
             key_prefix: Prefix for Redis keys to namespace different applications.
             max_messages: Maximum number of messages to retain in Redis.
                          When exceeded, oldest messages are automatically trimmed.
+            redis_psw: Password for the "default" Redis user.
+            redis_port: Port used when redis_url is a bare host name.
+            history_window: How many of the most recent messages list_messages hands to the agent.
+                           All stored messages are returned when not set.
+            history_window_bytes: Serialized size budget for the messages list_messages returns.
+                                 The newest message is always included, even if it is larger.
+            codec: How messages are encoded in Redis. Defaults to MsgpackMessageCodec. Every codec
+                  reads entries written in the original JSON format.
+            near_cache: Optional in-process cache of deserialized histories, normally shared by all stores.
+            max_tokens: Estimated prompt token budget for the stored history. When exceeded, oldest
+                       messages are trimmed, always keeping the newest. Combines with max_messages.
         """
         if redis_url is None:
             raise ValueError("redis_url is required for Redis connection")
+        if thread_id is not None and thread_id.startswith(INDEX_SEGMENT):
+            raise ValueError(f"thread_id may not start with {INDEX_SEGMENT!r}, it is reserved for index keys")
 
         self.redis_url = redis_url
         self.thread_id = thread_id or f"thread_{uuid4()}"
         self.key_prefix = key_prefix
         self.max_messages = max_messages
+        self.redis_psw = redis_psw
+        self.redis_port = redis_port
+        self.history_window = history_window
+        self.history_window_bytes = history_window_bytes
+        self.codec = codec or MsgpackMessageCodec()
+        self.near_cache = near_cache
+        self.max_tokens = max_tokens
 
-        # Initialize Redis client
-        self._redis_client = redis.Redis(host=redis_url,
-                                        port=13635,
-                                        decode_responses=True,
-                                        username="default",
-                                        password=redis_psw,)
+        # Lease a client from the process-wide pool for this endpoint
+        self._connect()
+
+    def _connect(self) -> None:
+        """Point this store at the shared pool for its current endpoint and credentials."""
+        self._redis_client = redis_pools.get_client(
+            self.redis_url, port=self.redis_port, password=self.redis_psw, decode_responses=False
+        )
+        self._append_script = self._redis_client.register_script(APPEND_AND_TRIM_SCRIPT)
+        self._tail_window_script = self._redis_client.register_script(TAIL_WINDOW_SCRIPT)
 
     @property
     def redis_key(self) -> str:
         """Get the Redis key for this thread's messages."""
         return f"{self.key_prefix}:{self.thread_id}"
 
-    async def add_messages(self, messages: Sequence[ChatMessage]) -> None:
+    @property
+    def version_key(self) -> str:
+        """Get the Redis key of the version stamped on this thread by every write."""
+        return f"{self.redis_key}:version"
+
+    @property
+    def token_keys(self) -> list[str]:
+        """Get the Redis keys of the per-message token estimates and their running total."""
+        return [f"{self.redis_key}:tokens", f"{self.redis_key}:token_total"]
+
+    @property
+    def index_keys(self) -> list[str]:
+        """Get the prefix-wide Redis keys of the activity index and the version sequence."""
+        return [index_key(self.key_prefix, "activity"), index_key(self.key_prefix, "version_seq")]
+
+    async def add_messages(self, messages: Sequence[ChatMessage]) -> int | None:
         """Add messages to the Redis store.
 
+        The append, the trim to ``max_messages`` and ``max_tokens``, the version bump, the activity
+        index update and the length read run server side in a single Lua script, so every call costs
+        one network round trip regardless of the limits. Token estimates are computed here once per
+        message and kept next to the list, so trimming never re-measures the stored history.
+
         Args:
             messages: Sequence of ChatMessage objects to add to the store.
+
+        Returns:
+            The number of messages stored for this thread after the append, or None if nothing was added.
         """
         if not messages:
-            return
+            return None
 
-        # Serialize messages and add to Redis list
+        # Serialize messages, then append and trim atomically on the server
         serialized_messages = [self._serialize_message(msg) for msg in messages]
-        await self._redis_client.rpush(self.redis_key, *serialized_messages)
+        max_messages = "" if self.max_messages is None else self.max_messages
+        max_tokens, token_counts = "", []
+        if self.max_tokens is not None:
+            max_tokens, token_counts = self.max_tokens, [estimate_tokens(msg) for msg in messages]
+        length, previous, version = await self._append_script(
+            keys=[self.redis_key, self.version_key, *self.token_keys, *self.index_keys],
+            args=[
+                max_messages,
+                max_tokens,
+                len(serialized_messages),
+                time.time(),
+                self.thread_id,
+                *serialized_messages,
+                *token_counts,
+            ],
+        )
 
-        # Apply message limit if configured
-        if self.max_messages is not None:
-            current_count = await self._redis_client.llen(self.redis_key)
-            if current_count > self.max_messages:
-                # Keep only the most recent max_messages using LTRIM
-                await self._redis_client.ltrim(self.redis_key, -self.max_messages, -1)
+        if self.near_cache is not None:
+            entry = self.near_cache.get(self.redis_key)
+            if entry is not None and entry.version and entry.version == previous:
+                # Nobody else wrote in between, so the cached history plus our messages is the new list
+                messages = (entry.messages + list(messages))[-length:]
+                sizes = (entry.sizes + [len(serialized) for serialized in serialized_messages])[-length:]
+                now = time.monotonic()
+                self.near_cache.put(self.redis_key, CachedHistory(version, messages, sizes, entry.loaded_at, now))
+            else:
+                self.near_cache.discard(self.redis_key)
+        return length
 
     async def list_messages(self) -> list[ChatMessage]:
-        """Get all messages from the store in chronological order.
+        """Get the messages the agent needs for its next run in chronological order.
+
+        Only the tail configured by ``history_window`` and ``history_window_bytes`` is read and
+        deserialized, so long-lived threads do not pay for their whole history on every turn.
 
         Returns:
             List of ChatMessage objects in chronological order (oldest first).
         """
-        # Retrieve all messages from Redis list (oldest to newest)
-        redis_messages = await self._redis_client.lrange(self.redis_key, 0, -1)
+        return await self.list_recent_messages(self.history_window, self.history_window_bytes)
+
+    async def list_recent_messages(
+        self, max_messages: int | None = None, max_bytes: int | None = None
+    ) -> list[ChatMessage]:
+        """Get the most recent messages from the store in chronological order.
+
+        Args:
+            max_messages: Return at most this many of the newest messages.
+            max_bytes: Stop once the serialized size of the returned messages would exceed this budget.
+                      The newest message is always returned.
+
+        Returns:
+            List of ChatMessage objects in chronological order (oldest first). Tool results at the
+            start whose function call is not in the window are left out.
+        """
+        if self.near_cache is not None:
+            entry = await self._load_cached_history()
+            return drop_orphan_results(select_tail(entry.messages, entry.sizes, max_messages, max_bytes))
+
+        if max_bytes:
+            # Byte budgets need the entry sizes, so the tail is walked server side
+            redis_messages = await self._tail_window_script(
+                keys=[self.redis_key], args=[max_messages or 0, max_bytes]
+            )
+        elif max_messages:
+            redis_messages = await self._redis_client.lrange(self.redis_key, -max_messages, -1)
+        else:
+            redis_messages = await self._redis_client.lrange(self.redis_key, 0, -1)
+
+        return drop_orphan_results(
+            [self._deserialize_message(serialized_message) for serialized_message in redis_messages]
+        )
+
+    async def _load_cached_history(self) -> CachedHistory:
+        """Return the near cache entry for this thread, reloading it if another writer changed the list."""
+        entry = self.near_cache.get(self.redis_key)
+        now = time.monotonic()
+        if entry is not None:
+            if now - entry.validated_at <= self.near_cache.max_staleness:
+                self.near_cache.hits += 1
+                return entry
+            # Version 0 means no version key, which a cleared or expired thread shares with legacy lists
+            if entry.version and int(await self._redis_client.get(self.version_key) or 0) == entry.version:
+                self.near_cache.hits += 1
+                entry.validated_at = now
+                return entry
 
-        messages = []
-        for serialized_message in redis_messages:
-            message = self._deserialize_message(serialized_message)
-            messages.append(message)
+        self.near_cache.misses += 1
+        # Read the list and its version atomically so the entry is never tagged with a newer version
+        async with self._redis_client.pipeline(transaction=True) as pipe:
+            pipe.get(self.version_key)
+            pipe.lrange(self.redis_key, 0, -1)
+            version, redis_messages = await pipe.execute()
+        entry = CachedHistory(
+            version=int(version or 0),
+            messages=[self._deserialize_message(serialized_message) for serialized_message in redis_messages],
+            sizes=[len(serialized_message) for serialized_message in redis_messages],
+            loaded_at=now,
+            validated_at=now,
+        )
+        self.near_cache.put(self.redis_key, entry)
+        return entry
+
+    async def iter_messages(self, max_messages: int | None = None, page_size: int = 50) -> AsyncIterator[ChatMessage]:
+        """Iterate over stored messages oldest first, fetching and deserializing one page at a time.
+
+        Pages are read by index, so messages trimmed by a concurrent writer while iterating may be
+        skipped and messages appended meanwhile are included.
+
+        Args:
+            max_messages: Only iterate over this many of the newest messages.
+            page_size: Number of messages fetched per round trip.
+        """
+        start = 0
+        if max_messages:
+            start = max(await self._redis_client.llen(self.redis_key) - max_messages, 0)
 
-        return messages
+        while True:
+            page = await self._redis_client.lrange(self.redis_key, start, start + page_size - 1)
+            for serialized_message in page:
+                yield self._deserialize_message(serialized_message)
+            if len(page) < page_size:
+                return
+            start += page_size
 
     async def serialize_state(self, **kwargs: Any) -> Any:
         """Serialize the current store state for persistence.
@@ -119,6 +660,10 @@ class RedisChatMessageStore:
             key_prefix=self.key_prefix,
             max_messages=self.max_messages,
             redis_psw=self.redis_psw,
+            redis_port=self.redis_port,
+            history_window=self.history_window,
+            history_window_bytes=self.history_window_bytes,
+            max_tokens=self.max_tokens,
         )
         return state.model_dump(**kwargs)
 
@@ -134,68 +679,403 @@ class RedisChatMessageStore:
             self.thread_id = state.thread_id
             self.key_prefix = state.key_prefix
             self.max_messages = state.max_messages
+            self.history_window = state.history_window
+            self.history_window_bytes = state.history_window_bytes
+            self.max_tokens = state.max_tokens
+
+            # Switch to the shared pool of the stored endpoint if it differs from ours
+            endpoint = (state.redis_url, state.redis_port, state.redis_psw)
+            if state.redis_url and endpoint != (self.redis_url, self.redis_port, self.redis_psw):
+                self.redis_url, self.redis_port, self.redis_psw = endpoint
+                self._connect()
+
+    def _serialize_message(self, message: ChatMessage) -> bytes | str:
+        """Serialize a ChatMessage with the store's codec."""
+        return self.codec.encode(message)
+
+    def _deserialize_message(self, serialized_message: bytes | str) -> ChatMessage:
+        """Deserialize a stored entry to ChatMessage."""
+        return self.codec.decode(serialized_message)
+
+    async def clear(self) -> None:
+        """Remove all messages from the store."""
+        # Versions come from a prefix-wide sequence and are never reused, so the version key can go too
+        async with self._redis_client.pipeline(transaction=True) as pipe:
+            pipe.delete(self.redis_key, self.version_key, *self.token_keys)
+            pipe.zrem(self.index_keys[0], self.thread_id)
+            await pipe.execute()
+        if self.near_cache is not None:
+            self.near_cache.discard(self.redis_key)
+
+    async def aclose(self) -> None:
+        """Release this store's client. The shared pool stays open for other stores."""
+        await self._redis_client.aclose()
+
+
+class RedisThreadIndex:
+    """Bulk operations over all RedisChatMessageStore threads sharing one key prefix.
+
+    Every append records the thread's last activity time in a sorted set (``<key_prefix>:__index__:activity``),
+    so hot and cold threads are found with one range query instead of a SCAN over the keyspace.
+    Expiry and export work in batches, each batch costing a constant number of round trips.
+    """
+
+    def __init__(
+        self,
+        redis_url: str,
+        key_prefix: str = "chat_messages",
+        redis_psw: str | None = None,
+        redis_port: int = 13635,
+        codec: MessageCodec | None = None,
+    ) -> None:
+        """Initialize the index.
+
+        Args:
+            redis_url: Redis connection URL or bare host name, as passed to the stores.
+            key_prefix: Key prefix of the stores to operate on.
+            redis_psw: Password for the "default" Redis user.
+            redis_port: Port used when redis_url is a bare host name.
+            codec: Codec used to decode exported messages. Defaults to MsgpackMessageCodec.
+        """
+        self.key_prefix = key_prefix
+        self.codec = codec or MsgpackMessageCodec()
+        self._redis_client = redis_pools.get_client(
+            redis_url, port=redis_port, password=redis_psw, decode_responses=False
+        )
+        self._expire_script = self._redis_client.register_script(EXPIRE_IF_IDLE_SCRIPT)
+
+    @property
+    def activity_key(self) -> str:
+        """Get the Redis key of the sorted set of thread IDs scored by last activity."""
+        return index_key(self.key_prefix, "activity")
+
+    def thread_keys(self, thread_id: str) -> list[str]:
+        """Get the Redis keys of one thread: messages, version, token estimates and token total."""
+        redis_key = f"{self.key_prefix}:{thread_id}"
+        return [redis_key, f"{redis_key}:version", f"{redis_key}:tokens", f"{redis_key}:token_total"]
+
+    async def hot_threads(self, limit: int = 100, active_within: float | None = None) -> list[tuple[str, float]]:
+        """Return the most recently active threads, newest first.
+
+        Args:
+            limit: Maximum number of threads to return.
+            active_within: Only return threads with activity in the last this many seconds.
+
+        Returns:
+            List of (thread_id, last activity as a Unix timestamp) pairs.
+        """
+        minimum = "-inf" if active_within is None else time.time() - active_within
+        threads = await self._redis_client.zrevrangebyscore(
+            self.activity_key, "+inf", minimum, start=0, num=limit, withscores=True
+        )
+        return [(thread_id.decode(), score) for thread_id, score in threads]
+
+    async def cold_threads(self, idle_for: float, limit: int = 1000) -> list[str]:
+        """Return up to limit threads without activity in the last idle_for seconds, oldest first."""
+        threads = await self._redis_client.zrangebyscore(
+            self.activity_key, "-inf", time.time() - idle_for, start=0, num=limit
+        )
+        return [thread_id.decode() for thread_id in threads]
+
+    async def export_threads(self, thread_ids: Sequence[str]) -> dict[str, list[ChatMessage]]:
+        """Read the full history of many threads in one pipelined round trip.
+
+        Args:
+            thread_ids: Threads to export. Threads without stored messages map to an empty list.
+
+        Returns:
+            Mapping of thread ID to its messages in chronological order.
+        """
+        async with self._redis_client.pipeline(transaction=False) as pipe:
+            for thread_id in thread_ids:
+                pipe.lrange(self.thread_keys(thread_id)[0], 0, -1)
+            histories = await pipe.execute()
+        return {
+            thread_id: [self.codec.decode(entry) for entry in entries]
+            for thread_id, entries in zip(thread_ids, histories)
+        }
+
+    async def expire_cold_threads(
+        self,
+        idle_for: float,
+        batch_size: int = 500,
+        archive: Callable[[dict[str, list[ChatMessage]]], Awaitable[None]] | None = None,
+    ) -> int:
+        """Delete every thread without activity in the last idle_for seconds, one batch at a time.
+
+        Each thread is deleted server side only if it is still idle, so a conversation resumed while
+        the batch was in flight keeps its history (and stays in the index for the next run).
+
+        Args:
+            idle_for: Seconds without an append after which a thread is expired.
+            batch_size: Number of threads selected, archived and deleted per batch.
+            archive: Optional coroutine receiving each batch as exported by export_threads before it
+                    is deleted, for example to write it to blob storage. If it raises, the batch is kept.
+
+        Returns:
+            The number of threads deleted.
+        """
+        cutoff = time.time() - idle_for
+        deleted = 0
+        while True:
+            thread_ids = [
+                thread_id.decode()
+                for thread_id in await self._redis_client.zrangebyscore(
+                    self.activity_key, "-inf", cutoff, start=0, num=batch_size
+                )
+            ]
+            if not thread_ids:
+                return deleted
+            if archive is not None:
+                await archive(await self.export_threads(thread_ids))
+
+            async with self._redis_client.pipeline(transaction=False) as pipe:
+                for thread_id in thread_ids:
+                    await self._expire_script(
+                        keys=[self.activity_key, *self.thread_keys(thread_id)], args=[thread_id, cutoff], client=pipe
+                    )
+                results = await pipe.execute()
+            # Expired threads left the index and resumed ones moved past the cutoff, so the next
+            # range query starts at the following batch
+            deleted += sum(results)
+
+    async def aclose(self) -> None:
+        """Release this index's client. The shared pool stays open for the stores."""
+        await self._redis_client.aclose()
+
+
+class RedisStreamStoreState(BaseModel):
+    """State model for serializing and deserializing Redis stream chat message store data."""
+
+    thread_id: str
+    redis_url: str | None = None
+    key_prefix: str = "chat_stream"
+    max_messages: int | None = None
+    redis_psw: str | None = None
+    redis_port: int = 13635
+
+
+class RedisStreamChatMessageStore:
+    """Redis Streams backed implementation of ChatMessageStore for multi-replica deployments.
+
+    Every message is one stream entry (XADD with MAXLEN trimming). The store keeps a local copy of the
+    history and the ID of the last entry it has seen, so each read only transfers and deserializes
+    entries written since then, whichever replica wrote them. tail() blocks on the stream to follow a
+    conversation live.
+    """
+
+    def __init__(
+        self,
+        redis_url: str | None = None,
+        thread_id: str | None = None,
+        key_prefix: str = "chat_stream",
+        max_messages: int | None = None,
+        redis_psw: str | None = None,
+        redis_port: int = 13635,
+        codec: MessageCodec | None = None,
+    ) -> None:
+        """Initialize the Redis stream chat message store.
+
+        Args:
+            redis_url: Redis host name or connection URL (for example, "redis://localhost:6379").
+            thread_id: Unique identifier for this conversation thread.
+                      If not provided, a UUID will be auto-generated.
+            key_prefix: Prefix for Redis keys to namespace different applications.
+            max_messages: Maximum number of messages to retain. Redis trims the stream approximately,
+                         so reads return at most this many of the newest messages.
+            redis_psw: Password for the "default" Redis user.
+            redis_port: Port used when redis_url is a bare host name.
+            codec: How messages are encoded in the stream. Defaults to MsgpackMessageCodec.
+        """
+        if redis_url is None:
+            raise ValueError("redis_url is required for Redis connection")
+
+        self.redis_url = redis_url
+        self.thread_id = thread_id or f"thread_{uuid4()}"
+        self.key_prefix = key_prefix
+        self.max_messages = max_messages
+        self.redis_psw = redis_psw
+        self.redis_port = redis_port
+        self.codec = codec or MsgpackMessageCodec()
+        # Local copy of the stream and the ID of the newest entry in it
+        self.last_id = "0-0"
+        self._messages: list[ChatMessage] = []
+        self._connect()
 
-            # Recreate Redis client if the URL changed
-            if state.redis_url and state.redis_url != self.redis_url:
-                self.redis_url = state.redis_url
-                self._redis_client = redis.from_url(self.redis_url, decode_responses=True)
+    def _connect(self) -> None:
+        """Point this store at the shared pool for its current endpoint and credentials."""
+        self._redis_client = redis_pools.get_client(
+            self.redis_url, port=self.redis_port, password=self.redis_psw, decode_responses=False
+        )
+
+    @property
+    def redis_key(self) -> str:
+        """Get the Redis key for this thread's stream."""
+        return f"{self.key_prefix}:{self.thread_id}"
+
+    async def add_messages(self, messages: Sequence[ChatMessage]) -> list[str]:
+        """Append messages to the stream in one round trip.
+
+        Args:
+            messages: Sequence of ChatMessage objects to add to the store.
+
+        Returns:
+            The stream IDs assigned to the messages.
+        """
+        if not messages:
+            return []
+
+        async with self._redis_client.pipeline(transaction=True) as pipe:
+            for message in messages:
+                pipe.xadd(
+                    self.redis_key,
+                    {"m": self.codec.encode(message)},
+                    maxlen=self.max_messages,
+                    approximate=True,
+                )
+            ids = await pipe.execute()
+        return [entry_id.decode() for entry_id in ids]
+
+    async def list_messages(self) -> list[ChatMessage]:
+        """Get the thread's messages in chronological order, fetching only entries not seen yet.
+
+        Returns:
+            List of ChatMessage objects in chronological order (oldest first).
+        """
+        await self.read_since()
+        if self.max_messages is not None:
+            return self._messages[-self.max_messages:]
+        return list(self._messages)
+
+    async def read_since(self, last_id: str | None = None, count: int | None = None) -> list[ChatMessage]:
+        """Fetch entries written after last_id and add them to the local copy.
+
+        Args:
+            last_id: Stream ID to read after. Defaults to the newest entry already seen.
+            count: Fetch at most this many entries.
+
+        Returns:
+            The newly read messages in chronological order.
+        """
+        if last_id is not None and last_id != self.last_id:
+            # Reading from an arbitrary position invalidates the local copy
+            self.last_id, self._messages = last_id, []
+
+        async with self._redis_client.pipeline(transaction=True) as pipe:
+            pipe.xread({self.redis_key: self.last_id}, count=count)
+            pipe.xlen(self.redis_key)
+            response, length = await pipe.execute()
+        new_messages = self._apply(response)
+
+        if len(self._messages) > length:
+            # Entries we had were trimmed or the stream was cleared by another writer
+            del self._messages[: len(self._messages) - length]
+        elif len(self._messages) < length and last_id is None and count is None:
+            # Older entries exist that the local copy never saw, so rebuild it from the start
+            self.last_id, self._messages = "0-0", []
+            return await self.read_since()
+        return new_messages
+
+    async def tail(self, block_ms: int = 5000) -> AsyncIterator[ChatMessage]:
+        """Follow the stream, yielding messages as any replica appends them.
+
+        Each wait blocks one pooled connection for up to block_ms, so size the pool for the number
+        of concurrent tails.
+
+        Args:
+            block_ms: How long a single XREAD waits for new entries before polling again.
+        """
+        while True:
+            response = await self._redis_client.xread({self.redis_key: self.last_id}, block=block_ms)
+            for message in self._apply(response):
+                yield message
+
+    def _apply(self, response: Any) -> list[ChatMessage]:
+        """Deserialize an XREAD response, append it to the local copy and advance the cursor."""
+        new_messages: list[ChatMessage] = []
+        for _, entries in response or []:
+            for entry_id, fields in entries:
+                new_messages.append(self.codec.decode(fields[b"m"]))
+                self.last_id = entry_id.decode()
+        self._messages.extend(new_messages)
+        return new_messages
+
+    async def serialize_state(self, **kwargs: Any) -> Any:
+        """Serialize the current store state for persistence.
+
+        Returns:
+            Dictionary containing serialized store configuration.
+        """
+        state = RedisStreamStoreState(
+            thread_id=self.thread_id,
+            redis_url=self.redis_url,
+            key_prefix=self.key_prefix,
+            max_messages=self.max_messages,
+            redis_psw=self.redis_psw,
+            redis_port=self.redis_port,
+        )
+        return state.model_dump(**kwargs)
+
+    async def deserialize_state(self, serialized_store_state: Any, **kwargs: Any) -> None:
+        """Deserialize state data into this store instance.
 
-    def _serialize_message(self, message: ChatMessage) -> str:
-        """Serialize a ChatMessage to JSON string."""
-        message_dict = message.model_dump()
-        return json.dumps(message_dict, separators=(",", ":"))
+        Args:
+            serialized_store_state: Previously serialized state data.
+            **kwargs: Additional arguments for deserialization.
+        """
+        if serialized_store_state:
+            state = RedisStreamStoreState.model_validate(serialized_store_state, **kwargs)
+            self.thread_id = state.thread_id
+            self.key_prefix = state.key_prefix
+            self.max_messages = state.max_messages
+            self.last_id, self._messages = "0-0", []
 
-    def _deserialize_message(self, serialized_message: str) -> ChatMessage:
-        """Deserialize a JSON string to ChatMessage."""
-        message_dict = json.loads(serialized_message)
-        return ChatMessage.model_validate(message_dict)
+            endpoint = (state.redis_url, state.redis_port, state.redis_psw)
+            if state.redis_url and endpoint != (self.redis_url, self.redis_port, self.redis_psw):
+                self.redis_url, self.redis_port, self.redis_psw = endpoint
+                self._connect()
 
     async def clear(self) -> None:
         """Remove all messages from the store."""
         await self._redis_client.delete(self.redis_key)
+        self.last_id, self._messages = "0-0", []
 
     async def aclose(self) -> None:
-        """Close the Redis connection."""
+        """Release this store's client. The shared pool stays open for other stores."""
         await self._redis_client.aclose()
 
 async def main():
-    async with AzureCliCredential() as credential:
-        # Create the project client from the endpoint
-        project_client = AIProjectClient(
-            endpoint=os.environ["AZURE_AI_PROJECT_ENDPOINT"],
-            credential=credential
+    load_environment()
+    # Create the agent with the process's shared client
+    async with ChatAgent(
+        chat_client=agent_client(),
+        instructions="You are a helpful assistant that can analyze images and describe what you see.",
+         chat_message_store_factory=lambda: RedisChatMessageStore(
+            redis_url=os.environ["REDIS_ENDPOINT"],
+            max_tokens=16_000,
+            redis_psw=os.environ["REDIS_PASSWORD"]
         )
+    ) as agent:
+        # Create a thread that uses the message store (not service_thread_id)
+        thread = agent.get_new_thread(use_message_store=True)
         
-        # Create the agent with the project client
-        async with ChatAgent(
-            chat_client=AzureAIAgentClient(
-                project_client=project_client, 
-                model_deployment_name=os.environ["AZURE_AI_MODEL_DEPLOYMENT_NAME"],
-                async_credential=credential
-            ),
-            instructions="You are a helpful assistant that can analyze images and describe what you see.",
-             chat_message_store_factory=lambda: RedisChatMessageStore(
-                redis_url=os.environ["REDIS_ENDPOINT"],
-                max_messages=100,
-                redis_psw=os.environ["REDIS_PASSWORD"]
-            )
-        ) as agent:
-            # Create a thread that uses the message store (not service_thread_id)
-            thread = agent.get_new_thread(use_message_store=True)
+        print("Chat started! Type 'end' to exit.\n")
+        
+        while True:
+            user_input = input("You: ")
             
-            print("Chat started! Type 'end' to exit.\n")
+            if user_input.lower() == "end":
+                print("Goodbye!")
+                break
             
-            while True:
-                user_input = input("You: ")
-                
-                if user_input.lower() == "end":
-                    print("Goodbye!")
-                    break
-                
-                if not user_input.strip():
-                    continue
-                
-                result = await agent.run(user_input, thread=thread)
-                print(f"Assistant: {result.text}\n")
-
-asyncio.run(main())
\ No newline at end of file
+            if not user_input.strip():
+                continue
+            
+            # Print the reply as it is generated instead of waiting for the full text
+            print("Assistant: ", end="", flush=True)
+            async for update in agent.run_stream(user_input, thread=thread):
+                print(update.text, end="", flush=True)
+            print("\n")
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -1,46 +1,32 @@
 import asyncio
-from agent_framework import ChatAgent
-from agent_framework.azure import AzureAIAgentClient
-from azure.identity.aio import AzureCliCredential
-from azure.ai.projects.aio import AIProjectClient
-import os
-from pathlib import Path
-from dotenv import load_dotenv
-from agent_framework import ChatMessage, TextContent, UriContent, Role
+from bootstrap import agent_client, load_environment, warm_up
 
-# Load .env file from the parent directory
-script_dir = Path(__file__).parent
-load_dotenv(script_dir.parent / "maf.env")
-print(f"Using endpoint: {os.environ['AZURE_AI_PROJECT_ENDPOINT']}")
+load_environment()
 
-credential = AzureCliCredential()
-project_client = AIProjectClient(
-            endpoint=os.environ["AZURE_AI_PROJECT_ENDPOINT"],
-            credential=credential
-        )
+IMAGE_URL = "https://upload.wikimedia.org/wikipedia/commons/thumb/d/dd/Gfp-wisconsin-madison-the-nature-boardwalk.jpg/2560px-Gfp-wisconsin-madison-the-nature-boardwalk.jpg"
 
-agent = ChatAgent(
-            chat_client=AzureAIAgentClient(
-                project_client=project_client, 
-                model_deployment_name=os.environ["AZURE_AI_MODEL_DEPLOYMENT_NAME"],
-                async_credential=credential
-            ),
-            instructions="You are a helpful assistant that can analyze images and describe what you see."
-        )
+async def main():
+    # Imports the SDK on a thread while the first token is fetched
+    await warm_up()
+    from agent_framework import ChatAgent, ChatMessage, TextContent, Role
+    from image_cache import ImagePreprocessor
 
-message = ChatMessage(
-    role=Role.USER,
-    contents=[
-        TextContent(text="What do you see in this image?"),
-        UriContent(
-            uri="https://upload.wikimedia.org/wikipedia/commons/thumb/d/dd/Gfp-wisconsin-madison-the-nature-boardwalk.jpg/2560px-Gfp-wisconsin-madison-the-nature-boardwalk.jpg",
-            media_type="image/jpeg"
-        )
-    ]
-)
+    agent = ChatAgent(
+                chat_client=agent_client(),
+                instructions="You are a helpful assistant that can analyze images and describe what you see."
+            )
+
+    message = ChatMessage(
+        role=Role.USER,
+        contents=[
+            TextContent(text="What do you see in this image?"),
+            # Downscaled and sent inline, instead of the service fetching the full 2560px image on every call
+            await ImagePreprocessor().prepare(IMAGE_URL)
+        ]
+    )
 
-async def main():
     result = await agent.run(message)
     print(result.text)
 
-asyncio.run(main())
\ No newline at end of file
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,297 @@
+import copy
+import time
+from collections.abc import Awaitable, Callable, Iterator, Sequence
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from fnmatch import fnmatchcase
+from typing import Any
+
+from agent_framework import (
+    AgentRunResponse,
+    AgentThread,
+    ChatAgent,
+    ChatContext,
+    ChatMessage,
+    ChatMiddleware,
+    FunctionApprovalRequestContent,
+    FunctionApprovalResponseContent,
+    FunctionCallContent,
+    Role,
+)
+
+"""
+Remembered approval decisions for tools with approval_mode="always_require".
+
+Every call of such a tool normally stops the agent run with an approval request, waits for a human,
+and needs a second run to execute the approved call. ApprovalPolicy remembers decisions per session
+or globally, keyed by function name and argument values or patterns, with an expiry, and can consult pluggable
+rules first. ApprovalPolicyMiddleware applies it inside the run: when every approval-required call of
+a model response is already approved, the calls execute right away like any other tool call.
+run_with_approvals answers the approval requests that remain, from the policy or from a human.
+"""
+
+# Returns True to approve, False to reject, None to leave the call to other rules and the human
+ApprovalRule = Callable[[str, dict[str, Any]], bool | None]
+
+_current_session: ContextVar[str | None] = ContextVar("approval_session", default=None)
+
+
+@dataclass
+class ApprovalDecision:
+    """A remembered answer for the calls of one function whose arguments match the patterns."""
+
+    function: str
+    # Argument name -> fnmatch pattern of its value as a string. Arguments not listed match anything.
+    arguments: dict[str, str]
+    approved: bool
+    # None applies to every session
+    session_id: str | None
+    # On the monotonic clock, None never expires
+    expires_at: float | None
+
+    def matches(self, function: str, arguments: dict[str, Any]) -> bool:
+        if function != self.function:
+            return False
+        return all(
+            name in arguments and fnmatchcase(str(arguments[name]), pattern) for name, pattern in self.arguments.items()
+        )
+
+
+@dataclass
+class ApprovalStats:
+    """Counters of an ApprovalPolicy."""
+
+    approved: int
+    rejected: int
+    # Calls no rule or remembered decision covered, left to a human
+    undecided: int
+    decisions: int
+
+
+class ApprovalPolicy:
+    """Approval rules and remembered decisions for tools that require approval.
+
+    decide() asks the rules in order, then the remembered decisions: those of the current session
+    before global ones, the most recent first. Use session() to set the current session of a run.
+    """
+
+    def __init__(self, rules: Sequence[ApprovalRule] = (), default_ttl: float | None = 3600) -> None:
+        """Initialize the policy.
+
+        Args:
+            rules: Callables given the function name and arguments, consulted before remembered decisions.
+            default_ttl: Seconds a remembered decision lasts unless remember() says otherwise. None keeps it.
+        """
+        self.rules = list(rules)
+        self.default_ttl = default_ttl
+        self.approved = 0
+        self.rejected = 0
+        self.undecided = 0
+        self._decisions: list[ApprovalDecision] = []
+
+    @contextmanager
+    def session(self, session_id: str) -> Iterator[None]:
+        """Make session_id the current session for decisions taken inside the block."""
+        token = _current_session.set(session_id)
+        try:
+            yield
+        finally:
+            _current_session.reset(token)
+
+    def remember(
+        self,
+        function: str,
+        arguments: dict[str, Any] | None = None,
+        approved: bool = True,
+        scope: str = "session",
+        session_id: str | None = None,
+        ttl: float | None | str = "default",
+        patterns: dict[str, str] | None = None,
+    ) -> ApprovalDecision:
+        """Remember an answer for future calls of function.
+
+        Args:
+            function: Name of the function.
+            arguments: Argument values that match exactly, wildcards included, as in the call a user answered.
+                      None matches any arguments.
+            approved: Whether matching calls are approved or rejected.
+            scope: "session" for the given or current session only, "global" for every session.
+            session_id: Session of a session decision. Defaults to the current session.
+            ttl: Seconds the decision lasts, None to keep it, "default" for default_ttl.
+            patterns: fnmatch patterns like {"location": "Seattle*"} for rules written in code. Never pass
+                     values from a model or a user here. A pattern replaces an argument of the same name.
+
+        Returns:
+            The stored decision.
+        """
+        if scope == "global":
+            session_id = None
+        elif scope == "session":
+            session_id = session_id or _current_session.get()
+            if session_id is None:
+                raise ValueError("A session decision needs a session_id or a current session")
+        else:
+            raise ValueError(f"Unknown scope {scope!r}, expected 'session' or 'global'")
+        if ttl == "default":
+            ttl = self.default_ttl
+        # Values from a call are escaped, so an argument like "*" approves only "*" and not every value
+        matchers = {name: _escape(str(value)) for name, value in (arguments or {}).items()}
+        matchers.update(patterns or {})
+        decision = ApprovalDecision(
+            function=function,
+            arguments=matchers,
+            approved=approved,
+            session_id=session_id,
+            expires_at=None if ttl is None else time.monotonic() + ttl,
+        )
+        self._decisions.append(decision)
+        return decision
+
+    def forget(self, function: str | None = None, session_id: str | None = None) -> None:
+        """Drop remembered decisions, optionally only those of one function and/or one session."""
+        self._decisions = [
+            decision
+            for decision in self._decisions
+            if not (
+                (function is None or decision.function == function)
+                and (session_id is None or decision.session_id == session_id)
+            )
+        ]
+
+    def decide(self, function: str, arguments: dict[str, Any], session_id: str | None = None) -> bool | None:
+        """Return True or False for a call covered by a rule or a remembered decision, else None."""
+        decision = self._decide(function, arguments, session_id or _current_session.get())
+        if decision is None:
+            self.undecided += 1
+        elif decision:
+            self.approved += 1
+        else:
+            self.rejected += 1
+        return decision
+
+    def _decide(self, function: str, arguments: dict[str, Any], session_id: str | None) -> bool | None:
+        for rule in self.rules:
+            decision = rule(function, arguments)
+            if decision is not None:
+                return decision
+
+        now = time.monotonic()
+        self._decisions = [d for d in self._decisions if d.expires_at is None or now < d.expires_at]
+        for scope in (session_id, None) if session_id is not None else (None,):
+            for decision in reversed(self._decisions):
+                if decision.session_id == scope and decision.matches(function, arguments):
+                    return decision.approved
+        return None
+
+    def resolve(
+        self, request: FunctionApprovalRequestContent, session_id: str | None = None
+    ) -> FunctionApprovalResponseContent | None:
+        """Answer an approval request from the policy, or return None if a human has to."""
+        call = request.function_call
+        decision = self.decide(call.name, call.parse_arguments() or {}, session_id)
+        return None if decision is None else request.create_response(decision)
+
+    def stats(self) -> ApprovalStats:
+        """Return the current counters."""
+        return ApprovalStats(
+            approved=self.approved,
+            rejected=self.rejected,
+            undecided=self.undecided,
+            decisions=len(self._decisions),
+        )
+
+
+def _escape(value: str) -> str:
+    """Escape fnmatch wildcards so value only matches itself."""
+    return "".join(f"[{char}]" if char in "*?[" else char for char in value)
+
+
+class ApprovalPolicyMiddleware(ChatMiddleware):
+    """Chat middleware running approval-required calls without a round trip when the policy approves them.
+
+    It looks at every model response of a run before the framework does. If the policy approves all
+    approval-required calls in it, those tools are swapped for copies that do not require approval, for
+    that response only. Otherwise nothing changes and the run returns approval requests as usual, for the
+    caller to answer with ApprovalPolicy.resolve or a human. Streaming runs are passed through unchanged.
+    """
+
+    def __init__(self, policy: ApprovalPolicy) -> None:
+        self.policy = policy
+        # id of a copy without approval -> the original tool
+        self._originals: dict[int, Any] = {}
+        # name -> (original, copy without approval)
+        self._copies: dict[str, tuple[Any, Any]] = {}
+
+    def _without_approval(self, tool: Any) -> Any:
+        original, approved_copy = self._copies.get(tool.name, (None, None))
+        if original is not tool:
+            approved_copy = copy.copy(tool)
+            approved_copy.approval_mode = "never_require"
+            self._copies[tool.name] = (tool, approved_copy)
+            self._originals[id(approved_copy)] = tool
+        return approved_copy
+
+    async def process(
+        self,
+        context: ChatContext,
+        next: Callable[[ChatContext], Awaitable[None]],
+    ) -> None:
+        options = context.chat_options
+        if options.tools:
+            # Undo the swap made for the previous response of this run, so its calls are decided again
+            options.tools = [self._originals.get(id(tool), tool) for tool in options.tools]
+        await next(context)
+        if context.is_streaming or not options.tools or not context.result or not context.result.messages:
+            return
+
+        approval_tools = {
+            tool.name: tool for tool in options.tools if getattr(tool, "approval_mode", None) == "always_require"
+        }
+        calls = [
+            content
+            for content in context.result.messages[0].contents
+            if isinstance(content, FunctionCallContent) and content.name in approval_tools
+        ]
+        if not calls:
+            return
+        session_id = _current_session.get()
+        # Counted only when applied. Otherwise the caller resolves the approval requests, which counts them.
+        decisions = [self.policy._decide(call.name, call.parse_arguments() or {}, session_id) for call in calls]
+        if all(decisions):
+            self.policy.approved += len(calls)
+            approved = {call.name for call in calls}
+            options.tools = [
+                self._without_approval(tool) if getattr(tool, "name", None) in approved else tool
+                for tool in options.tools
+            ]
+
+
+async def run_with_approvals(
+    agent: ChatAgent,
+    text: str,
+    thread: AgentThread,
+    policy: ApprovalPolicy,
+    ask: Callable[[FunctionApprovalRequestContent], Awaitable[bool]],
+) -> AgentRunResponse:
+    """Run one user turn, answering approval requests from the policy and asking a human for the rest.
+
+    Args:
+        agent: An agent with an ApprovalPolicyMiddleware for policy.
+        text: The user's message.
+        thread: The conversation thread.
+        policy: Answers requests it has a rule or a remembered decision for.
+        ask: Asks a human about one request and returns whether it is approved. It may remember the answer.
+
+    Returns:
+        The response of the last run, without approval requests.
+    """
+    result = await agent.run(text, thread=thread)
+    while result.user_input_requests:
+        # The thread already holds the user's message and the requests, so only the answers are sent
+        responses = [
+            policy.resolve(request) or request.create_response(await ask(request))
+            for request in result.user_input_requests
+        ]
+        result = await agent.run(ChatMessage(role=Role.USER, contents=responses), thread=thread)
+    return result
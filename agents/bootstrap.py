@@ -0,0 +1,161 @@
+import asyncio
+import importlib
+import os
+import threading
+from collections.abc import Sequence
+from pathlib import Path
+from typing import TYPE_CHECKING, Any
+
+from dotenv import load_dotenv
+
+from credential_cache import shared_credential
+
+if TYPE_CHECKING:
+    from agent_framework import BaseChatClient
+    from azure.ai.projects.aio import AIProjectClient
+
+    from chat_replay import ChatRecording
+
+"""
+Shared startup code for the samples: environment, lazy SDK imports and cached clients.
+
+Importing agent_framework, the Azure AI agent client and azure.ai.projects takes around two seconds,
+which dominates the cold start of a short-lived worker. This module imports none of them. Names in
+LAZY_NAMES are imported on first attribute access (bootstrap.ChatAgent), preload() imports the SDK on
+a background thread, and warm_up() overlaps that with fetching the first token. project_client() and
+agent_client() hand out clients of the process's ClientRegistry, on the shared credential and one
+connection pool.
+
+With AGENT_CHAT_RECORD set to a file, agent_client() records every model response to it. With
+AGENT_CHAT_REPLAY set to a recording, it serves the responses from it instead, so samples and workflows
+run offline, with no endpoint or credential. AGENT_CHAT_REPLAY_LATENCY sets their latency, see
+chat_replay.parse_latency.
+"""
+
+# The SDK modules an agent needs, slowest first
+SDK_MODULES = ("agent_framework_azure_ai", "azure.ai.projects.aio", "agent_framework")
+
+# Scope of the tokens the Azure AI project and agent clients ask for
+TOKEN_SCOPE = "https://ai.azure.com/.default"
+
+# Attribute of this module -> module it is imported from on first use
+LAZY_NAMES = {
+    "ChatAgent": "agent_framework",
+    "ChatMessage": "agent_framework",
+    "Role": "agent_framework",
+    "AzureAIAgentClient": "agent_framework.azure",
+    "AIProjectClient": "azure.ai.projects.aio",
+}
+
+_environment_loaded = False
+_recordings: dict[str, "ChatRecording"] = {}
+_preload_thread: threading.Thread | None = None
+_preload_error: BaseException | None = None
+
+
+def __getattr__(name: str) -> Any:
+    module = LAZY_NAMES.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module), name)
+    # Cache it, so later lookups do not come back here
+    globals()[name] = value
+    return value
+
+
+def load_environment() -> str:
+    """Load maf.env from the repository root once and return the project endpoint."""
+    global _environment_loaded
+    if not _environment_loaded:
+        load_dotenv(Path(__file__).parent.parent / "maf.env")
+        if os.environ.get("AGENT_CHAT_REPLAY"):
+            print(f"Replaying chat responses from {os.environ['AGENT_CHAT_REPLAY']}")
+        else:
+            print(f"Using endpoint: {os.environ['AZURE_AI_PROJECT_ENDPOINT']}")
+        _environment_loaded = True
+    return os.environ.get("AZURE_AI_PROJECT_ENDPOINT", "")
+
+
+def preload(modules: Sequence[str] = SDK_MODULES) -> threading.Thread:
+    """Start importing modules on a background thread. Only the first call starts one.
+
+    Python's per-module import locks make this safe: a thread importing one of them meanwhile
+    waits for the preload to finish that module instead of importing it twice.
+    """
+    global _preload_thread
+
+    def run() -> None:
+        global _preload_error
+        try:
+            for module in modules:
+                importlib.import_module(module)
+        except BaseException as ex:
+            _preload_error = ex
+
+    if _preload_thread is None:
+        _preload_thread = threading.Thread(target=run, name="preload", daemon=True)
+        _preload_thread.start()
+    return _preload_thread
+
+
+def wait_for_preload() -> None:
+    """Block until preload() is done, raising the error it failed with, if any."""
+    if _preload_thread is not None:
+        _preload_thread.join()
+    if _preload_error is not None:
+        raise _preload_error
+
+
+async def warm_up(scopes: Sequence[str] = (TOKEN_SCOPE,)) -> None:
+    """Import the SDK on a thread while the first token is fetched, so startup pays for the slower one only."""
+    load_environment()
+    preload()
+    if os.environ.get("AGENT_CHAT_REPLAY"):
+        # Nothing is sent to the service
+        await asyncio.to_thread(wait_for_preload)
+        return
+    await asyncio.gather(asyncio.to_thread(wait_for_preload), shared_credential().get_token(*scopes))
+
+
+def project_client() -> "AIProjectClient":
+    """Return the process's AIProjectClient for the endpoint in AZURE_AI_PROJECT_ENDPOINT."""
+    from client_registry import get_registry
+
+    load_environment()
+    return get_registry().project_client()
+
+
+def agent_client(model_deployment_name: str | None = None) -> "BaseChatClient":
+    """Return a new AzureAIAgentClient for one agent, on the process's AIProjectClient and connection pool.
+
+    The agent it creates on its first run is kept and reused by later processes with the same definition,
+    unless AGENT_DEFINITION_CACHE is 0. See agent_definition_cache. With AGENT_CHAT_RECORD set, the client
+    is wrapped in a RecordingChatClient, with AGENT_CHAT_REPLAY set a ReplayChatClient is returned instead.
+
+    Args:
+        model_deployment_name: Defaults to AZURE_AI_MODEL_DEPLOYMENT_NAME.
+    """
+    load_environment()
+    if replay_path := os.environ.get("AGENT_CHAT_REPLAY"):
+        from chat_replay import ReplayChatClient, parse_latency
+
+        latency = parse_latency(os.environ.get("AGENT_CHAT_REPLAY_LATENCY", "recorded"))
+        return ReplayChatClient(_recording(replay_path), latency=latency)
+
+    from client_registry import get_registry
+
+    client = get_registry().agent_client(model_deployment_name)
+    if record_path := os.environ.get("AGENT_CHAT_RECORD"):
+        from chat_replay import RecordingChatClient
+
+        return RecordingChatClient(client, _recording(record_path))
+    return client
+
+
+def _recording(path: str) -> "ChatRecording":
+    # One per file, so the clients of a process append to the same file object and share its replay turns
+    from chat_replay import ChatRecording
+
+    if path not in _recordings:
+        _recordings[path] = ChatRecording(path)
+    return _recordings[path]
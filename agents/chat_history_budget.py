@@ -0,0 +1,143 @@
+import json
+from collections import deque
+from collections.abc import MutableMapping, Sequence
+from typing import Any
+
+from agent_framework import (
+    ChatMessage,
+    ChatMessageStore,
+    DataContent,
+    FunctionCallContent,
+    FunctionResultContent,
+    TextContent,
+    UriContent,
+)
+
+"""
+Token budget helpers shared by the chat history samples.
+
+Trimming history by message count lets prompt sizes swing widely, because one tool result can be
+larger than dozens of short turns. These helpers estimate the prompt tokens of each message once,
+when it is stored, so a store can keep a running total and trim the oldest messages against a
+token budget without ever re-measuring the rest of the history.
+
+Any window over the tail of a history, by count, bytes or tokens, can cut between a function call and
+its result. drop_orphan_results removes the results left without their call at the start.
+"""
+
+# Rough average for English text and JSON with GPT tokenizers
+CHARS_PER_TOKEN = 4
+# Role and separator tokens the chat format adds around every message
+MESSAGE_OVERHEAD_TOKENS = 4
+# Cost of one image input at the default detail level
+IMAGE_TOKENS = 765
+
+
+def estimate_tokens(message: ChatMessage) -> int:
+    """Estimate how many prompt tokens a message costs, without running a tokenizer."""
+    chars = 0
+    tokens = MESSAGE_OVERHEAD_TOKENS
+    for content in message.contents:
+        if isinstance(content, TextContent):
+            chars += len(content.text)
+        elif isinstance(content, FunctionCallContent):
+            arguments = content.arguments
+            chars += len(content.name) + len(arguments if isinstance(arguments, str) else json.dumps(arguments or {}))
+        elif isinstance(content, FunctionResultContent):
+            result = content.result
+            chars += len(result if isinstance(result, str) else json.dumps(result, default=str))
+        elif isinstance(content, (DataContent, UriContent)) and content.has_top_level_media_type("image"):
+            tokens += IMAGE_TOKENS
+        else:
+            chars += len(json.dumps(content.to_dict(), default=str))
+    return tokens + -(-chars // CHARS_PER_TOKEN)
+
+
+def drop_orphan_results(messages: list[ChatMessage]) -> list[ChatMessage]:
+    """Drop tool results at the start of a window whose function calls fell outside it.
+
+    A window cut between an assistant message with function calls and the messages with their results
+    starts with results the model never saw the call for, which chat completions reject.
+    """
+    start = 0
+    while start < len(messages) and _only_results(messages[start]):
+        start += 1
+    return messages[start:] if start else messages
+
+
+def _only_results(message: ChatMessage) -> bool:
+    return bool(message.contents) and all(isinstance(content, FunctionResultContent) for content in message.contents)
+
+
+class TokenBudgetChatMessageStore(ChatMessageStore):
+    """In-memory chat message store that drops the oldest messages beyond an estimated token budget.
+
+    Each message is measured once when added. The store keeps the per-message estimates and their
+    total, so trimming costs time proportional to the messages dropped, not to the history length.
+    Dropped messages only move a start offset; the list is compacted once they are half of it.
+    The newest message is always kept, even if it alone exceeds the budget, unless it is a tool result
+    whose function call was dropped: results are never kept without their call.
+    """
+
+    def __init__(self, messages: Sequence[ChatMessage] | None = None, max_tokens: int | None = None) -> None:
+        """Create a token budgeted store for use in a thread.
+
+        Args:
+            messages: The messages to store.
+            max_tokens: Estimated prompt token budget for the stored history. No trimming when not set.
+        """
+        super().__init__()
+        self.max_tokens = max_tokens
+        self.total_tokens = 0
+        self._token_counts: deque[int] = deque()
+        self._append(messages or [])
+
+    @property
+    def messages(self) -> list[ChatMessage]:
+        """The kept messages, oldest first."""
+        if self._start:
+            return self._messages[self._start :]
+        return self._messages
+
+    @messages.setter
+    def messages(self, messages: list[ChatMessage]) -> None:
+        self._messages = messages
+        self._start = 0
+
+    async def add_messages(self, messages: Sequence[ChatMessage]) -> None:
+        """Add messages to the store, trimming the oldest ones beyond the token budget.
+
+        Args:
+            messages: Sequence of ChatMessage objects to add to the store.
+        """
+        self._append(messages)
+
+    async def update_from_state(self, serialized_store_state: MutableMapping[str, Any], **kwargs: Any) -> None:
+        """Replace the stored messages with previously serialized ones and re-measure them once."""
+        await super().update_from_state(serialized_store_state, **kwargs)
+        messages, self.messages = self.messages, []
+        self.total_tokens = 0
+        self._token_counts.clear()
+        self._append(messages)
+
+    def _append(self, messages: Sequence[ChatMessage]) -> None:
+        for message in messages:
+            tokens = estimate_tokens(message)
+            self._messages.append(message)
+            self._token_counts.append(tokens)
+            self.total_tokens += tokens
+
+        if self.max_tokens is None:
+            return
+        dropped = False
+        while self.total_tokens > self.max_tokens and len(self._token_counts) > 1:
+            self.total_tokens -= self._token_counts.popleft()
+            self._start += 1
+            dropped = True
+        # The results of calls just dropped go with them
+        while dropped and self._token_counts and _only_results(self._messages[self._start]):
+            self.total_tokens -= self._token_counts.popleft()
+            self._start += 1
+        if self._start * 2 > len(self._messages):
+            del self._messages[: self._start]
+            self._start = 0
@@ -0,0 +1,330 @@
+import asyncio
+import json
+import sqlite3
+import threading
+from collections.abc import Sequence
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any
+from uuid import uuid4
+
+from agent_framework import ChatMessage
+from chat_history_budget import drop_orphan_results
+from pydantic import BaseModel
+
+"""
+SQLite chat history for durable local storage without a Redis server.
+
+All stores using the same database file share one SqliteHistoryDatabase. Writes from every thread
+are queued to a single writer task, which commits whatever has queued up while the previous commit
+was running in one transaction (group commit), so concurrent conversations share the cost of each
+fsync. The database runs in WAL mode, so reads on a small pool of reader connections never wait for
+the writer. Messages are keyed by (thread_id, seq), which serves tail-window reads as an indexed
+range scan with LIMIT.
+"""
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS chat_messages (
+    thread_id TEXT NOT NULL,
+    seq INTEGER NOT NULL,
+    data TEXT NOT NULL,
+    PRIMARY KEY (thread_id, seq)
+) WITHOUT ROWID
+"""
+
+# seq continues from the thread's newest message, so it stays dense even across processes
+INSERT_MESSAGE = """
+INSERT INTO chat_messages (thread_id, seq, data)
+VALUES (?, (SELECT COALESCE(MAX(seq), 0) + 1 FROM chat_messages WHERE thread_id = ?), ?)
+"""
+
+TRIM_THREAD = """
+DELETE FROM chat_messages
+WHERE thread_id = ? AND seq <= (SELECT MAX(seq) FROM chat_messages WHERE thread_id = ?) - ?
+"""
+
+
+class SqliteHistoryDatabase:
+    """One SQLite database file shared by all chat message stores that use it.
+
+    Writes go through a single writer task and are committed in groups. Reads run on a pool of
+    reader threads, each with its own connection.
+    """
+
+    def __init__(
+        self, path: str | Path, max_batch: int = 512, readers: int = 4, synchronous: str = "NORMAL"
+    ) -> None:
+        """Open (and if needed create) the database.
+
+        Args:
+            path: Path of the database file.
+            max_batch: Maximum number of queued writes committed in one transaction.
+            readers: Number of reader connections and threads.
+            synchronous: SQLite synchronous setting. NORMAL syncs at WAL checkpoints, so commits survive
+                        a process crash but the latest ones may be lost on power failure. FULL syncs
+                        every commit.
+        """
+        self.path = str(path)
+        self.max_batch = max_batch
+        self.synchronous = synchronous
+        # Number of transactions and of write operations committed, for measuring group commit
+        self.commits = 0
+        self.writes = 0
+
+        connection = self._open_connection()
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute(SCHEMA)
+        connection.close()
+
+        self._connections: list[sqlite3.Connection] = []
+        self._local = threading.local()
+        self._write_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="sqlite-history-writer")
+        self._read_executor = ThreadPoolExecutor(max_workers=readers, thread_name_prefix="sqlite-history-reader")
+        self._queue: asyncio.Queue[tuple[tuple[Any, ...], asyncio.Future[None]] | None] | None = None
+        self._writer_task: asyncio.Task[None] | None = None
+
+    def _open_connection(self) -> sqlite3.Connection:
+        connection = sqlite3.connect(self.path, isolation_level=None, check_same_thread=False)
+        connection.execute("PRAGMA busy_timeout=5000")
+        connection.execute(f"PRAGMA synchronous={self.synchronous}")
+        return connection
+
+    def _thread_connection(self) -> sqlite3.Connection:
+        """Return the connection owned by the calling executor thread, opening it on first use."""
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = self._local.connection = self._open_connection()
+            self._connections.append(connection)
+        return connection
+
+    async def write(self, operation: tuple[Any, ...]) -> None:
+        """Queue a write and wait until the transaction containing it has committed.
+
+        Args:
+            operation: ("append", thread_id, entries, max_messages) or ("clear", thread_id).
+        """
+        if self._writer_task is None:
+            self._queue = asyncio.Queue()
+            self._writer_task = asyncio.create_task(self._run_writer())
+        future = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait((operation, future))
+        await future
+
+    async def read(self, sql: str, parameters: Sequence[Any]) -> list[tuple[Any, ...]]:
+        """Run a query on a reader connection and return all rows."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self._read_executor, lambda: self._thread_connection().execute(sql, parameters).fetchall()
+        )
+
+    async def _run_writer(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            item = await self._queue.get()
+            if item is None:
+                return
+            batch = [item]
+            # Everything queued while the previous commit ran goes into this one
+            while len(batch) < self.max_batch and not self._queue.empty():
+                item = self._queue.get_nowait()
+                if item is None:
+                    self._queue.put_nowait(None)
+                    break
+                batch.append(item)
+
+            try:
+                errors = await loop.run_in_executor(
+                    self._write_executor, self._commit, [operation for operation, _ in batch]
+                )
+            except Exception as ex:
+                errors = [ex] * len(batch)
+            for (_, future), error in zip(batch, errors):
+                if future.done():
+                    continue
+                if error is None:
+                    future.set_result(None)
+                else:
+                    future.set_exception(error)
+
+    def _commit(self, operations: list[tuple[Any, ...]]) -> list[Exception | None]:
+        """Apply operations in one transaction. A failing operation is rolled back alone."""
+        connection = self._thread_connection()
+        errors: list[Exception | None] = []
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            for operation in operations:
+                connection.execute("SAVEPOINT operation")
+                try:
+                    self._apply(connection, operation)
+                except Exception as ex:
+                    connection.execute("ROLLBACK TO operation")
+                    errors.append(ex)
+                else:
+                    errors.append(None)
+                connection.execute("RELEASE operation")
+            connection.execute("COMMIT")
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+        self.commits += 1
+        self.writes += len(operations)
+        return errors
+
+    @staticmethod
+    def _apply(connection: sqlite3.Connection, operation: tuple[Any, ...]) -> None:
+        kind, thread_id, *arguments = operation
+        if kind == "append":
+            entries, max_messages = arguments
+            connection.executemany(INSERT_MESSAGE, [(thread_id, thread_id, entry) for entry in entries])
+            if max_messages is not None:
+                connection.execute(TRIM_THREAD, (thread_id, thread_id, max_messages))
+        elif kind == "clear":
+            connection.execute("DELETE FROM chat_messages WHERE thread_id = ?", (thread_id,))
+        else:
+            raise ValueError(f"Unknown write operation: {kind}")
+
+    async def aclose(self) -> None:
+        """Commit queued writes, stop the writer and close every connection."""
+        if self._writer_task is not None:
+            self._queue.put_nowait(None)
+            await self._writer_task
+            self._writer_task = None
+        self._write_executor.shutdown()
+        self._read_executor.shutdown()
+        for connection in self._connections:
+            connection.close()
+        self._connections.clear()
+
+
+_databases: dict[str, SqliteHistoryDatabase] = {}
+
+
+def get_database(path: str | Path, **kwargs: Any) -> SqliteHistoryDatabase:
+    """Return the process-wide SqliteHistoryDatabase for path, opening it on first use.
+
+    Keyword arguments are passed to SqliteHistoryDatabase when the database is opened.
+    """
+    key = str(Path(path).resolve())
+    if key not in _databases:
+        _databases[key] = SqliteHistoryDatabase(key, **kwargs)
+    return _databases[key]
+
+
+async def close_databases() -> None:
+    """Close every database opened through get_database."""
+    for database in _databases.values():
+        await database.aclose()
+    _databases.clear()
+
+
+class SqliteStoreState(BaseModel):
+    """State model for serializing and deserializing SQLite chat message store data."""
+
+    thread_id: str
+    db_path: str
+    max_messages: int | None = None
+    history_window: int | None = None
+
+
+class SqliteChatMessageStore:
+    """SQLite-backed implementation of ChatMessageStore with the same interface as RedisChatMessageStore."""
+
+    def __init__(
+        self,
+        db_path: str | Path = "chat_history.db",
+        thread_id: str | None = None,
+        max_messages: int | None = None,
+        history_window: int | None = None,
+    ) -> None:
+        """Initialize the SQLite chat message store.
+
+        Args:
+            db_path: Path of the database file, shared by all threads stored in it.
+            thread_id: Unique identifier for this conversation thread.
+                      If not provided, a UUID will be auto-generated.
+            max_messages: Maximum number of messages to retain for the thread.
+                         When exceeded, oldest messages are deleted in the same transaction.
+            history_window: How many of the most recent messages list_messages hands to the agent.
+                           All stored messages are returned when not set.
+        """
+        self.db_path = str(db_path)
+        self.thread_id = thread_id or f"thread_{uuid4()}"
+        self.max_messages = max_messages
+        self.history_window = history_window
+        self._database = get_database(self.db_path)
+
+    async def add_messages(self, messages: Sequence[ChatMessage]) -> None:
+        """Add messages to the store. Returns once the group commit containing them is durable.
+
+        Args:
+            messages: Sequence of ChatMessage objects to add to the store.
+        """
+        if not messages:
+            return
+        entries = [json.dumps(message.to_dict(), separators=(",", ":")) for message in messages]
+        await self._database.write(("append", self.thread_id, entries, self.max_messages))
+
+    async def list_messages(self) -> list[ChatMessage]:
+        """Get the messages the agent needs for its next run in chronological order.
+
+        Returns:
+            List of ChatMessage objects in chronological order (oldest first).
+        """
+        return await self.list_recent_messages(self.history_window)
+
+    async def list_recent_messages(self, max_messages: int | None = None) -> list[ChatMessage]:
+        """Get the most recent messages from the store in chronological order.
+
+        Args:
+            max_messages: Return at most this many of the newest messages. Read with an indexed
+                         range scan, so the cost does not grow with the thread length.
+
+        Returns:
+            List of ChatMessage objects in chronological order (oldest first). Tool results at the
+            start whose function call is not in the window are left out.
+        """
+        if max_messages:
+            rows = await self._database.read(
+                "SELECT data FROM chat_messages WHERE thread_id = ? ORDER BY seq DESC LIMIT ?",
+                (self.thread_id, max_messages),
+            )
+            rows.reverse()
+        else:
+            rows = await self._database.read(
+                "SELECT data FROM chat_messages WHERE thread_id = ? ORDER BY seq", (self.thread_id,)
+            )
+        return drop_orphan_results([ChatMessage.from_dict(json.loads(data)) for (data,) in rows])
+
+    async def serialize_state(self, **kwargs: Any) -> Any:
+        """Serialize the current store state for persistence.
+
+        Returns:
+            Dictionary containing serialized store configuration.
+        """
+        state = SqliteStoreState(
+            thread_id=self.thread_id,
+            db_path=self.db_path,
+            max_messages=self.max_messages,
+            history_window=self.history_window,
+        )
+        return state.model_dump(**kwargs)
+
+    async def deserialize_state(self, serialized_store_state: Any, **kwargs: Any) -> None:
+        """Deserialize state data into this store instance.
+
+        Args:
+            serialized_store_state: Previously serialized state data.
+            **kwargs: Additional arguments for deserialization.
+        """
+        if serialized_store_state:
+            state = SqliteStoreState.model_validate(serialized_store_state, **kwargs)
+            self.thread_id = state.thread_id
+            self.max_messages = state.max_messages
+            self.history_window = state.history_window
+            if state.db_path != self.db_path:
+                self.db_path = state.db_path
+                self._database = get_database(self.db_path)
+
+    async def clear(self) -> None:
+        """Remove all messages of this thread from the store."""
+        await self._database.write(("clear", self.thread_id))
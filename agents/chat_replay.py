@@ -0,0 +1,358 @@
+import asyncio
+import hashlib
+import json
+import math
+import random
+import time
+from collections.abc import AsyncIterable, Callable, MutableSequence
+from dataclasses import dataclass
+from functools import cache
+from pathlib import Path
+from typing import Any
+
+from agent_framework import (
+    BaseChatClient,
+    ChatMessage,
+    ChatOptions,
+    ChatResponse,
+    ChatResponseUpdate,
+    use_chat_middleware,
+    use_function_invocation,
+)
+from agent_framework.observability import use_observability
+
+"""
+Record and replay of chat client requests, for offline benchmarks and regression runs.
+
+RecordingChatClient sits in front of a real chat client and appends every model request it passes on to
+a recording file: a hash of the request, the response or its streamed updates, and how long they took.
+ReplayChatClient serves those responses back without any service, after a latency drawn from a
+distribution, by default the recorded one. Both run the function invocation loop themselves, so every
+model call of a turn is recorded on its own, tool calls included, and tools run for real on replay.
+Structured responses are parsed into the requested response_format as the service clients do.
+
+The recording is JSON lines, one per response. Requests are matched by a hash of their messages,
+instructions, tools and response_format; ids the service assigns, like call and thread ids, are left out,
+so a replayed conversation keeps matching. Repeated requests are served their recordings in turn.
+"""
+
+# Latency of a replayed response in seconds, from a random generator and the recorded latency
+Latency = Callable[[random.Random, float], float]
+
+# Keys of contents that differ between runs of the same conversation
+_VOLATILE_KEYS = {"call_id", "additional_properties", "raw_representation"}
+
+
+def recorded(scale: float = 1.0) -> Latency:
+    """Replay each response after its recorded latency, times scale."""
+    return lambda rng, seconds: seconds * scale
+
+
+def fixed(seconds: float) -> Latency:
+    """Replay every response after the same latency."""
+    return lambda rng, _: seconds
+
+
+def uniform(low: float, high: float) -> Latency:
+    """Replay responses after a latency drawn uniformly between low and high."""
+    return lambda rng, _: rng.uniform(low, high)
+
+
+def lognormal(median: float, p95: float) -> Latency:
+    """Replay responses after a log-normal latency, the usual shape of model latency, with a long tail."""
+    sigma = math.log(p95 / median) / 1.6449
+    return lambda rng, _: rng.lognormvariate(math.log(median), sigma)
+
+
+def parse_latency(spec: str) -> Latency:
+    """Parse a latency from text: recorded, recorded*0.5, 0.2, uniform:0.1,0.5 or lognormal:0.8,3."""
+    name, _, arguments = spec.partition(":")
+    if name.startswith("recorded"):
+        _, _, scale = name.partition("*")
+        return recorded(float(scale or 1.0))
+    if name == "uniform":
+        low, high = arguments.split(",")
+        return uniform(float(low), float(high))
+    if name == "lognormal":
+        median, p95 = arguments.split(",")
+        return lognormal(float(median), float(p95))
+    try:
+        return fixed(float(name))
+    except ValueError:
+        raise ValueError(f"Unknown latency {spec!r}, expected recorded, a number, uniform or lognormal") from None
+
+
+@cache
+def _schema(response_format: type) -> Any:
+    # Building a JSON schema takes about a millisecond, too much for every request
+    return response_format.model_json_schema()
+
+
+def request_key(messages: MutableSequence[ChatMessage], chat_options: ChatOptions) -> str:
+    """Return the hash a request is recorded and looked up by."""
+    request = {
+        "messages": [
+            {
+                "role": message.role.value,
+                "contents": [
+                    {key: value for key, value in content.to_dict().items() if key not in _VOLATILE_KEYS}
+                    for content in message.contents
+                ],
+            }
+            for message in messages
+        ],
+        "instructions": chat_options.instructions,
+        "tools": sorted(getattr(tool, "name", str(tool)) for tool in chat_options.tools or []),
+        "tool_choice": str(chat_options.tool_choice) if chat_options.tool_choice else None,
+        "response_format": _schema(chat_options.response_format) if chat_options.response_format else None,
+    }
+    encoded = json.dumps(request, sort_keys=True, default=str, separators=(",", ":"))
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+
+@dataclass
+class ChatRecordingStats:
+    """Counters of a ChatRecording."""
+
+    # Responses in the recording, loaded and recorded
+    responses: int
+    recorded: int
+    replayed: int
+    # Requests with no recorded response
+    misses: int
+
+
+class ChatRecording:
+    """The recorded responses of one file, by request key. Share one per file among the clients of a process."""
+
+    def __init__(self, path: str | Path) -> None:
+        self.path = Path(path)
+        self._responses: dict[str, list[dict[str, Any]]] = {}
+        # Key -> responses served, so repeated requests get their recordings in turn
+        self._served: dict[str, int] = {}
+        self._file = None
+        self.recorded = 0
+        self.replayed = 0
+        self.misses = 0
+        if self.path.exists():
+            with open(self.path, encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except json.JSONDecodeError:
+                        # Cut short by a crash while recording
+                        continue
+                    self._responses.setdefault(record["key"], []).append(record)
+
+    def __len__(self) -> int:
+        return sum(len(responses) for responses in self._responses.values())
+
+    def append(self, record: dict[str, Any]) -> None:
+        """Add a response to the recording and write it to the file."""
+        if self._file is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._file = open(self.path, "a", encoding="utf-8")
+            if self._file.tell() and not _ends_with_newline(self.path):
+                # Left by a crash in the middle of a write. The next record starts a line of its own.
+                self._file.write("\n")
+        self._file.write(json.dumps(record, default=str, separators=(",", ":")) + "\n")
+        self._file.flush()
+        self._responses.setdefault(record["key"], []).append(record)
+        self.recorded += 1
+
+    def next(self, key: str) -> dict[str, Any] | None:
+        """Return the next recorded response to a request, or None if there is none."""
+        responses = self._responses.get(key)
+        if not responses:
+            self.misses += 1
+            return None
+        served = self._served.get(key, 0)
+        self._served[key] = served + 1
+        self.replayed += 1
+        return responses[served % len(responses)]
+
+    def close(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def stats(self) -> ChatRecordingStats:
+        """Return the current counters."""
+        return ChatRecordingStats(
+            responses=len(self), recorded=self.recorded, replayed=self.replayed, misses=self.misses
+        )
+
+
+def _ends_with_newline(path: Path) -> bool:
+    with open(path, "rb") as f:
+        f.seek(-1, 2)
+        return f.read(1) == b"\n"
+
+
+def _preview(messages: MutableSequence[ChatMessage]) -> str:
+    # Only to tell recordings apart when reading the file
+    return messages[-1].text[:80] if messages else ""
+
+
+@use_function_invocation
+@use_observability
+@use_chat_middleware
+class RecordingChatClient(BaseChatClient):
+    """Chat client passing requests on to another one and recording every response."""
+
+    OTEL_PROVIDER_NAME = "recording"
+
+    def __init__(self, inner: BaseChatClient, recording: ChatRecording, **kwargs: Any) -> None:
+        """Create the client.
+
+        Args:
+            inner: The client making the model calls. Its own middleware and function invocation are skipped,
+                  they run in this client.
+            recording: Where the responses are recorded.
+        """
+        super().__init__(**kwargs)
+        self.inner = inner
+        self.recording = recording
+
+    def _update_agent_name(self, agent_name: str | None) -> None:
+        if hasattr(self.inner, "_update_agent_name"):
+            self.inner._update_agent_name(agent_name)
+
+    async def __aenter__(self) -> "RecordingChatClient":
+        return self
+
+    async def __aexit__(self, exc_type: Any, exc_val: Any, exc_tb: Any) -> None:
+        await self.close()
+
+    async def close(self) -> None:
+        """Close the inner client."""
+        if hasattr(self.inner, "close"):
+            await self.inner.close()
+
+    async def _inner_get_response(
+        self, *, messages: MutableSequence[ChatMessage], chat_options: ChatOptions, **kwargs: Any
+    ) -> ChatResponse:
+        key = request_key(messages, chat_options)
+        start = time.perf_counter()
+        response = await self.inner._inner_get_response(messages=messages, chat_options=chat_options, **kwargs)
+        self.recording.append(
+            {
+                "key": key,
+                "request": _preview(messages),
+                "seconds": round(time.perf_counter() - start, 4),
+                "response": response.to_dict(),
+            }
+        )
+        return response
+
+    async def _inner_get_streaming_response(
+        self, *, messages: MutableSequence[ChatMessage], chat_options: ChatOptions, **kwargs: Any
+    ) -> AsyncIterable[ChatResponseUpdate]:
+        key = request_key(messages, chat_options)
+        start = time.perf_counter()
+        first = None
+        updates = []
+        async for update in self.inner._inner_get_streaming_response(
+            messages=messages, chat_options=chat_options, **kwargs
+        ):
+            if first is None:
+                first = time.perf_counter() - start
+            updates.append(update.to_dict())
+            yield update
+        # Only complete streams are recorded
+        self.recording.append(
+            {
+                "key": key,
+                "request": _preview(messages),
+                "seconds": round(time.perf_counter() - start, 4),
+                "first": round(first or 0.0, 4),
+                "updates": updates,
+            }
+        )
+
+
+@use_function_invocation
+@use_observability
+@use_chat_middleware
+class ReplayChatClient(BaseChatClient):
+    """Chat client serving recorded responses after a simulated latency, without calling any service."""
+
+    OTEL_PROVIDER_NAME = "replay"
+
+    def __init__(
+        self, recording: ChatRecording, latency: Latency | None = None, seed: int | None = None, **kwargs: Any
+    ) -> None:
+        """Create the client.
+
+        Args:
+            recording: The recorded responses.
+            latency: Seconds before a response, or spread over a streamed one as recorded. Defaults to the
+                    recorded latency.
+            seed: Seed of the latency draws, for repeatable runs.
+        """
+        super().__init__(**kwargs)
+        self.recording = recording
+        self.latency = latency or recorded()
+        self._random = random.Random(seed)
+
+    async def __aenter__(self) -> "ReplayChatClient":
+        return self
+
+    async def __aexit__(self, exc_type: Any, exc_val: Any, exc_tb: Any) -> None:
+        pass
+
+    async def close(self) -> None:
+        pass
+
+    def _next(self, messages: MutableSequence[ChatMessage], chat_options: ChatOptions) -> dict[str, Any]:
+        record = self.recording.next(request_key(messages, chat_options))
+        if record is None:
+            raise LookupError(
+                f"No recorded response to the request ending with {_preview(messages)!r} in {self.recording.path}. "
+                "Record it again with AGENT_CHAT_RECORD."
+            )
+        return record
+
+    async def _inner_get_response(
+        self, *, messages: MutableSequence[ChatMessage], chat_options: ChatOptions, **kwargs: Any
+    ) -> ChatResponse:
+        record = self._next(messages, chat_options)
+        await asyncio.sleep(self.latency(self._random, record["seconds"]))
+        if "updates" in record:
+            return ChatResponse.from_chat_response_updates(
+                [ChatResponseUpdate.from_dict(update) for update in record["updates"]],
+                output_format_type=chat_options.response_format,
+            )
+        response = ChatResponse.from_dict(record["response"])
+        if chat_options.response_format:
+            response.try_parse_value(chat_options.response_format)
+        return response
+
+    async def _inner_get_streaming_response(
+        self, *, messages: MutableSequence[ChatMessage], chat_options: ChatOptions, **kwargs: Any
+    ) -> AsyncIterable[ChatResponseUpdate]:
+        record = self._next(messages, chat_options)
+        seconds = self.latency(self._random, record["seconds"])
+        if "updates" in record:
+            updates = [ChatResponseUpdate.from_dict(update) for update in record["updates"]]
+            # The first update comes after the recorded share of the latency, the others evenly after it
+            first = seconds * record["first"] / record["seconds"] if record["seconds"] else seconds
+        else:
+            response = ChatResponse.from_dict(record["response"])
+            updates = [
+                ChatResponseUpdate(
+                    contents=message.contents,
+                    role=message.role,
+                    message_id=message.message_id,
+                    response_id=response.response_id,
+                    conversation_id=response.conversation_id,
+                )
+                for message in response.messages
+            ]
+            first = seconds
+        await asyncio.sleep(first)
+        gap = (seconds - first) / max(len(updates) - 1, 1)
+        for index, update in enumerate(updates):
+            if index and gap:
+                await asyncio.sleep(gap)
+            yield update
@@ -0,0 +1,264 @@
+import os
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Any
+from urllib.parse import urlsplit
+
+import aiohttp
+from azure.core.credentials_async import AsyncTokenCredential
+from azure.core.pipeline.transport import AioHttpTransport
+
+from credential_cache import shared_credential
+
+if TYPE_CHECKING:
+    from agent_framework.azure import AzureAIAgentClient
+    from azure.ai.projects.aio import AIProjectClient
+
+    from agent_definition_cache import AgentDefinitionCache
+
+"""
+Process-wide registry of Azure AI clients sharing one pooled HTTP transport per endpoint.
+
+Each AIProjectClient normally opens its own aiohttp session, so every sample, agent and workflow
+executor keeps its own connections and TLS handshakes. ClientRegistry hands out one AIProjectClient
+per project endpoint, all on one keep-alive connection pool per host with tunable limits, and a new
+AzureAIAgentClient on that project client for every agent. An AzureAIAgentClient stays bound to the
+service agent it creates on its first run, so agents with different instructions must not share one.
+"""
+
+
+@dataclass
+class PoolStats:
+    """Counters of the connection pool of one host."""
+
+    limit: int
+    limit_per_host: int
+    requests: int
+    in_flight: int
+    failed_requests: int
+    # New TCP (and TLS) connections opened, against requests served on a kept-alive one
+    connections_created: int
+    connections_reused: int
+    # Requests that had to wait for a free connection because the pool was at its limit
+    queued: int
+
+
+class PooledTransport(AioHttpTransport):
+    """aiohttp transport with a tunable connection pool, shared by every client of one host.
+
+    Closing a client does not close the pool. Use aclose() once no client needs it anymore.
+    """
+
+    def __init__(self, limit: int = 100, limit_per_host: int = 32, keepalive_timeout: float = 30, **kwargs: Any):
+        """Create the transport. The session and its pool are made on first use, inside the event loop.
+
+        Args:
+            limit: Connections open at most across all hosts. 0 for no limit.
+            limit_per_host: Connections open at most to the same host, port and scheme. 0 for no limit.
+            keepalive_timeout: Seconds an idle connection is kept for reuse.
+            **kwargs: Connection settings of AioHttpTransport, like connection_timeout.
+        """
+        super().__init__(**kwargs)
+        self.limit = limit
+        self.limit_per_host = limit_per_host
+        self.keepalive_timeout = keepalive_timeout
+        self.requests = 0
+        self.in_flight = 0
+        self.failed_requests = 0
+        self.connections_created = 0
+        self.connections_reused = 0
+        self.queued = 0
+
+    def _trace_config(self) -> aiohttp.TraceConfig:
+        trace_config = aiohttp.TraceConfig()
+
+        async def request_start(*args: Any) -> None:
+            self.requests += 1
+            self.in_flight += 1
+
+        async def request_end(*args: Any) -> None:
+            self.in_flight -= 1
+
+        async def request_exception(*args: Any) -> None:
+            self.in_flight -= 1
+            self.failed_requests += 1
+
+        async def connection_created(*args: Any) -> None:
+            self.connections_created += 1
+
+        async def connection_reused(*args: Any) -> None:
+            self.connections_reused += 1
+
+        async def connection_queued(*args: Any) -> None:
+            self.queued += 1
+
+        trace_config.on_request_start.append(request_start)
+        trace_config.on_request_end.append(request_end)
+        trace_config.on_request_exception.append(request_exception)
+        trace_config.on_connection_create_end.append(connection_created)
+        trace_config.on_connection_reuseconn.append(connection_reused)
+        trace_config.on_connection_queued_start.append(connection_queued)
+        return trace_config
+
+    async def open(self) -> None:
+        if self.session is None:
+            connector = aiohttp.TCPConnector(
+                limit=self.limit, limit_per_host=self.limit_per_host, keepalive_timeout=self.keepalive_timeout
+            )
+            # Same settings as the sessions AioHttpTransport makes itself
+            self.session = aiohttp.ClientSession(
+                connector=connector,
+                trust_env=self._use_env_settings,
+                cookie_jar=aiohttp.DummyCookieJar(),
+                auto_decompress=False,
+                trace_configs=[self._trace_config()],
+            )
+
+    async def close(self) -> None:
+        """Leave the pool open for the other clients. See aclose()."""
+
+    async def aclose(self) -> None:
+        """Close the pool and its connections. The next request opens a new one."""
+        session, self.session = self.session, None
+        if session is not None:
+            await session.close()
+
+    def stats(self) -> PoolStats:
+        """Return the current counters."""
+        return PoolStats(
+            limit=self.limit,
+            limit_per_host=self.limit_per_host,
+            requests=self.requests,
+            in_flight=self.in_flight,
+            failed_requests=self.failed_requests,
+            connections_created=self.connections_created,
+            connections_reused=self.connections_reused,
+            queued=self.queued,
+        )
+
+
+class ClientRegistry:
+    """Hands out Azure AI clients that share one pooled transport per host."""
+
+    def __init__(
+        self,
+        credential: AsyncTokenCredential | None = None,
+        limit: int = 100,
+        limit_per_host: int = 32,
+        keepalive_timeout: float = 30,
+        definition_cache: "AgentDefinitionCache | None" = None,
+        **client_kwargs: Any,
+    ) -> None:
+        """Initialize the registry.
+
+        Args:
+            credential: Credential of every client. Defaults to the process's shared credential.
+            limit: Connections open at most per pool, across its hosts.
+            limit_per_host: Connections open at most to one host.
+            keepalive_timeout: Seconds an idle connection is kept for reuse.
+            definition_cache: Lets agent clients reuse agents created earlier with the same definition.
+                             None creates a new agent for every client, deleted when it closes.
+            **client_kwargs: Passed to every AIProjectClient, like retry_total or logging_enable.
+        """
+        self.credential = credential
+        self.limit = limit
+        self.limit_per_host = limit_per_host
+        self.keepalive_timeout = keepalive_timeout
+        self.definition_cache = definition_cache
+        self.client_kwargs = client_kwargs
+        self._transports: dict[str, PooledTransport] = {}
+        self._project_clients: dict[str, "AIProjectClient"] = {}
+
+    @staticmethod
+    def _endpoint(endpoint: str | None) -> str:
+        return endpoint or os.environ["AZURE_AI_PROJECT_ENDPOINT"]
+
+    def transport(self, endpoint: str | None = None) -> PooledTransport:
+        """Return the pooled transport for the host of endpoint."""
+        parts = urlsplit(self._endpoint(endpoint))
+        origin = f"{parts.scheme}://{parts.netloc}"
+        transport = self._transports.get(origin)
+        if transport is None:
+            transport = self._transports[origin] = PooledTransport(
+                limit=self.limit, limit_per_host=self.limit_per_host, keepalive_timeout=self.keepalive_timeout
+            )
+        return transport
+
+    def project_client(self, endpoint: str | None = None) -> "AIProjectClient":
+        """Return the AIProjectClient of endpoint, defaulting to AZURE_AI_PROJECT_ENDPOINT."""
+        from azure.ai.projects.aio import AIProjectClient
+
+        endpoint = self._endpoint(endpoint)
+        client = self._project_clients.get(endpoint)
+        if client is None:
+            client = self._project_clients[endpoint] = AIProjectClient(
+                endpoint=endpoint,
+                credential=self.credential or shared_credential(),
+                transport=self.transport(endpoint),
+                **self.client_kwargs,
+            )
+        return client
+
+    def agent_client(
+        self, model_deployment_name: str | None = None, endpoint: str | None = None, **kwargs: Any
+    ) -> "AzureAIAgentClient":
+        """Return a new AzureAIAgentClient on the shared project client, for one agent.
+
+        Args:
+            model_deployment_name: Defaults to AZURE_AI_MODEL_DEPLOYMENT_NAME.
+            endpoint: Project endpoint, defaulting to AZURE_AI_PROJECT_ENDPOINT.
+            **kwargs: Passed to AzureAIAgentClient, like agent_id or agent_name.
+
+        Returns:
+            A CachedAgentClient when the registry has a definition cache.
+        """
+        from agent_framework.azure import AzureAIAgentClient
+
+        endpoint = self._endpoint(endpoint)
+        kwargs.update(
+            project_client=self.project_client(endpoint),
+            model_deployment_name=model_deployment_name or os.environ["AZURE_AI_MODEL_DEPLOYMENT_NAME"],
+            async_credential=self.credential or shared_credential(),
+        )
+        if self.definition_cache is None:
+            return AzureAIAgentClient(**kwargs)
+
+        from agent_definition_cache import CachedAgentClient
+
+        return CachedAgentClient(definition_cache=self.definition_cache, endpoint=endpoint, **kwargs)
+
+    def stats(self) -> dict[str, PoolStats]:
+        """Return the pool counters by host."""
+        return {origin: transport.stats() for origin, transport in self._transports.items()}
+
+    async def aclose(self) -> None:
+        """Close every project client and pool."""
+        for client in self._project_clients.values():
+            await client.close()
+        for transport in self._transports.values():
+            await transport.aclose()
+        self._project_clients.clear()
+        self._transports.clear()
+
+
+_registry: ClientRegistry | None = None
+
+
+def get_registry() -> ClientRegistry:
+    """Return the ClientRegistry of this process.
+
+    Connection limits come from AGENT_HTTP_POOL_LIMIT and AGENT_HTTP_POOL_LIMIT_PER_HOST when set. Agent
+    definitions are cached unless AGENT_DEFINITION_CACHE is 0.
+    """
+    global _registry
+    if _registry is None:
+        definition_cache = None
+        if os.environ.get("AGENT_DEFINITION_CACHE", "1") != "0":
+            from agent_definition_cache import AgentDefinitionCache
+
+            definition_cache = AgentDefinitionCache()
+        _registry = ClientRegistry(
+            limit=int(os.environ.get("AGENT_HTTP_POOL_LIMIT", 100)),
+            limit_per_host=int(os.environ.get("AGENT_HTTP_POOL_LIMIT_PER_HOST", 32)),
+            definition_cache=definition_cache,
+        )
+    return _registry
@@ -0,0 +1,275 @@
+import asyncio
+import json
+import os
+import sys
+import time
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any
+
+from azure.core.credentials import AccessToken
+from azure.core.credentials_async import AsyncTokenCredential
+
+if sys.platform == "win32":
+    import msvcrt
+else:
+    import fcntl
+
+"""
+Process-wide token cache in front of AzureCliCredential.
+
+Every AzureCliCredential.get_token call runs the az CLI in a subprocess, which takes hundreds of
+milliseconds, and every sample builds its own credentials. SharedTokenCredential caches tokens in
+memory and in a file shared by all processes of the user, locked while it is read or written, and
+refreshes a token in the background once it is within refresh_before seconds of expiring. Use
+shared_credential() to get the one instance of the process.
+
+Cached tokens are keyed by the identity they were issued to, besides tenant, scopes and enable_cae. For
+AzureCliCredential that is the signed-in account of the az CLI profile, so after az login as someone
+else, or with another AZURE_CONFIG_DIR, the tokens of the previous account are not handed out. The
+identity is read again whenever a token is missing or due for refresh. The cache file is only read and
+written on worker threads, never on the event loop.
+
+The cache file holds bearer tokens, so it is created readable by the current user only.
+"""
+
+DEFAULT_CACHE_PATH = Path.home() / ".cache" / "agent-samples" / "token_cache.json"
+# Profile of the az CLI, holding the signed-in accounts and the default subscription
+AZURE_PROFILE_FILE = "azureProfile.json"
+# A cached token closer than this to expiring is not handed out, the caller waits for a new one
+MIN_VALIDITY = 30
+
+
+@contextmanager
+def _file_lock(path: Path) -> Iterator[None]:
+    """Hold an exclusive lock on path.lock, shared with other processes, for the duration of the block."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd = os.open(f"{path}.lock", os.O_RDWR | os.O_CREAT, 0o600)
+    try:
+        if sys.platform == "win32":
+            msvcrt.locking(fd, msvcrt.LK_LOCK, 1)
+        else:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+        yield
+    finally:
+        # Closing the descriptor releases the lock
+        os.close(fd)
+
+
+def cli_profile_identity() -> str:
+    """Return the az CLI configuration directory and the account of its default subscription.
+
+    Reads the profile file instead of running az account show, which takes as long as a token fetch.
+    """
+    config_dir = os.environ.get("AZURE_CONFIG_DIR") or str(Path.home() / ".azure")
+    try:
+        # The az CLI writes it with a byte order mark
+        with open(Path(config_dir) / AZURE_PROFILE_FILE, encoding="utf-8-sig") as f:
+            subscriptions = json.load(f).get("subscriptions", [])
+    except (OSError, json.JSONDecodeError):
+        subscriptions = []
+    default = next((subscription for subscription in subscriptions if subscription.get("isDefault")), {})
+    user = default.get("user", {})
+    return f"{config_dir}:{user.get('type', '')}:{user.get('name', '')}@{default.get('tenantId', '')}"
+
+
+@dataclass
+class CredentialCacheStats:
+    """Counters of a SharedTokenCredential."""
+
+    # Tokens requested from the underlying credential
+    fetches: int
+    memory_hits: int
+    # Tokens found in the cache file, fetched by another process or an earlier run
+    disk_hits: int
+    background_refreshes: int
+
+
+class SharedTokenCredential(AsyncTokenCredential):
+    """Async credential caching the tokens of another credential in memory and on disk.
+
+    Requests with claims (continuous access evaluation challenges) always go to the underlying
+    credential. Concurrent requests for the same token share one fetch.
+    """
+
+    def __init__(
+        self,
+        credential_factory: Callable[[], AsyncTokenCredential] | None = None,
+        cache_path: str | Path | None = DEFAULT_CACHE_PATH,
+        refresh_before: float = 300,
+        namespace: str | None = None,
+        identity: Callable[[], str] | None = None,
+    ) -> None:
+        """Initialize the credential.
+
+        Args:
+            credential_factory: Creates the underlying async credential, again after close(). Defaults to
+                               AzureCliCredential, imported on the first fetch since azure.identity is slow to load.
+            cache_path: JSON file shared across processes. None keeps tokens in memory only.
+            refresh_before: Seconds before expiry at which a token is refreshed in the background.
+            namespace: Prefix of cache keys, so different kinds of credentials do not share tokens. Defaults to
+                      the name of credential_factory.
+            identity: Returns who the underlying credential signs in as, to key the cache by. Called on a worker
+                     thread. Defaults to cli_profile_identity without a credential_factory, else to none.
+        """
+        self.credential_factory = credential_factory
+        self.cache_path = Path(cache_path) if cache_path is not None else None
+        self.refresh_before = refresh_before
+        self.namespace = namespace or getattr(credential_factory, "__name__", "AzureCliCredential")
+        self.identity = identity or (cli_profile_identity if credential_factory is None else (lambda: ""))
+        self.fetches = 0
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.background_refreshes = 0
+        self._credential: AsyncTokenCredential | None = None
+        self._tokens: dict[str, AccessToken] = {}
+        self._in_flight: dict[str, asyncio.Task[AccessToken]] = {}
+        # Identity the in-memory tokens were issued to, None until the first request
+        self._identity: str | None = None
+
+    def _key(self, identity: str | None, scopes: tuple[str, ...], tenant_id: str | None, enable_cae: bool) -> str:
+        cae = "cae" if enable_cae else ""
+        return f"{self.namespace}|{identity or ''}|{tenant_id or ''}|{cae}|{' '.join(sorted(scopes))}"
+
+    async def get_token(
+        self,
+        *scopes: str,
+        claims: str | None = None,
+        tenant_id: str | None = None,
+        enable_cae: bool = False,
+        **kwargs: Any,
+    ) -> AccessToken:
+        kwargs.update(tenant_id=tenant_id, enable_cae=enable_cae)
+        if self._identity is None:
+            self._identity = await asyncio.to_thread(self.identity)
+        key = self._key(self._identity, scopes, tenant_id, enable_cae)
+        if claims:
+            return await self._fetch(key, scopes, dict(kwargs, claims=claims))
+
+        now = time.time()
+        token = self._tokens.get(key)
+        if token is None or token.expires_on - now <= self.refresh_before:
+            identity, stored = await asyncio.to_thread(self._read_disk, scopes, tenant_id, enable_cae)
+            if identity != self._identity:
+                # Signed in as someone else since, so none of the tokens in memory are theirs
+                self._identity = identity
+                self._tokens.clear()
+                key = self._key(identity, scopes, tenant_id, enable_cae)
+                token = None
+            if stored is not None and (token is None or stored.expires_on > token.expires_on):
+                token = self._tokens[key] = stored
+                if stored.expires_on - now > self.refresh_before:
+                    self.disk_hits += 1
+                    return token
+
+        if token is not None:
+            remaining = token.expires_on - now
+            if remaining > self.refresh_before:
+                self.memory_hits += 1
+                return token
+            if remaining > MIN_VALIDITY:
+                # Still good for a while, so hand it out and replace it without making anyone wait
+                if key not in self._in_flight:
+                    self.background_refreshes += 1
+                    self._start_fetch(key, scopes, kwargs)
+                self.memory_hits += 1
+                return token
+
+        task = self._in_flight.get(key)
+        if task is None or task.get_loop() is not asyncio.get_running_loop():
+            task = self._start_fetch(key, scopes, kwargs)
+        # Shielded so a cancelled caller does not cancel the fetch the others are waiting for
+        return await asyncio.shield(task)
+
+    def _start_fetch(self, key: str, scopes: tuple[str, ...], kwargs: dict[str, Any]) -> asyncio.Task[AccessToken]:
+        task = asyncio.create_task(self._fetch(key, scopes, kwargs))
+        self._in_flight[key] = task
+
+        def done(task: asyncio.Task[AccessToken]) -> None:
+            if self._in_flight.get(key) is task:
+                del self._in_flight[key]
+            if not task.cancelled():
+                # Retrieve it, so a failed background refresh is not logged as never retrieved
+                task.exception()
+
+        task.add_done_callback(done)
+        return task
+
+    async def _fetch(self, key: str, scopes: tuple[str, ...], kwargs: dict[str, Any]) -> AccessToken:
+        if self._credential is None:
+            if self.credential_factory is None:
+                from azure.identity.aio import AzureCliCredential
+
+                self.credential_factory = AzureCliCredential
+            self._credential = self.credential_factory()
+        token = await self._credential.get_token(*scopes, **kwargs)
+        self.fetches += 1
+        self._tokens[key] = token
+        if self.cache_path is not None:
+            await asyncio.to_thread(self._write_disk, key, token)
+        return token
+
+    def _read_disk(
+        self, scopes: tuple[str, ...], tenant_id: str | None, enable_cae: bool
+    ) -> tuple[str, AccessToken | None]:
+        """Return the current identity and its cached token, if any. Blocks, so run it on a worker thread."""
+        identity = self.identity()
+        if self.cache_path is None or not self.cache_path.exists():
+            return identity, None
+        with _file_lock(self.cache_path):
+            entry = self._load().get(self._key(identity, scopes, tenant_id, enable_cae))
+        return identity, AccessToken(entry["token"], entry["expires_on"]) if entry else None
+
+    def _write_disk(self, key: str, token: AccessToken) -> None:
+        """Store a token in the cache file. Blocks, so run it on a worker thread."""
+        if self.cache_path is None:
+            return
+        with _file_lock(self.cache_path):
+            now = time.time()
+            entries = {name: entry for name, entry in self._load().items() if entry["expires_on"] > now}
+            entries[key] = {"token": token.token, "expires_on": token.expires_on}
+            # Write a new file and swap it in, so a crash never leaves half a cache behind
+            temp_path = self.cache_path.with_name(f"{self.cache_path.name}.tmp")
+            fd = os.open(temp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump({"tokens": entries}, f)
+            os.replace(temp_path, self.cache_path)
+
+    def _load(self) -> dict[str, dict[str, Any]]:
+        """Read the cache file. Call with the file lock held."""
+        try:
+            with open(self.cache_path, encoding="utf-8") as f:
+                return json.load(f).get("tokens", {})
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+
+    def stats(self) -> CredentialCacheStats:
+        """Return the current counters."""
+        return CredentialCacheStats(
+            fetches=self.fetches,
+            memory_hits=self.memory_hits,
+            disk_hits=self.disk_hits,
+            background_refreshes=self.background_refreshes,
+        )
+
+    async def close(self) -> None:
+        """Close the underlying credential. Cached tokens are kept and a new credential is made when needed."""
+        credential, self._credential = self._credential, None
+        if credential is not None:
+            await credential.close()
+
+    async def __aexit__(self, *args: Any) -> None:
+        await self.close()
+
+
+_shared: SharedTokenCredential | None = None
+
+
+def shared_credential() -> SharedTokenCredential:
+    """Return the SharedTokenCredential of this process, wrapping AzureCliCredential."""
+    global _shared
+    if _shared is None:
+        _shared = SharedTokenCredential()
+    return _shared
@@ -0,0 +1,224 @@
+import asyncio
+import hashlib
+import io
+import json
+import os
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from urllib.parse import unquote, urlsplit
+
+import httpx
+from agent_framework import DataContent
+from PIL import Image, ImageOps
+
+"""
+Content-addressed cache of images downscaled and re-encoded for multimodal messages.
+
+A UriContent pointing at a full-resolution image makes the model service download and process all of
+it on every call, although vision models scale images down to about 1-2 thousand pixels anyway.
+ImagePreprocessor takes a local file or URI, scales the image to fit max_edge, re-encodes it and
+returns it as inline DataContent. Results are stored under the hash of the source bytes and settings,
+and downloaded URIs remember the hash of what they served, so a repeated image costs one file read.
+A URI is served from its remembered hash for url_ttl seconds. After that it is revalidated with its
+ETag or Last-Modified, which costs a request but no download while the image is unchanged, or
+downloaded again when the server sent neither. Files are read and written on worker threads.
+"""
+
+DEFAULT_CACHE_DIR = Path.home() / ".cache" / "agent-samples" / "images"
+
+# Pillow format name -> media type and file extension
+FORMATS = {
+    "WEBP": ("image/webp", "webp"),
+    "JPEG": ("image/jpeg", "jpg"),
+    "PNG": ("image/png", "png"),
+}
+
+
+@dataclass
+class ImageCacheStats:
+    """Counters of an ImagePreprocessor."""
+
+    hits: int
+    misses: int
+    # Bytes read or downloaded from sources. URIs seen before are not downloaded again.
+    source_bytes: int
+    # Bytes of the images handed out
+    output_bytes: int
+    # Seconds spent decoding, scaling and encoding on misses
+    processing_seconds: float
+    # URIs past url_ttl the server confirmed unchanged, without a download
+    revalidations: int
+
+
+class ImagePreprocessor:
+    """Downscales and re-encodes images into inline DataContent, caching the results on disk."""
+
+    def __init__(
+        self,
+        cache_dir: str | Path = DEFAULT_CACHE_DIR,
+        max_edge: int = 1024,
+        format: str = "WEBP",
+        quality: int = 80,
+        url_ttl: float | None = 3600,
+    ) -> None:
+        """Initialize the preprocessor.
+
+        Args:
+            cache_dir: Directory of the cached images, shared across processes.
+            max_edge: Longest side in pixels of the images handed out. Smaller images keep their size.
+            format: WEBP, JPEG or PNG. The service accepts all three.
+            quality: Encoder quality from 1 to 100, for WEBP and JPEG.
+            url_ttl: Seconds a URI is served from the cache before it is checked with the server again. None
+                    never checks, 0 checks on every use.
+        """
+        if format not in FORMATS:
+            raise ValueError(f"Unknown format {format!r}, expected one of {', '.join(FORMATS)}")
+        self.cache_dir = Path(cache_dir)
+        self.max_edge = max_edge
+        self.format = format
+        self.quality = quality
+        self.url_ttl = url_ttl
+        self.hits = 0
+        self.misses = 0
+        self.source_bytes = 0
+        self.output_bytes = 0
+        self.processing_seconds = 0.0
+        self.revalidations = 0
+
+    async def prepare(self, source: str | Path) -> DataContent:
+        """Return the image at source, a local path or a file, http or https URI, as inline DataContent."""
+        media_type, extension = FORMATS[self.format]
+        url_index: Path | None = None
+        if isinstance(source, str) and urlsplit(source).scheme in ("http", "https"):
+            url_index = self.cache_dir / "urls" / f"{_sha256(source.encode('utf-8'))}.{self._settings()}"
+            index = await asyncio.to_thread(_read_index, url_index)
+            response = None
+            if index is not None:
+                cached = self._path(index["key"], extension)
+                if self.url_ttl is None or time.time() - index["checked"] < self.url_ttl:
+                    if (hit := await self._hit(cached, media_type)) is not None:
+                        return hit
+                elif index["etag"] or index["last_modified"]:
+                    response = await _download(source, index["etag"], index["last_modified"])
+                    if response.status_code == 304 and (hit := await self._hit(cached, media_type)) is not None:
+                        self.revalidations += 1
+                        await asyncio.to_thread(_write_index, url_index, {**index, "checked": time.time()})
+                        return hit
+            if response is None or response.status_code == 304:
+                response = await _download(source)
+            data = response.content
+        else:
+            data = await asyncio.to_thread(_local_path(source).read_bytes)
+
+        key = _sha256(data + self._settings().encode("utf-8"))
+        cached = self._path(key, extension)
+        self.source_bytes += len(data)
+        if (content := await self._hit(cached, media_type)) is None:
+            self.misses += 1
+            start = time.perf_counter()
+            output = await asyncio.to_thread(self._process, data)
+            self.processing_seconds += time.perf_counter() - start
+            await asyncio.to_thread(_write_atomic, cached, output)
+            self.output_bytes += len(output)
+            content = DataContent(data=output, media_type=media_type)
+        if url_index is not None:
+            # Written once the cached image exists, and stamped then, so url_ttl does not run during processing
+            index = {
+                "key": key,
+                "etag": response.headers.get("ETag"),
+                "last_modified": response.headers.get("Last-Modified"),
+                "checked": time.time(),
+            }
+            await asyncio.to_thread(_write_index, url_index, index)
+        return content
+
+    def _settings(self) -> str:
+        return f"{self.max_edge}-{self.format}-{self.quality}"
+
+    def _path(self, key: str, extension: str) -> Path:
+        # Two levels, so no directory holds too many files
+        return self.cache_dir / key[:2] / f"{key}.{extension}"
+
+    async def _hit(self, path: Path, media_type: str) -> DataContent | None:
+        """Return the cached image at path, or None if it is not there."""
+        try:
+            data = await asyncio.to_thread(path.read_bytes)
+        except FileNotFoundError:
+            return None
+        self.hits += 1
+        self.output_bytes += len(data)
+        return DataContent(data=data, media_type=media_type)
+
+    def _process(self, data: bytes) -> bytes:
+        with Image.open(io.BytesIO(data)) as image:
+            # Lets the JPEG decoder skip detail that would be scaled away, much faster than a full decode
+            image.draft("RGB", (self.max_edge, self.max_edge))
+            # Cameras store the rotation in EXIF, which re-encoding drops
+            image = ImageOps.exif_transpose(image)
+            has_alpha = image.mode in ("RGBA", "LA", "PA") or "transparency" in image.info
+            mode = "RGBA" if has_alpha and self.format != "JPEG" else "RGB"
+            if image.mode != mode:
+                image = image.convert(mode)
+            image.thumbnail((self.max_edge, self.max_edge), Image.Resampling.LANCZOS)
+            output = io.BytesIO()
+            image.save(output, self.format, quality=self.quality, optimize=True)
+        return output.getvalue()
+
+    def stats(self) -> ImageCacheStats:
+        """Return the current counters."""
+        return ImageCacheStats(
+            hits=self.hits,
+            misses=self.misses,
+            source_bytes=self.source_bytes,
+            output_bytes=self.output_bytes,
+            processing_seconds=self.processing_seconds,
+            revalidations=self.revalidations,
+        )
+
+
+def _sha256(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def _local_path(source: str | Path) -> Path:
+    if isinstance(source, str) and source.startswith("file://"):
+        return Path(unquote(urlsplit(source).path))
+    return Path(source)
+
+
+async def _download(url: str, etag: str | None = None, last_modified: str | None = None) -> httpx.Response:
+    """Get url, conditionally when given the validators of an earlier response. Raises unless 2xx or 304."""
+    conditions = {}
+    if etag:
+        conditions["If-None-Match"] = etag
+    if last_modified:
+        conditions["If-Modified-Since"] = last_modified
+    # Wikimedia and other hosts refuse requests without a descriptive user agent
+    async with httpx.AsyncClient(follow_redirects=True, headers={"User-Agent": "agent-samples/1.0"}) as client:
+        response = await client.get(url, headers=conditions)
+        if response.status_code != 304:
+            response.raise_for_status()
+        return response
+
+
+def _read_index(path: Path) -> dict | None:
+    """Read what a URI served last: the hash of its image, its validators and when it was last checked."""
+    try:
+        index = json.loads(path.read_text(encoding="utf-8"))
+    except (FileNotFoundError, ValueError):
+        # Not seen yet, or written by an earlier version as the bare hash, which is checked again
+        return None
+    return index if isinstance(index, dict) else None
+
+
+def _write_index(path: Path, index: dict) -> None:
+    _write_atomic(path, json.dumps(index).encode("utf-8"))
+
+
+def _write_atomic(path: Path, data: bytes) -> None:
+    """Write a new file and swap it in, so other processes never read half an image."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    temp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    temp_path.write_bytes(data)
+    os.replace(temp_path, path)
@@ -0,0 +1,176 @@
+import asyncio
+import json
+import os
+from collections.abc import MutableMapping, Sequence
+from pathlib import Path
+from typing import Any
+
+from agent_framework import ChatMessage, ChatMessageStore
+from pydantic import BaseModel
+
+"""
+Append-only journal persistence for local thread histories.
+
+Saving a thread with thread.serialize() rewrites the whole history, so every save costs time
+proportional to the thread length and a crash loses everything since the last save. The store here
+writes only the new messages of each turn to a JSONL journal and periodically compacts the journal
+into a snapshot. Loading reads the snapshot and replays the journal after it. Appends and compactions
+run on a worker thread, one at a time in call order, so the event loop never waits for the disk.
+
+Files for path "agent_thread":
+- agent_thread.snapshot.json: {"generation": g, "messages": [...]}, replaced atomically on compaction
+- agent_thread.journal.<g>.jsonl: one message per line, appended after the snapshot of generation g
+"""
+
+
+class JournalStoreState(BaseModel):
+    """State model for serializing and deserializing journal chat message store data."""
+
+    path: str
+    compact_every: int = 200
+    fsync: bool = False
+
+
+class JournalChatMessageStore(ChatMessageStore):
+    """In-memory chat message store persisted as a snapshot plus a journal of the messages added since.
+
+    Every add_messages call appends one line per message to the journal, so a save costs time
+    proportional to the new messages only. Once the journal holds at least ``compact_every``
+    messages and at least as many as the snapshot, it is folded into a new snapshot. This keeps
+    the amortized cost per message constant and the replay at load time shorter than the snapshot.
+    """
+
+    def __init__(self, path: str | os.PathLike[str], compact_every: int = 200, fsync: bool = False) -> None:
+        """Open the journal at path, loading any history already persisted there.
+
+        Args:
+            path: Base path of the snapshot and journal files. Parent directories must exist.
+            compact_every: Minimum number of journaled messages before compacting into a snapshot.
+            fsync: Flush every append to disk. Without it appends survive a process crash but not
+                  a power loss.
+        """
+        super().__init__()
+        self.path = Path(path)
+        self.compact_every = compact_every
+        self.fsync = fsync
+        # Keeps file writes in the order of the calls while they run on worker threads
+        self._lock = asyncio.Lock()
+        self._load()
+
+    @property
+    def snapshot_path(self) -> Path:
+        """Get the path of the snapshot file."""
+        return self.path.with_name(f"{self.path.name}.snapshot.json")
+
+    def journal_path(self, generation: int) -> Path:
+        """Get the path of the journal that follows the snapshot of the given generation."""
+        return self.path.with_name(f"{self.path.name}.journal.{generation}.jsonl")
+
+    async def add_messages(self, messages: Sequence[ChatMessage]) -> None:
+        """Add messages to the store and append them to the journal.
+
+        Args:
+            messages: Sequence of ChatMessage objects to add to the store.
+        """
+        if not messages:
+            return
+        lines = "".join(json.dumps(message.to_dict(), separators=(",", ":")) + "\n" for message in messages)
+        async with self._lock:
+            await asyncio.to_thread(self._append_lines, self.journal_path(self._generation), lines)
+            self.messages.extend(messages)
+            self._journaled += len(messages)
+
+            if self._journaled >= max(self.compact_every, len(self.messages) - self._journaled):
+                await self._compact()
+
+    async def compact(self) -> None:
+        """Write all messages to a new snapshot and start an empty journal after it."""
+        async with self._lock:
+            await self._compact()
+
+    async def _compact(self) -> None:
+        generation = self._generation + 1
+        await asyncio.to_thread(self._write_snapshot, generation, list(self.messages))
+        self._generation = generation
+        self._journaled = 0
+
+    def _append_lines(self, journal_path: Path, lines: str) -> None:
+        with open(journal_path, "a", encoding="utf-8") as journal:
+            journal.write(lines)
+            journal.flush()
+            if self.fsync:
+                os.fsync(journal.fileno())
+
+    def _write_snapshot(self, generation: int, messages: list[ChatMessage]) -> None:
+        # A stale journal of the next generation can be left by a crash during an earlier compaction
+        self.journal_path(generation).unlink(missing_ok=True)
+        temp_path = self.snapshot_path.with_suffix(".tmp")
+        with open(temp_path, "w", encoding="utf-8") as snapshot:
+            json.dump(
+                {"generation": generation, "messages": [message.to_dict() for message in messages]},
+                snapshot,
+                separators=(",", ":"),
+            )
+            snapshot.flush()
+            os.fsync(snapshot.fileno())
+        # The rename is the commit point: before it the old snapshot and journal are still complete
+        os.replace(temp_path, self.snapshot_path)
+        self.journal_path(generation - 1).unlink(missing_ok=True)
+
+    async def serialize(self, **kwargs: Any) -> dict[str, Any]:
+        """Serialize the store location. The messages themselves are already on disk.
+
+        Returns:
+            Dictionary containing the journal path and settings.
+        """
+        state = JournalStoreState(path=str(self.path), compact_every=self.compact_every, fsync=self.fsync)
+        return state.model_dump(**kwargs)
+
+    async def update_from_state(self, serialized_store_state: MutableMapping[str, Any], **kwargs: Any) -> None:
+        """Reopen the journal described by previously serialized state.
+
+        State holding messages instead of a path, as written by ChatMessageStore, replaces the history
+        here and is written as a new snapshot.
+        """
+        if not serialized_store_state:
+            return
+        if "path" not in serialized_store_state:
+            messages = [
+                message if isinstance(message, ChatMessage) else ChatMessage.from_dict(message)
+                for message in serialized_store_state.get("messages", [])
+            ]
+            async with self._lock:
+                self.messages = messages
+                await self._compact()
+            return
+        state = JournalStoreState.model_validate(serialized_store_state)
+        async with self._lock:
+            self.path = Path(state.path)
+            self.compact_every = state.compact_every
+            self.fsync = state.fsync
+            await asyncio.to_thread(self._load)
+
+    def _load(self) -> None:
+        """Read the snapshot, then replay its journal."""
+        self.messages = []
+        self._generation = 0
+        if self.snapshot_path.exists():
+            with open(self.snapshot_path, encoding="utf-8") as snapshot:
+                state = json.load(snapshot)
+            self._generation = state["generation"]
+            self.messages = [ChatMessage.from_dict(message) for message in state["messages"]]
+
+        self._journaled = 0
+        journal_path = self.journal_path(self._generation)
+        if journal_path.exists():
+            intact = 0
+            with open(journal_path, "rb") as journal:
+                for line in journal:
+                    if not line.endswith(b"\n"):
+                        break
+                    self.messages.append(ChatMessage.from_dict(json.loads(line)))
+                    self._journaled += 1
+                    intact += len(line)
+            if intact < journal_path.stat().st_size:
+                # Drop the torn write of a crash mid-append so new lines do not continue it
+                os.truncate(journal_path, intact)
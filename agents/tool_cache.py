@@ -0,0 +1,158 @@
+import asyncio
+import json
+import time
+from collections import OrderedDict
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass
+from typing import Any
+
+from agent_framework import FunctionInvocationContext, FunctionMiddleware
+from pydantic import BaseModel
+
+"""
+Memoizing cache for tool results.
+
+Tools like get_weather(location) return the same answer for a while, but the model calls them again
+with the same arguments across turns and sessions. ToolResultCache is a function middleware that
+serves repeated calls from memory, keyed on the function name and its canonicalized arguments, and
+lets concurrent identical calls share one execution (single flight). Caching is opt-in: only tools
+listed in ttls, or every tool with a default_ttl, are cached, since a tool with side effects or fresh
+data must run on every call.
+"""
+
+
+@dataclass
+class ToolCacheStats:
+    """Counters of a ToolResultCache."""
+
+    hits: int
+    misses: int
+    # Calls that waited for an identical call already in flight instead of executing
+    coalesced: int
+    evictions: int
+    entries: int
+
+
+class ToolResultCache(FunctionMiddleware):
+    """Function middleware caching tool results with per-tool TTLs, LRU eviction and single flight.
+
+    Failed calls are not cached. Tools with approval_mode="always_require" are never cached unless
+    include_approval_required is set, so every approved call really runs.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 1024,
+        default_ttl: float | None = 0,
+        ttls: dict[str, float | None] | None = None,
+        include_approval_required: bool = False,
+    ) -> None:
+        """Initialize the cache.
+
+        Args:
+            max_entries: Cached results kept at most. Least recently used ones are evicted first.
+            default_ttl: Seconds a result stays valid for tools without an entry in ttls.
+                        None keeps results until evicted. 0, the default, does not cache them.
+            ttls: Per-tool TTL by function name, with the same meaning as default_ttl. Lists the tools to cache.
+            include_approval_required: Also cache tools that require approval for every call.
+        """
+        self.max_entries = max_entries
+        self.default_ttl = default_ttl
+        self.ttls = ttls or {}
+        self.include_approval_required = include_approval_required
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+        # key -> (expiry on the monotonic clock or None, result)
+        self._entries: OrderedDict[tuple[str, str], tuple[float | None, Any]] = OrderedDict()
+        self._in_flight: dict[tuple[str, str], asyncio.Future[Any]] = {}
+
+    def _ttl(self, context: FunctionInvocationContext) -> float | None:
+        function = context.function
+        if getattr(function, "approval_mode", None) == "always_require" and not self.include_approval_required:
+            return 0
+        return self.ttls.get(function.name, self.default_ttl)
+
+    @staticmethod
+    def cache_key(name: str, arguments: BaseModel | dict[str, Any] | None) -> tuple[str, str]:
+        """Return the cache key of a call: the function name and its arguments as canonical JSON."""
+        if isinstance(arguments, BaseModel):
+            arguments = arguments.model_dump(mode="json")
+        return name, json.dumps(arguments or {}, sort_keys=True, separators=(",", ":"), default=str)
+
+    async def process(
+        self,
+        context: FunctionInvocationContext,
+        next: Callable[[FunctionInvocationContext], Awaitable[None]],
+    ) -> None:
+        ttl = self._ttl(context)
+        if ttl == 0:
+            await next(context)
+            return
+
+        key = self.cache_key(context.function.name, context.arguments)
+        entry = self._entries.get(key)
+        if entry is not None:
+            expires_at, result = entry
+            if expires_at is None or time.monotonic() < expires_at:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                context.result = result
+                return
+            del self._entries[key]
+
+        while (in_flight := self._in_flight.get(key)) is not None:
+            self.coalesced += 1
+            try:
+                # Shielded so a cancelled waiter does not cancel the call the others are waiting for
+                context.result = await asyncio.shield(in_flight)
+                return
+            except asyncio.CancelledError:
+                if not in_flight.cancelled():
+                    raise
+                # The caller running it was cancelled, so one of the waiters runs it instead
+
+        self.misses += 1
+        future = asyncio.get_running_loop().create_future()
+        self._in_flight[key] = future
+        try:
+            await next(context)
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as ex:
+            future.set_exception(ex)
+            # Waiters re-raise it. Mark it retrieved so an unwaited failure is not logged.
+            future.exception()
+            raise
+        else:
+            future.set_result(context.result)
+            self._store(key, None if ttl is None else time.monotonic() + ttl, context.result)
+        finally:
+            del self._in_flight[key]
+
+    def _store(self, key: tuple[str, str], expires_at: float | None, result: Any) -> None:
+        self._entries[key] = (expires_at, result)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def invalidate(self, name: str | None = None) -> None:
+        """Drop cached results of one function, or of all functions when name is None."""
+        if name is None:
+            self._entries.clear()
+            return
+        for key in [key for key in self._entries if key[0] == name]:
+            del self._entries[key]
+
+    def stats(self) -> ToolCacheStats:
+        """Return the current counters."""
+        return ToolCacheStats(
+            hits=self.hits,
+            misses=self.misses,
+            coalesced=self.coalesced,
+            evictions=self.evictions,
+            entries=len(self._entries),
+        )
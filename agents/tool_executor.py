@@ -0,0 +1,148 @@
+import asyncio
+import functools
+import importlib
+import inspect
+from collections.abc import Awaitable, Callable, Collection
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from contextvars import ContextVar
+from typing import Any
+
+from agent_framework import FunctionInvocationContext, FunctionMiddleware
+
+"""
+Concurrent execution of the tool calls in one model turn.
+
+The function invoking chat client already starts all function calls of a response together, but a
+sync tool runs on the event loop itself, so sync calls execute one after another and block every
+other session while they do. ToolExecutor runs sync tools on a thread pool instead, or for named
+CPU-bound tools on a process pool, and bounds how many calls of each tool run at once.
+
+The call still goes on through the rest of the middleware and AIFunction.invoke, so the execute_tool
+span, argument checks and logging stay as they are. Only the tool's own function is offloaded: the
+first time ToolExecutor sees a sync tool, it wraps the AIFunction's func in one that hands the call to
+the executor while ToolExecutor is running it, and calls the function as before otherwise.
+"""
+
+# The offloadable func of the tool ToolExecutor is running in this context, and how to run it
+_offload: ContextVar[tuple[Callable[..., Any], Callable[[dict[str, Any]], Awaitable[Any]]] | None] = ContextVar(
+    "tool_offload", default=None
+)
+
+
+def _call_in_worker(module: str, qualname: str, kwargs: dict[str, Any]) -> Any:
+    """Resolve a tool by name in a worker process and call it.
+
+    Functions decorated with @ai_function are replaced in their module by the AIFunction wrapping
+    them, so they cannot be pickled by reference. Looking the name up here and unwrapping works for both.
+    """
+    target: Any = importlib.import_module(module)
+    for attribute in qualname.split("."):
+        target = getattr(target, attribute)
+    return getattr(target, "func", target)(**kwargs)
+
+
+def _offloadable(func: Callable[..., Any]) -> Callable[..., Any]:
+    """Wrap a sync tool function to return an awaitable from the executor while ToolExecutor runs it."""
+
+    @functools.wraps(func)
+    def call(*args: Any, **kwargs: Any) -> Any:
+        offload = _offload.get()
+        if offload is None or offload[0] is not call or args:
+            return func(*args, **kwargs)
+        # AIFunction.invoke awaits what the function returns when it is awaitable
+        return offload[1](kwargs)
+
+    call._offloads = func  # type: ignore[attr-defined]
+    return call
+
+
+class ToolExecutor(FunctionMiddleware):
+    """Function middleware that runs sync tools off the event loop with per-tool concurrency limits.
+
+    It can go anywhere in the middleware list, middleware after it runs on the event loop as usual.
+    Async tools run on the event loop as usual.
+    """
+
+    def __init__(
+        self,
+        max_workers: int | None = None,
+        limits: dict[str, int] | None = None,
+        default_limit: int | None = None,
+        process_tools: Collection[str] = (),
+        max_processes: int | None = None,
+    ) -> None:
+        """Initialize the executor.
+
+        Args:
+            max_workers: Threads for sync tools. Defaults to the ThreadPoolExecutor default.
+            limits: Maximum concurrent calls by function name, across all sessions.
+            default_limit: Maximum concurrent calls of tools without an entry in limits. None for no limit.
+            process_tools: Names of CPU-bound tools to run in a process pool instead of a thread, so they
+                          do not hold the GIL. They must be module-level functions importable by name.
+            max_processes: Worker processes for process_tools. Defaults to the number of CPUs.
+        """
+        self.limits = limits or {}
+        self.default_limit = default_limit
+        self.process_tools = set(process_tools)
+        self._threads = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="tool")
+        self._processes = ProcessPoolExecutor(max_workers=max_processes) if self.process_tools else None
+        self._semaphores: dict[str, asyncio.Semaphore | None] = {}
+
+    def _semaphore(self, name: str) -> asyncio.Semaphore | None:
+        if name not in self._semaphores:
+            limit = self.limits.get(name, self.default_limit)
+            self._semaphores[name] = asyncio.Semaphore(limit) if limit else None
+        return self._semaphores[name]
+
+    async def process(
+        self,
+        context: FunctionInvocationContext,
+        next: Callable[[FunctionInvocationContext], Awaitable[None]],
+    ) -> None:
+        semaphore = self._semaphore(context.function.name)
+        if semaphore is None:
+            await self._execute(context, next)
+            return
+        async with semaphore:
+            await self._execute(context, next)
+
+    async def _execute(
+        self,
+        context: FunctionInvocationContext,
+        next: Callable[[FunctionInvocationContext], Awaitable[None]],
+    ) -> None:
+        function = context.function
+        func = getattr(function, "func", None)
+        if func is None or inspect.iscoroutinefunction(func):
+            await next(context)
+            return
+
+        original = getattr(func, "_offloads", None)
+        if original is None:
+            # Once per tool. Calls not made by ToolExecutor run the function directly, as before.
+            original = func
+            function.func = func = _offloadable(func)
+        loop = asyncio.get_running_loop()
+        if function.name in self.process_tools:
+
+            def run(kwargs: dict[str, Any]) -> Awaitable[Any]:
+                return loop.run_in_executor(
+                    self._processes, _call_in_worker, original.__module__, original.__qualname__, kwargs
+                )
+
+        else:
+
+            def run(kwargs: dict[str, Any]) -> Awaitable[Any]:
+                return loop.run_in_executor(self._threads, functools.partial(original, **kwargs))
+
+        token = _offload.set((func, run))
+        try:
+            await next(context)
+        finally:
+            _offload.reset(token)
+
+    def shutdown(self) -> None:
+        """Stop the worker threads and processes once running calls finish."""
+        self._threads.shutdown()
+        if self._processes is not None:
+            self._processes.shutdown()
@@ -0,0 +1,202 @@
+import threading
+import time
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass
+
+from agent_framework import FunctionInvocationContext, FunctionMiddleware
+
+"""
+Low-overhead latency metrics for agent tool calls.
+
+ToolMetrics is a function middleware that counts calls and errors per function and records call
+latency in log-linear (HDR-style) histograms: 32 linear sub-buckets per power of two, so every
+recorded value is within about 3% of its true value from nanoseconds to hours, in a fixed array.
+
+Recording takes no lock. Each OS thread writes to its own shard of counters, and all tasks of an
+event loop share its thread without ever running at the same time. snapshot() merges the shards.
+"""
+
+# 2**SUB_BUCKET_BITS linear sub-buckets per power of two
+SUB_BUCKET_BITS = 5
+SUB_BUCKETS = 1 << SUB_BUCKET_BITS
+# Enough buckets for any duration in nanoseconds that fits in 64 bits
+BUCKET_COUNT = (64 - SUB_BUCKET_BITS) * SUB_BUCKETS
+
+PROMETHEUS_QUANTILES = (0.5, 0.9, 0.99)
+
+
+def bucket_index(value: int) -> int:
+    """Return the histogram bucket holding a non-negative integer value."""
+    shift = max(value.bit_length() - SUB_BUCKET_BITS - 1, 0)
+    return (shift << SUB_BUCKET_BITS) + (value >> shift)
+
+
+def bucket_bounds(index: int) -> tuple[int, int]:
+    """Return the lowest value of a bucket and the lowest value of the next one."""
+    if index < 2 * SUB_BUCKETS:
+        return index, index + 1
+    shift = (index >> SUB_BUCKET_BITS) - 1
+    lowest = (index - (shift << SUB_BUCKET_BITS)) << shift
+    return lowest, lowest + (1 << shift)
+
+
+class LatencyHistogram:
+    """Fixed-size log-linear histogram of durations in nanoseconds."""
+
+    __slots__ = ("counts", "count", "total", "max")
+
+    def __init__(self) -> None:
+        self.counts = [0] * BUCKET_COUNT
+        self.count = 0
+        self.total = 0
+        self.max = 0
+
+    def record(self, nanoseconds: int) -> None:
+        self.counts[bucket_index(nanoseconds)] += 1
+        self.count += 1
+        self.total += nanoseconds
+        if nanoseconds > self.max:
+            self.max = nanoseconds
+
+    def merge(self, other: "LatencyHistogram") -> None:
+        """Add the recordings of other to this histogram."""
+        self.counts = [mine + theirs for mine, theirs in zip(self.counts, other.counts)]
+        self.count += other.count
+        self.total += other.total
+        self.max = max(self.max, other.max)
+
+    def quantile(self, q: float) -> int:
+        """Return the value below which a fraction q of recordings fall, in nanoseconds."""
+        if not self.count:
+            return 0
+        rank = max(int(q * self.count + 0.5), 1)
+        seen = 0
+        for index, bucket_count in enumerate(self.counts):
+            seen += bucket_count
+            if seen >= rank:
+                lowest, upper = bucket_bounds(index)
+                # Report the middle of the bucket, but never more than the largest value recorded
+                return min((lowest + upper - 1) // 2, self.max)
+        return self.max
+
+
+class FunctionStats:
+    """Counters for one function in one shard."""
+
+    __slots__ = ("calls", "errors", "histogram")
+
+    def __init__(self) -> None:
+        self.calls = 0
+        self.errors = 0
+        self.histogram = LatencyHistogram()
+
+
+@dataclass
+class FunctionLatencySnapshot:
+    """Merged metrics of one function at one point in time. Latencies are in seconds."""
+
+    calls: int
+    errors: int
+    total_seconds: float
+    mean: float
+    p50: float
+    p90: float
+    p99: float
+    max: float
+
+
+class ToolMetrics(FunctionMiddleware):
+    """Function middleware recording per-function call counts, error counts and latency histograms.
+
+    Use one instance for the whole process and pass it in the agent's middleware list. Failed calls
+    are counted as errors and their latency is recorded like any other call.
+    """
+
+    def __init__(self) -> None:
+        self._local = threading.local()
+        self._shards: list[dict[str, FunctionStats]] = []
+        self._shards_lock = threading.Lock()
+
+    def _shard(self) -> dict[str, FunctionStats]:
+        shard = getattr(self._local, "shard", None)
+        if shard is None:
+            shard = self._local.shard = {}
+            # Only taken once per thread, never on the recording path
+            with self._shards_lock:
+                self._shards.append(shard)
+        return shard
+
+    async def process(
+        self,
+        context: FunctionInvocationContext,
+        next: Callable[[FunctionInvocationContext], Awaitable[None]],
+    ) -> None:
+        start = time.perf_counter_ns()
+        failed = True
+        try:
+            await next(context)
+            failed = False
+        finally:
+            self.record(context.function.name, time.perf_counter_ns() - start, failed)
+
+    def record(self, name: str, nanoseconds: int, failed: bool = False) -> None:
+        """Record one call of function name that took nanoseconds."""
+        try:
+            shard = self._local.shard
+        except AttributeError:
+            shard = self._shard()
+        stats = shard.get(name)
+        if stats is None:
+            stats = shard[name] = FunctionStats()
+        stats.calls += 1
+        if failed:
+            stats.errors += 1
+        stats.histogram.record(nanoseconds)
+
+    def snapshot(self) -> dict[str, FunctionLatencySnapshot]:
+        """Merge all shards and return the metrics of every function called so far."""
+        merged: dict[str, FunctionStats] = {}
+        with self._shards_lock:
+            shards = list(self._shards)
+        for shard in shards:
+            # Copy first, another thread may add a function meanwhile
+            for name, stats in list(shard.items()):
+                total = merged.setdefault(name, FunctionStats())
+                total.calls += stats.calls
+                total.errors += stats.errors
+                total.histogram.merge(stats.histogram)
+
+        return {
+            name: FunctionLatencySnapshot(
+                calls=stats.calls,
+                errors=stats.errors,
+                total_seconds=stats.histogram.total / 1e9,
+                mean=stats.histogram.total / max(stats.histogram.count, 1) / 1e9,
+                p50=stats.histogram.quantile(0.5) / 1e9,
+                p90=stats.histogram.quantile(0.9) / 1e9,
+                p99=stats.histogram.quantile(0.99) / 1e9,
+                max=stats.histogram.max / 1e9,
+            )
+            for name, stats in sorted(merged.items())
+        }
+
+    def prometheus_text(self, prefix: str = "agent_tool") -> str:
+        """Render the current metrics in the Prometheus text exposition format."""
+        snapshot = self.snapshot()
+        lines = [
+            f"# HELP {prefix}_calls_total Tool calls by function.",
+            f"# TYPE {prefix}_calls_total counter",
+            *(f'{prefix}_calls_total{{function="{name}"}} {stats.calls}' for name, stats in snapshot.items()),
+            f"# HELP {prefix}_errors_total Tool calls that raised, by function.",
+            f"# TYPE {prefix}_errors_total counter",
+            *(f'{prefix}_errors_total{{function="{name}"}} {stats.errors}' for name, stats in snapshot.items()),
+            f"# HELP {prefix}_duration_seconds Tool call latency by function.",
+            f"# TYPE {prefix}_duration_seconds summary",
+        ]
+        for name, stats in snapshot.items():
+            for quantile in PROMETHEUS_QUANTILES:
+                value = getattr(stats, f"p{round(quantile * 100)}")
+                lines.append(f'{prefix}_duration_seconds{{function="{name}",quantile="{quantile}"}} {value:.9f}')
+            lines.append(f'{prefix}_duration_seconds_sum{{function="{name}"}} {stats.total_seconds:.9f}')
+            lines.append(f'{prefix}_duration_seconds_count{{function="{name}"}} {stats.calls}')
+        return "\n".join(lines) + "\n"
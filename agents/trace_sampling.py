@@ -0,0 +1,362 @@
+import os
+import threading
+import time
+from collections.abc import Mapping, Sequence
+from dataclasses import dataclass
+from pathlib import Path
+from typing import TYPE_CHECKING, Any
+
+from agent_framework.observability import OBSERVABILITY_SETTINGS, get_exporters, setup_observability
+from google.protobuf import json_format
+from opentelemetry.exporter.otlp.proto.common.trace_encoder import encode_spans
+from opentelemetry.sdk.trace import ReadableSpan
+from opentelemetry.sdk.trace.export import ConsoleSpanExporter, SpanExporter, SpanExportResult
+from opentelemetry.trace import StatusCode
+
+if TYPE_CHECKING:
+    from azure.core.credentials import TokenCredential
+    from opentelemetry.sdk._logs.export import LogExporter
+    from opentelemetry.sdk.metrics.export import MetricExporter
+
+"""
+Sampling, truncation and export tuning for agent traces with sensitive data.
+
+With sensitive data enabled, every agent, chat and tool span carries the full prompts, completions and
+tool payloads, and all of it is exported. TailSamplingSpanExporter sits in front of the real span
+exporters: it holds the spans of a trace until its root span, the agent run or workflow, has ended,
+then keeps the whole trace if any span failed, if the turn took at least slow_turn_seconds, or if its
+trace id falls in keep_ratio. Kept spans have their sensitive attributes cut to a length per attribute.
+
+setup_sampled_observability wires it into setup_observability, and also sets the batch span processor
+limits and an optional head sampler. Those two go through the standard OTEL_BSP_* and OTEL_TRACES_SAMPLER
+environment variables, which the tracer provider made by setup_observability reads.
+
+OtlpJsonFileSpanExporter writes spans as OTLP JSON lines, so the tracing of a run can be measured and
+inspected offline.
+"""
+
+# Attribute -> characters kept, for the attributes carrying sensitive data
+DEFAULT_ATTRIBUTE_LIMITS: dict[str, int] = {
+    "gen_ai.input.messages": 4096,
+    "gen_ai.output.messages": 4096,
+    "gen_ai.system_instructions": 1024,
+    "gen_ai.tool.definitions": 1024,
+    "gen_ai.tool.call.arguments": 1024,
+    "gen_ai.tool.call.result": 1024,
+}
+
+_TRACE_ID_MASK = (1 << 64) - 1
+
+
+@dataclass
+class TailSamplingStats:
+    """Counters of a TailSamplingSpanExporter."""
+
+    kept_errors: int
+    kept_slow: int
+    kept_sampled: int
+    dropped: int
+    # Traces decided before their root span ended, because they waited too long or too many were open
+    evicted: int
+    # Traces waiting for their root span
+    pending: int
+    spans_exported: int
+    spans_dropped: int
+    attributes_truncated: int
+    characters_truncated: int
+
+
+@dataclass
+class _PendingTrace:
+    started: float
+    spans: list[ReadableSpan]
+
+
+def keep_trace_id(trace_id: int, ratio: float) -> bool:
+    """Return whether a trace falls in ratio, deciding the same way as the TraceIdRatioBased head sampler."""
+    return (trace_id & _TRACE_ID_MASK) < round(ratio * (_TRACE_ID_MASK + 1))
+
+
+def truncate_attributes(span: ReadableSpan, limits: Mapping[str, int]) -> tuple[ReadableSpan, int]:
+    """Return span with its string attributes cut to limits, and the number of characters removed."""
+    attributes = span.attributes or {}
+    removed = 0
+    truncated: dict[str, Any] | None = None
+    for key, limit in limits.items():
+        value = attributes.get(key)
+        if isinstance(value, str) and len(value) > limit:
+            if truncated is None:
+                truncated = dict(attributes)
+            # Keeps the original length, so a reader knows how much is missing
+            truncated[key] = f"{value[:limit]}...[{len(value)} chars]"
+            removed += len(value) - limit
+    if truncated is None:
+        return span, 0
+    copy = ReadableSpan(
+        name=span.name,
+        context=span.context,
+        parent=span.parent,
+        resource=span.resource,
+        attributes=truncated,
+        events=span.events,
+        links=span.links,
+        kind=span.kind,
+        status=span.status,
+        start_time=span.start_time,
+        end_time=span.end_time,
+        instrumentation_scope=span.instrumentation_scope,
+    )
+    return copy, removed
+
+
+class TailSamplingSpanExporter(SpanExporter):
+    """Span exporter keeping whole traces that failed, were slow or are sampled, and truncating payloads."""
+
+    def __init__(
+        self,
+        exporters: Sequence[SpanExporter],
+        keep_ratio: float = 1.0,
+        slow_turn_seconds: float | None = None,
+        attribute_limits: Mapping[str, int] | None = DEFAULT_ATTRIBUTE_LIMITS,
+        max_pending_traces: int = 1000,
+        pending_timeout: float = 600.0,
+    ) -> None:
+        """Initialize the exporter.
+
+        Args:
+            exporters: The exporters receiving the kept spans.
+            keep_ratio: Share of traces kept that neither failed nor were slow, decided by trace id.
+            slow_turn_seconds: Traces whose root span took at least this long are kept. None keeps none
+                              for being slow.
+            attribute_limits: Attribute -> characters kept of its string value. None keeps everything.
+            max_pending_traces: Traces held while waiting for their root span. Beyond it the oldest is
+                               decided on the spans it has.
+            pending_timeout: Seconds a trace is held before it is decided on the spans it has.
+        """
+        self.exporters = list(exporters)
+        self.keep_ratio = keep_ratio
+        self.slow_turn_seconds = slow_turn_seconds
+        self.attribute_limits = dict(attribute_limits or {})
+        self.max_pending_traces = max_pending_traces
+        self.pending_timeout = pending_timeout
+        # Dicts keep insertion order, so the first pending trace is the oldest
+        self._pending: dict[int, _PendingTrace] = {}
+        # Export runs on the batch processor thread, shutdown may come from another one
+        self._lock = threading.Lock()
+        self.kept_errors = 0
+        self.kept_slow = 0
+        self.kept_sampled = 0
+        self.dropped = 0
+        self.evicted = 0
+        self.spans_exported = 0
+        self.spans_dropped = 0
+        self.attributes_truncated = 0
+        self.characters_truncated = 0
+
+    def export(self, spans: Sequence[ReadableSpan]) -> SpanExportResult:
+        """Hold the spans until their trace is complete, then export the spans of the traces kept."""
+        kept: list[ReadableSpan] = []
+        with self._lock:
+            now = time.monotonic()
+            for span in spans:
+                trace_id = span.context.trace_id
+                pending = self._pending.get(trace_id)
+                if pending is None:
+                    pending = self._pending[trace_id] = _PendingTrace(now, [])
+                pending.spans.append(span)
+                # Children end before their parent, so the local root is the last span of its trace
+                if span.parent is None or span.parent.is_remote:
+                    del self._pending[trace_id]
+                    kept.extend(self._decide(trace_id, pending.spans, span))
+            while self._pending:
+                trace_id, oldest = next(iter(self._pending.items()))
+                if len(self._pending) <= self.max_pending_traces and now - oldest.started < self.pending_timeout:
+                    break
+                del self._pending[trace_id]
+                self.evicted += 1
+                kept.extend(self._decide(trace_id, oldest.spans, None))
+        return self._export(kept)
+
+    def _decide(self, trace_id: int, spans: list[ReadableSpan], root: ReadableSpan | None) -> list[ReadableSpan]:
+        if any(span.status.status_code is StatusCode.ERROR for span in spans):
+            self.kept_errors += 1
+        elif (
+            root is not None
+            and self.slow_turn_seconds is not None
+            and root.end_time is not None
+            and root.start_time is not None
+            and root.end_time - root.start_time >= self.slow_turn_seconds * 1e9
+        ):
+            self.kept_slow += 1
+        elif keep_trace_id(trace_id, self.keep_ratio):
+            self.kept_sampled += 1
+        else:
+            self.dropped += 1
+            self.spans_dropped += len(spans)
+            return []
+        return spans
+
+    def _export(self, spans: list[ReadableSpan]) -> SpanExportResult:
+        if not spans:
+            return SpanExportResult.SUCCESS
+        if self.attribute_limits:
+            truncated = []
+            for span in spans:
+                span, removed = truncate_attributes(span, self.attribute_limits)
+                if removed:
+                    self.attributes_truncated += 1
+                    self.characters_truncated += removed
+                truncated.append(span)
+            spans = truncated
+        self.spans_exported += len(spans)
+        result = SpanExportResult.SUCCESS
+        for exporter in self.exporters:
+            if exporter.export(spans) is not SpanExportResult.SUCCESS:
+                result = SpanExportResult.FAILURE
+        return result
+
+    def force_flush(self, timeout_millis: int = 30000) -> bool:
+        """Flush the exporters. Traces still waiting for their root span stay held."""
+        return all(exporter.force_flush(timeout_millis) for exporter in self.exporters)
+
+    def shutdown(self) -> None:
+        """Decide and export the traces still held, then shut the exporters down."""
+        with self._lock:
+            kept: list[ReadableSpan] = []
+            for trace_id, pending in self._pending.items():
+                self.evicted += 1
+                kept.extend(self._decide(trace_id, pending.spans, None))
+            self._pending.clear()
+        self._export(kept)
+        for exporter in self.exporters:
+            exporter.shutdown()
+
+    def stats(self) -> TailSamplingStats:
+        """Return the current counters."""
+        return TailSamplingStats(
+            kept_errors=self.kept_errors,
+            kept_slow=self.kept_slow,
+            kept_sampled=self.kept_sampled,
+            dropped=self.dropped,
+            evicted=self.evicted,
+            pending=len(self._pending),
+            spans_exported=self.spans_exported,
+            spans_dropped=self.spans_dropped,
+            attributes_truncated=self.attributes_truncated,
+            characters_truncated=self.characters_truncated,
+        )
+
+
+class OtlpJsonFileSpanExporter(SpanExporter):
+    """Appends every batch of spans to a file as one line of OTLP JSON, an ExportTraceServiceRequest."""
+
+    def __init__(self, path: str | Path) -> None:
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._file = open(self.path, "a", encoding="utf-8")
+        self.spans = 0
+        self.bytes = 0
+
+    def export(self, spans: Sequence[ReadableSpan]) -> SpanExportResult:
+        line = json_format.MessageToJson(encode_spans(spans), indent=None) + "\n"
+        self._file.write(line)
+        self._file.flush()
+        self.spans += len(spans)
+        self.bytes += len(line.encode("utf-8"))
+        return SpanExportResult.SUCCESS
+
+    def force_flush(self, timeout_millis: int = 30000) -> bool:
+        return True
+
+    def shutdown(self) -> None:
+        self._file.close()
+
+
+def setup_sampled_observability(
+    enable_sensitive_data: bool | None = None,
+    otlp_endpoint: str | list[str] | None = None,
+    applicationinsights_connection_string: str | list[str] | None = None,
+    credential: "TokenCredential | None" = None,
+    exporters: Sequence["LogExporter | SpanExporter | MetricExporter"] = (),
+    keep_ratio: float = 1.0,
+    slow_turn_seconds: float | None = None,
+    attribute_limits: Mapping[str, int] | None = DEFAULT_ATTRIBUTE_LIMITS,
+    head_ratio: float = 1.0,
+    schedule_delay_millis: int | None = None,
+    max_queue_size: int | None = None,
+    max_export_batch_size: int | None = None,
+    export_timeout_millis: int | None = None,
+) -> TailSamplingSpanExporter:
+    """Set up observability like setup_observability, with every span exporter behind tail sampling.
+
+    Endpoints and connection strings from the environment are included, and also sampled. Call it once, before
+    any telemetry is captured.
+
+    Args:
+        enable_sensitive_data: Record prompts, completions and tool payloads on the spans.
+        otlp_endpoint: OTLP endpoints to export to.
+        applicationinsights_connection_string: Azure Monitor connection strings to export to.
+        credential: The credential for Azure Monitor Entra ID authentication.
+        exporters: Further log, metric or span exporters.
+        keep_ratio: Share of ordinary traces exported. Failed and slow ones are always exported.
+        slow_turn_seconds: Traces whose root span took at least this long are exported. None disables it.
+        attribute_limits: Attribute -> characters exported of its value. None exports everything.
+        head_ratio: Share of traces recorded at all, decided when they start. Below 1 it saves the cost of
+                   recording spans, but the traces not recorded are lost even if they fail or are slow.
+        schedule_delay_millis: Milliseconds between two exports of the batch span processor.
+        max_queue_size: Spans the batch span processor holds. Spans ending while it is full are dropped.
+        max_export_batch_size: Spans per export call.
+        export_timeout_millis: Milliseconds an export may take.
+
+    Returns:
+        The tail sampling exporter, for its stats.
+    """
+    batch_settings = {
+        "OTEL_BSP_SCHEDULE_DELAY": schedule_delay_millis,
+        "OTEL_BSP_MAX_QUEUE_SIZE": max_queue_size,
+        "OTEL_BSP_MAX_EXPORT_BATCH_SIZE": max_export_batch_size,
+        "OTEL_BSP_EXPORT_TIMEOUT": export_timeout_millis,
+    }
+    for name, value in batch_settings.items():
+        if value is not None:
+            os.environ[name] = str(value)
+    if head_ratio < 1.0:
+        # Children follow the decision of their parent, so traces are recorded whole or not at all
+        os.environ["OTEL_TRACES_SAMPLER"] = "parentbased_traceidratio"
+        os.environ["OTEL_TRACES_SAMPLER_ARG"] = str(head_ratio)
+
+    # Taken over from the settings, which setup_observability would turn into exporters it adds unsampled
+    endpoints = _as_list(otlp_endpoint) + _as_list(OBSERVABILITY_SETTINGS.otlp_endpoint)
+    if OBSERVABILITY_SETTINGS.vs_code_extension_port:
+        endpoints.append(f"http://localhost:{OBSERVABILITY_SETTINGS.vs_code_extension_port}")
+    connection_strings = _as_list(applicationinsights_connection_string) + _as_list(
+        OBSERVABILITY_SETTINGS.applicationinsights_connection_string
+    )
+    OBSERVABILITY_SETTINGS.otlp_endpoint = None
+    OBSERVABILITY_SETTINGS.applicationinsights_connection_string = None
+    OBSERVABILITY_SETTINGS.vs_code_extension_port = None
+
+    all_exporters = [
+        *exporters,
+        *get_exporters(
+            otlp_endpoints=list(dict.fromkeys(endpoints)),
+            connection_strings=list(dict.fromkeys(connection_strings)),
+            credential=credential,
+        ),
+    ]
+    span_exporters = [exporter for exporter in all_exporters if isinstance(exporter, SpanExporter)]
+    sampler = TailSamplingSpanExporter(
+        span_exporters or [ConsoleSpanExporter()],
+        keep_ratio=keep_ratio,
+        slow_turn_seconds=slow_turn_seconds,
+        attribute_limits=attribute_limits,
+    )
+    other_exporters = [exporter for exporter in all_exporters if not isinstance(exporter, SpanExporter)]
+    setup_observability(enable_sensitive_data=enable_sensitive_data, exporters=[sampler, *other_exporters])
+    return sampler
+
+
+def _as_list(value: str | list[str] | None) -> list[str]:
+    if not value:
+        return []
+    return [value] if isinstance(value, str) else list(value)
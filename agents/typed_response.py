@@ -0,0 +1,46 @@
+from typing import TypeVar
+
+from agent_framework import AgentExecutorResponse, AgentRunResponse
+from pydantic import BaseModel, ValidationError
+
+"""
+Parse-once access to the structured output of agent responses in workflows.
+
+An AgentExecutorResponse is handed as the same object to every edge condition of its source and to the
+executors it is delivered to. When each of them calls Model.model_validate_json on the response text, one
+response is parsed once per condition and again per executor. typed_value parses it on first use and
+keeps the result on the AgentRunResponse, keyed by the model, for everyone after. A value the agent
+client already parsed for the agent's response_format is used without parsing at all.
+"""
+
+TModel = TypeVar("TModel", bound=BaseModel)
+
+# Private, so AgentRunResponse.to_dict and checkpoints leave it out
+_CACHE_ATTRIBUTE = "_typed_values"
+
+
+def typed_value(response: AgentExecutorResponse | AgentRunResponse, model: type[TModel]) -> TModel:
+    """Return the text of an agent response as model, parsed at most once per response and model.
+
+    Raises:
+        ValidationError: The text is not valid JSON for model. Later calls raise it again without parsing.
+    """
+    run_response = response.agent_run_response if isinstance(response, AgentExecutorResponse) else response
+    values: dict[type, BaseModel | ValidationError] | None = run_response.__dict__.get(_CACHE_ATTRIBUTE)
+    if values is None:
+        values = {}
+        setattr(run_response, _CACHE_ATTRIBUTE, values)
+    value = values.get(model)
+    if value is None:
+        if isinstance(run_response.value, model):
+            value = run_response.value
+        else:
+            try:
+                value = model.model_validate_json(run_response.text)
+            except ValidationError as ex:
+                value = ex
+        values[model] = value
+    if isinstance(value, ValidationError):
+        # A fresh traceback, so raising the same error again does not grow it
+        raise value.with_traceback(None)
+    return value
@@ -0,0 +1,239 @@
+import asyncio
+import json
+import sys
+import tempfile
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+from agent_framework import ChatAgent, HostedFileSearchTool, HostedVectorStoreContent
+from agent_framework.azure import AzureAIAgentClient
+from aiohttp import web
+from azure.ai.agents.aio import AgentsClient
+from azure.core.pipeline.policies import HeadersPolicy
+from pydantic import BaseModel
+
+"""
+Benchmark: agent create calls at process start, with and without AgentDefinitionCache.
+
+A local aiohttp server stands in for the agents endpoint of a project. It keeps the agents created on it,
+takes CREATE_SECONDS to create one, and completes every run right away. Each process start builds the
+three agents of the multi-selection workflow and runs each once, with new clients and a new cache
+object on the same cache file, like a restarted process. Scenarios:
+- AzureAIAgentClient, creating and deleting its agents on every start
+- CachedAgentClient, cold and after restarts
+- one agent with changed instructions
+- one cached agent deleted on the service
+- the cleanup of agents unused for max_age
+- an agent with a hosted file search tool, whose tools and tool resources a restart must get from the cache
+  the same as the service has them, without fetching the agent
+"""
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "agents"))
+from agent_definition_cache import AgentDefinitionCache, CachedAgentClient  # noqa: E402
+
+CREATE_SECONDS = 0.2
+MODEL = "gpt-4o-mini"
+
+
+class AnalysisResult(BaseModel):
+    spam_decision: str
+    reason: str
+
+
+class EmailResponse(BaseModel):
+    response: str
+
+
+class EmailSummary(BaseModel):
+    summary: str
+
+
+AGENTS = [
+    ("You are a spam detection assistant that identifies spam emails.", AnalysisResult),
+    ("You are an email assistant that helps users draft responses to emails with professionalism.", EmailResponse),
+    ("You are an assistant that helps users summarize emails.", EmailSummary),
+]
+
+
+class StubAgentsServer:
+    """Local agents endpoint counting create, get and delete calls."""
+
+    def __init__(self) -> None:
+        self.agents: dict[str, dict] = {}
+        self.creates = 0
+        self.gets = 0
+        self.deletes = 0
+        self.runner: web.AppRunner | None = None
+        self.endpoint = ""
+
+    async def create_agent(self, request: web.Request) -> web.Response:
+        self.creates += 1
+        agent_id = f"asst_{self.creates}"
+        await asyncio.sleep(CREATE_SECONDS)
+        self.agents[agent_id] = {
+            "tools": [],
+            **await request.json(),
+            "id": agent_id,
+            "object": "assistant",
+            "created_at": int(time.time()),
+            "metadata": {},
+        }
+        return web.json_response(self.agents[agent_id])
+
+    async def agent(self, request: web.Request) -> web.Response:
+        agent_id = request.match_info["agent_id"]
+        if request.method == "GET":
+            self.gets += 1
+        if agent_id not in self.agents:
+            return web.json_response({"error": {"code": "not_found", "message": "No assistant found"}}, status=404)
+        if request.method == "DELETE":
+            self.deletes += 1
+            del self.agents[agent_id]
+            return web.json_response({"id": agent_id, "object": "assistant.deleted", "deleted": True})
+        return web.json_response(self.agents[agent_id])
+
+    async def create_thread(self, request: web.Request) -> web.Response:
+        return web.json_response({"id": "thread_1", "object": "thread", "created_at": 0, "metadata": {}})
+
+    async def create_message(self, request: web.Request) -> web.Response:
+        return web.json_response({"id": "msg_1", "object": "thread.message", "thread_id": "thread_1"})
+
+    async def create_run(self, request: web.Request) -> web.StreamResponse:
+        agent_id = (await request.json())["assistant_id"]
+        if agent_id not in self.agents:
+            return web.json_response({"error": {"code": "not_found", "message": "No assistant found"}}, status=404)
+        run = {"id": "run_1", "object": "thread.run", "thread_id": "thread_1", "assistant_id": agent_id}
+        response = web.StreamResponse(headers={"Content-Type": "text/event-stream"})
+        await response.prepare(request)
+        completed = json.dumps({**run, "status": "completed", "created_at": 0})
+        events = f"event: thread.run.completed\ndata: {completed}\n\nevent: done\ndata: [DONE]\n\n"
+        await response.write(events.encode())
+        await response.write_eof()
+        return response
+
+    async def list_runs(self, request: web.Request) -> web.Response:
+        return web.json_response({"object": "list", "data": [], "first_id": None, "last_id": None, "has_more": False})
+
+    async def start(self) -> None:
+        app = web.Application()
+        app.router.add_post("/api/projects/bench/assistants", self.create_agent)
+        app.router.add_route("*", "/api/projects/bench/assistants/{agent_id}", self.agent)
+        app.router.add_post("/api/projects/bench/threads", self.create_thread)
+        app.router.add_post("/api/projects/bench/threads/{thread_id}/messages", self.create_message)
+        app.router.add_post("/api/projects/bench/threads/{thread_id}/runs", self.create_run)
+        app.router.add_get("/api/projects/bench/threads/{thread_id}/runs", self.list_runs)
+        self.runner = web.AppRunner(app, access_log=None)
+        await self.runner.setup()
+        site = web.TCPSite(self.runner, "127.0.0.1", 0)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        self.endpoint = f"http://127.0.0.1:{port}/api/projects/bench"
+
+    async def stop(self) -> None:
+        await self.runner.cleanup()
+
+
+async def process_start(server: StubAgentsServer, project_client, cache_path: Path | None, agents=AGENTS):
+    """Build the agents and run each once, as a fresh process would. Returns (cache or None, seconds)."""
+    cache = AgentDefinitionCache(cache_path) if cache_path is not None else None
+    clients = [
+        CachedAgentClient(
+            definition_cache=cache, endpoint=server.endpoint, project_client=project_client, model_deployment_name=MODEL
+        )
+        if cache is not None
+        else AzureAIAgentClient(project_client=project_client, model_deployment_name=MODEL)
+        for _ in agents
+    ]
+    start = time.perf_counter()
+    await asyncio.gather(
+        *(
+            ChatAgent(chat_client=client, instructions=instructions, response_format=response_format).run("Hello")
+            for client, (instructions, response_format) in zip(clients, agents)
+        )
+    )
+    elapsed = time.perf_counter() - start
+    for client in clients:
+        await client.close()
+    return cache, elapsed
+
+
+async def timed(label: str, server: StubAgentsServer, project_client, cache_path: Path | None, agents=AGENTS):
+    creates, gets, deletes = server.creates, server.gets, server.deletes
+    cache, elapsed = await process_start(server, project_client, cache_path, agents)
+    print(
+        f"{label:<34}{server.creates - creates:>8}{server.gets - gets:>6}{server.deletes - deletes:>8}"
+        f"{elapsed * 1000:>10.0f}"
+    )
+    return cache
+
+
+async def hosted_tool_start(server: StubAgentsServer, project_client, cache_path: Path) -> tuple[bool, int]:
+    """Run an agent with a hosted tool as a fresh process would.
+
+    Returns whether the definition the client runs with has the tools and tool resources of the agent on the
+    service, and how many times the agent was fetched.
+    """
+    gets = server.gets
+    client = CachedAgentClient(
+        definition_cache=AgentDefinitionCache(cache_path),
+        endpoint=server.endpoint,
+        project_client=project_client,
+        model_deployment_name=MODEL,
+    )
+    file_search = HostedFileSearchTool(inputs=[HostedVectorStoreContent(vector_store_id="vs_handbook")])
+    await ChatAgent(chat_client=client, instructions="You answer from the handbook.", tools=[file_search]).run("Hi")
+    definition, on_service = client._agent_definition, server.agents[client.agent_id]
+    await client.close()
+    same = (
+        [tool.as_dict() for tool in definition.tools] == on_service["tools"]
+        and definition.tool_resources.as_dict() == on_service["tool_resources"]
+    )
+    return same, server.gets - gets
+
+
+async def main() -> None:
+    server = StubAgentsServer()
+    await server.start()
+    # Plain http, so a fixed Authorization header instead of the bearer token policy, which requires https
+    agents_client = AgentsClient(
+        endpoint=server.endpoint,
+        credential=object(),
+        authentication_policy=HeadersPolicy({"Authorization": "Bearer x"}),
+    )
+    project_client = SimpleNamespace(agents=agents_client)
+    print(f"{len(AGENTS)} agents per process start, {CREATE_SECONDS * 1000:.0f} ms per create at the server")
+    print(f"{'':<34}{'creates':>8}{'gets':>6}{'deletes':>8}{'ms':>10}")
+    try:
+        with tempfile.TemporaryDirectory() as temp_dir:
+            cache_path = Path(temp_dir) / "agent_definitions.json"
+            await timed("AzureAIAgentClient", server, project_client, None)
+            await timed("AzureAIAgentClient, restart", server, project_client, None)
+            await timed("cached, cold", server, project_client, cache_path)
+            await timed("cached, restart", server, project_client, cache_path)
+            await timed("cached, restart", server, project_client, cache_path)
+
+            changed = [("You are a terse assistant that summarizes emails.", EmailSummary), *AGENTS[:2]]
+            await timed("cached, one agent changed", server, project_client, cache_path, changed)
+
+            server.agents.pop(next(iter(server.agents)))
+            cache = await timed("cached, one agent deleted remotely", server, project_client, cache_path)
+            print(f"  {cache.stats()}")
+
+            # Every agent is older than max_age from here
+            await asyncio.sleep(0.1)
+            cache = AgentDefinitionCache(cache_path, max_age=0.05)
+            deleted = await cache.cleanup(agents_client, server.endpoint)
+            print(f"cleanup, max_age={cache.max_age}s: {deleted} agents deleted, {len(server.agents)} left on server")
+            await timed("cached, after cleanup", server, project_client, cache_path)
+
+            for label in ("cold", "restart"):
+                same, gets = await hosted_tool_start(server, project_client, cache_path)
+                print(f"hosted file search, {label}: definition matches the service: {same}, {gets} gets")
+    finally:
+        await agents_client.close()
+        await server.stop()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,134 @@
+import asyncio
+import multiprocessing
+import statistics
+import sys
+import time
+from pathlib import Path
+
+import aiohttp
+from agent_framework import ChatAgent
+
+"""
+Load test: sessions per core and turn latency of agents/agent_server.py.
+
+Starts the server in a child process with a FakeChatClient that answers after MODEL_LATENCY
+seconds, then opens SESSIONS concurrent sessions that each send TURNS turns back to back, over
+WebSockets and then over HTTP. The fake client keeps threads by conversation id like the agent
+service, and fails ERROR_RATE of its requests, which a WebSocket session must survive. Reports turn
+latency, throughput, failed turns and the server CPU time per turn, from which it derives how many
+sessions one core can host when users send a message every THINK_SECONDS. First checks that malformed
+HTTP message bodies get 400 Bad Request, not 500.
+"""
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "agents"))
+sys.path.insert(0, str(Path(__file__).parent))
+from agent_server import AgentSessionHost, create_app, serve  # noqa: E402
+from fake_chat_client import FakeChatClient  # noqa: E402
+
+SESSIONS = 500
+TURNS = 10
+MODEL_LATENCY = 0.2
+ERROR_RATE = 0.01
+MAX_CONCURRENT_RUNS = 256
+THINK_SECONDS = 10
+PORT = 8765
+BAD_BODIES = [b"not json", b"\xff\xfe", b'{"text": 5}', b'{"text": null}', b'["text"]', b'{"text": "  "}']
+
+
+def run_server() -> None:
+    client = FakeChatClient(latency=MODEL_LATENCY, error_rate=ERROR_RATE, seed=1, service_threads=True)
+    # store=True as the agent service stores every thread, and the framework warns on every turn otherwise
+    agent = ChatAgent(chat_client=client, instructions="You are a helpful assistant.", store=True)
+    app = create_app(AgentSessionHost(agent, max_concurrent_runs=MAX_CONCURRENT_RUNS))
+    asyncio.run(serve(app, "127.0.0.1", PORT))
+
+
+async def websocket_session(
+    client: aiohttp.ClientSession, base: str, index: int, latencies: list[float], errors: list[str]
+) -> None:
+    async with client.ws_connect(f"{base}/sessions/ws_{index}/ws") as ws:
+        for turn in range(TURNS):
+            start = time.perf_counter()
+            await ws.send_str(f"Question {turn}: what is the weather in Seattle?")
+            reply = await ws.receive_json()
+            if "error" in reply:
+                errors.append(reply["error"])
+                continue
+            latencies.append(time.perf_counter() - start)
+
+
+async def http_session(
+    client: aiohttp.ClientSession, base: str, index: int, latencies: list[float], errors: list[str]
+) -> None:
+    for turn in range(TURNS):
+        start = time.perf_counter()
+        async with client.post(
+            f"{base}/sessions/http_{index}/messages", json={"text": f"Question {turn}: what is the weather in Seattle?"}
+        ) as response:
+            if response.status == 500:
+                errors.append(await response.text())
+                continue
+            response.raise_for_status()
+            await response.json()
+        latencies.append(time.perf_counter() - start)
+
+
+async def check_bad_requests(client: aiohttp.ClientSession, base: str) -> None:
+    statuses = []
+    for body in BAD_BODIES:
+        async with client.post(
+            f"{base}/sessions/bad/messages", data=body, headers={"Content-Type": "application/json"}
+        ) as response:
+            statuses.append(response.status)
+    ok = statuses == [400] * len(BAD_BODIES)
+    print(f"malformed message bodies: statuses {statuses}  {'ok' if ok else 'FAILED'}")
+    if not ok:
+        raise SystemExit(1)
+
+
+async def measure(client: aiohttp.ClientSession, base: str, name: str, run_session) -> None:
+    async with client.get(f"{base}/stats") as response:
+        before = await response.json()
+    latencies: list[float] = []
+    errors: list[str] = []
+    start = time.perf_counter()
+    await asyncio.gather(*(run_session(client, base, index, latencies, errors) for index in range(SESSIONS)))
+    elapsed = time.perf_counter() - start
+    async with client.get(f"{base}/stats") as response:
+        after = await response.json()
+
+    turns = after["turns"] - before["turns"]
+    cpu_per_turn = (after["cpu_seconds"] - before["cpu_seconds"]) / turns
+    quantiles = statistics.quantiles(latencies, n=100)
+    print(
+        f"{name:<10} {turns / elapsed:7.0f} turns/s  p50={quantiles[49] * 1000:6.1f}ms  "
+        f"p99={quantiles[98] * 1000:6.1f}ms  server cpu/turn={cpu_per_turn * 1000:5.2f}ms  "
+        f"sessions/core={THINK_SECONDS / cpu_per_turn:8.0f}  failed turns={len(errors)}"
+    )
+
+
+async def main() -> None:
+    server = multiprocessing.get_context("spawn").Process(target=run_server, daemon=True)
+    server.start()
+    base = f"http://127.0.0.1:{PORT}"
+    print(
+        f"{SESSIONS} sessions x {TURNS} turns, model latency {MODEL_LATENCY * 1000:.0f}ms, "
+        f"{ERROR_RATE:.0%} of requests fail"
+    )
+    try:
+        async with aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=0)) as client:
+            for _ in range(100):
+                try:
+                    async with client.get(f"{base}/stats"):
+                        break
+                except aiohttp.ClientConnectionError:
+                    await asyncio.sleep(0.1)
+            await check_bad_requests(client, base)
+            await measure(client, base, "websocket", websocket_session)
+            await measure(client, base, "http", http_session)
+    finally:
+        server.terminate()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,114 @@
+import asyncio
+import sys
+import time
+from pathlib import Path
+from typing import Annotated
+
+from agent_framework import ChatAgent, FunctionApprovalRequestContent, ai_function
+
+"""
+Benchmark: round trips of a scripted approval conversation, with and without remembered decisions.
+
+Every turn the fake model asks for get_weather_detail on one of a few cities, and the scripted user
+answers "always" the first time a city comes up. Without the policy the user is asked every turn and
+every turn needs a second agent run. With it, remembered cities run inside the first run. The second run
+sends only the approval answers, so the thread holds each user prompt once either way. First checks that
+an answer remembered for a call with wildcard argument values approves only that exact call, while
+patterns written in code match like patterns.
+"""
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "agents"))
+sys.path.insert(0, str(Path(__file__).parent))
+from approval_policy import ApprovalPolicy, ApprovalPolicyMiddleware, run_with_approvals  # noqa: E402
+from fake_chat_client import FakeChatClient  # noqa: E402
+
+TURNS = 50
+PROMPT = "How is the weather?"
+CITIES = ["Seattle, WA", "Portland, OR", "San Francisco, CA", "Boston, MA", "Chicago, IL"]
+MODEL_LATENCY = 0.02
+
+
+@ai_function(approval_mode="always_require")
+def get_weather_detail(location: Annotated[str, "The city and state, e.g. San Francisco, CA"]) -> str:
+    """Get detailed weather information for a given location."""
+    return f"The weather in {location} is cloudy with a high of 15°C, humidity 88%."
+
+
+def check(label: str, ok: bool, detail: str) -> None:
+    print(f"{label:<52}{'ok' if ok else 'FAILED':>8}  {detail}")
+    if not ok:
+        raise SystemExit(1)
+
+
+def check_wildcards() -> None:
+    policy = ApprovalPolicy()
+    with policy.session("bench"):
+        # As the scripted user and the sample remember an answer: with the arguments of the model's call
+        policy.remember("get_weather_detail", {"location": "*"})
+        policy.remember("get_weather_detail", {"location": "S?attle, W[A]"}, approved=False)
+        others = [policy.decide("get_weather_detail", {"location": city}) for city in CITIES]
+        exact = policy.decide("get_weather_detail", {"location": "*"})
+        check("remembered \"*\" does not match other values", others == [None] * len(CITIES), f"{others}")
+        check("remembered \"*\" matches \"*\"", exact is True, f"{exact}")
+        policy.remember("get_weather_detail", patterns={"location": "S*"})
+        matched = [city for city in CITIES if policy.decide("get_weather_detail", {"location": city})]
+        check("patterns= matches as a pattern", matched == ["Seattle, WA", "San Francisco, CA"], f"{matched}")
+
+
+async def run_conversation(use_policy: bool) -> dict[str, float]:
+    client = FakeChatClient(latency=MODEL_LATENCY)
+    policy = ApprovalPolicy()
+    agent = ChatAgent(
+        chat_client=client,
+        tools=[get_weather_detail],
+        middleware=[ApprovalPolicyMiddleware(policy)] if use_policy else [],
+    )
+    thread = agent.get_new_thread()
+    prompts = 0
+    runs = 0
+    original_run = agent.run
+
+    async def counting_run(*args, **kwargs):
+        nonlocal runs
+        runs += 1
+        return await original_run(*args, **kwargs)
+
+    agent.run = counting_run
+
+    async def scripted_user(request: FunctionApprovalRequestContent) -> bool:
+        nonlocal prompts
+        prompts += 1
+        if use_policy:
+            policy.remember(request.function_call.name, request.function_call.parse_arguments())
+        return True
+
+    start = time.perf_counter()
+    with policy.session("bench"):
+        for turn in range(TURNS):
+            client.function_calls = [("get_weather_detail", {"location": CITIES[turn % len(CITIES)]})]
+            await run_with_approvals(agent, PROMPT, thread, policy, scripted_user)
+    seconds = time.perf_counter() - start
+    history = await thread.message_store.list_messages()
+    return {
+        "prompts": prompts,
+        "agent runs": runs,
+        "model requests": client.requests,
+        "user messages": sum(message.text == PROMPT for message in history),
+        "thread messages": len(history),
+        "seconds": seconds,
+    }
+
+
+async def main() -> None:
+    check_wildcards()
+    print(f"\n{TURNS} turns over {len(CITIES)} cities, {MODEL_LATENCY * 1000:.0f}ms model latency")
+    without = await run_conversation(use_policy=False)
+    with_policy = await run_conversation(use_policy=True)
+    print(f"{'':<16}{'no policy':>12}{'policy':>12}{'saved':>12}")
+    for name in without:
+        saved = without[name] - with_policy[name]
+        print(f"{name:<16}{without[name]:>12.4g}{with_policy[name]:>12.4g}{saved:>12.4g}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
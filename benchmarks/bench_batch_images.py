@@ -0,0 +1,79 @@
+import asyncio
+import json
+import sys
+import tempfile
+from pathlib import Path
+
+from agent_framework import ChatAgent
+from PIL import Image
+
+from fake_chat_client import FakeChatClient
+
+"""
+Benchmark: throughput, tail latency and resuming of BatchImageRunner against a fake chat client.
+
+FakeChatClient answers after MODEL_LATENCY plus up to JITTER seconds and fails ERROR_RATE of the
+requests, so retries and backoff are part of the numbers. Runs IMAGES generated images at several
+concurrency limits, then kills a batch halfway, leaving a half-written line like a crash would, and
+resumes it: every image must end up described exactly once.
+"""
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "agents"))
+from agent_batch_images import BatchImageRunner, described_images, list_images  # noqa: E402
+from image_cache import ImagePreprocessor  # noqa: E402
+
+IMAGES = 200
+MODEL_LATENCY = 0.1
+JITTER = 0.1
+ERROR_RATE = 0.1
+BACKOFF = 0.05
+CONCURRENCY = [1, 8, 32, 64]
+
+
+def runner(concurrency: int, cache_dir: Path) -> BatchImageRunner:
+    client = FakeChatClient(latency=MODEL_LATENCY, jitter=JITTER, error_rate=ERROR_RATE, seed=concurrency)
+    agent = ChatAgent(chat_client=client, instructions="You describe images.")
+    return BatchImageRunner(
+        agent, concurrency=concurrency, backoff=BACKOFF, preprocessor=ImagePreprocessor(cache_dir, max_edge=256)
+    )
+
+
+async def main() -> None:
+    with tempfile.TemporaryDirectory() as temp_dir:
+        folder = Path(temp_dir) / "images"
+        folder.mkdir()
+        for index in range(IMAGES):
+            Image.new("RGB", (640, 480), ((index * 37) % 256, (index * 91) % 256, 128)).save(folder / f"{index:04}.jpg")
+        images = list_images(folder)
+        cache_dir = Path(temp_dir) / "cache"
+
+        print(f"{IMAGES} images, {MODEL_LATENCY * 1000:.0f}+{JITTER * 1000:.0f} ms per run, {ERROR_RATE:.0%} errors")
+        print(f"{'concurrency':<13}{'images/s':>10}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'retries':>9}{'failed':>8}")
+        for concurrency in CONCURRENCY:
+            # One concurrency limit at a time, so a slow serial run does not take long
+            batch = images[: 40 if concurrency == 1 else IMAGES]
+            stats = await runner(concurrency, cache_dir).run(batch, Path(temp_dir) / f"out-{concurrency}.jsonl")
+            print(
+                f"{concurrency:<13}{stats.images_per_second:>10.1f}{stats.p50 * 1000:>9.0f}{stats.p95 * 1000:>9.0f}"
+                f"{stats.p99 * 1000:>9.0f}{stats.retries:>9}{stats.failed:>8}"
+            )
+
+        output = Path(temp_dir) / "resumed.jsonl"
+        try:
+            await asyncio.wait_for(runner(16, cache_dir).run(images, output), timeout=0.6)
+        except asyncio.TimeoutError:
+            pass
+        with open(output, "a", encoding="utf-8") as f:
+            f.write('{"image": "' + images[-1][:20])
+        before = len(described_images(output))
+        stats = await runner(16, cache_dir).run(images, output)
+        records = [json.loads(line) for line in output.read_text(encoding="utf-8").splitlines() if line.endswith("}")]
+        described = [record["image"] for record in records if "description" in record]
+        print(
+            f"\nkilled after {before} images, resumed: {stats.skipped} skipped, {stats.succeeded} described, "
+            f"{stats.failed} failed. {len(set(described))} of {IMAGES} described, {len(described)} descriptions"
+        )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,163 @@
+import asyncio
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from agent_framework import ChatAgent
+from pydantic import BaseModel
+
+from fake_chat_client import FakeChatClient
+
+"""
+Benchmark: recording agent turns once and replaying them offline with different latency distributions.
+
+FakeChatClient stands in for the live service, with MODEL_LATENCY plus up to JITTER seconds per request.
+The scenario has three agents, like the samples: one calling a tool, one with a structured response_format
+and one streaming its reply. It is recorded through RecordingChatClient, then replayed by
+ReplayChatClient with the recorded latency, none, a uniform and a log-normal one. Every replay must give
+the same texts, structured values and tool calls as the recording. Reports the recording size, turns per
+second with SESSIONS sessions at once, turn latency percentiles and the cost of a turn replayed alone.
+"""
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "agents"))
+from chat_replay import (  # noqa: E402
+    ChatRecording,
+    RecordingChatClient,
+    ReplayChatClient,
+    fixed,
+    lognormal,
+    recorded,
+    uniform,
+)
+
+SESSIONS = 16
+TURNS_PER_SESSION = 8
+MODEL_LATENCY = 0.05
+JITTER = 0.1
+LATENCIES = {
+    "recorded": recorded(),
+    "none": fixed(0.0),
+    "uniform 50-150 ms": uniform(0.05, 0.15),
+    "lognormal p50=80 p95=400 ms": lognormal(0.08, 0.4),
+}
+
+
+class SpamCheck(BaseModel):
+    spam: bool
+    reason: str
+
+
+def get_weather(location: str) -> str:
+    """Get the weather for a location."""
+    return f"The weather in {location} is cloudy with a high of 15C."
+
+
+def agents(client_for) -> list[ChatAgent]:
+    """The three agents of the scenario, on the chat clients client_for(fake client) returns."""
+    return [
+        ChatAgent(
+            chat_client=client_for(
+                FakeChatClient(
+                    latency=MODEL_LATENCY, jitter=JITTER, function_calls=[("get_weather", {"location": "Seattle"})]
+                )
+            ),
+            instructions="You answer questions about the weather.",
+            tools=[get_weather],
+        ),
+        ChatAgent(
+            chat_client=client_for(
+                FakeChatClient(
+                    reply='{"spam": false, "reason": "A known sender."}', latency=MODEL_LATENCY, jitter=JITTER
+                )
+            ),
+            instructions="You detect spam emails.",
+            response_format=SpamCheck,
+        ),
+        ChatAgent(
+            chat_client=client_for(FakeChatClient(latency=MODEL_LATENCY, token_delay=0.002, jitter=JITTER)),
+            instructions="You are a helpful assistant.",
+        ),
+    ]
+
+
+async def session(session_id: int, weather: ChatAgent, spam: ChatAgent, chat: ChatAgent) -> tuple[list, list]:
+    """Run one session of turns. Returns the outcome of every turn and its latency."""
+    outcomes = []
+    latencies = []
+    thread = chat.get_new_thread()
+    for turn in range(TURNS_PER_SESSION):
+        start = time.perf_counter()
+        if turn % 3 == 0:
+            result = await weather.run(f"Session {session_id}: what is the weather in Seattle?")
+            calls = [
+                content.name
+                for message in result.messages
+                for content in message.contents
+                if content.type == "function_call"
+            ]
+            outcomes.append((result.text, calls))
+        elif turn % 3 == 1:
+            result = await spam.run(f"Session {session_id}, email {turn}: You won a prize!")
+            outcomes.append(result.value)
+        else:
+            text = "".join([update.text async for update in chat.run_stream(f"Turn {turn}", thread=thread)])
+            outcomes.append(text)
+        latencies.append(time.perf_counter() - start)
+    return outcomes, latencies
+
+
+async def run_all(scenario_agents: list[ChatAgent]) -> tuple[list, list, float]:
+    start = time.perf_counter()
+    results = await asyncio.gather(*(session(index, *scenario_agents) for index in range(SESSIONS)))
+    seconds = time.perf_counter() - start
+    outcomes = [outcome for session_outcomes, _ in results for outcome in session_outcomes]
+    latencies = [latency for _, session_latencies in results for latency in session_latencies]
+    return outcomes, latencies, seconds
+
+
+def report(label: str, latencies: list[float], seconds: float, extra: str = "") -> None:
+    quantiles = statistics.quantiles(latencies, n=100)
+    print(
+        f"{label:<34}{len(latencies) / seconds:>9.0f}{quantiles[49] * 1000:>9.0f}{quantiles[94] * 1000:>9.0f}"
+        f"{quantiles[98] * 1000:>9.0f}  {extra}"
+    )
+
+
+async def main() -> None:
+    with tempfile.TemporaryDirectory() as temp_dir:
+        path = Path(temp_dir) / "recording.jsonl"
+        turns = SESSIONS * TURNS_PER_SESSION
+        print(
+            f"{SESSIONS} sessions of {TURNS_PER_SESSION} turns at once, "
+            f"{MODEL_LATENCY * 1000:.0f}+{JITTER * 1000:.0f} ms per request"
+        )
+        print(f"{'':<34}{'turns/s':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}")
+
+        recording = ChatRecording(path)
+        expected, latencies, seconds = await run_all(agents(lambda fake: RecordingChatClient(fake, recording)))
+        recording.close()
+        size = path.stat().st_size
+        report("live, recording", latencies, seconds, f"{len(recording)} responses, {size / 1024:.0f} KB")
+
+        for label, latency in LATENCIES.items():
+            recording = ChatRecording(path)
+            outcomes, latencies, seconds = await run_all(
+                agents(lambda fake: ReplayChatClient(recording, latency=latency, seed=1))
+            )
+            same = sum(outcome == want for outcome, want in zip(outcomes, expected))
+            report(f"replay, {label}", latencies, seconds, f"{same}/{turns} same, {recording.stats().misses} misses")
+
+        # Replay cost alone: one request at a time, no latency
+        recording = ChatRecording(path)
+        weather, spam, chat = agents(lambda fake: ReplayChatClient(recording, latency=fixed(0.0)))
+        start = time.perf_counter()
+        for index in range(SESSIONS):
+            await spam.run(f"Session {index}, email 1: You won a prize!")
+        elapsed = time.perf_counter() - start
+        print(f"\nstructured agent turn replayed with no latency: {elapsed / SESSIONS * 1e6:.0f} us")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,151 @@
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+from aiohttp import web
+from azure.ai.projects.aio import AIProjectClient
+from azure.core.credentials import AccessToken
+
+"""
+Benchmark: HTTP connections and throughput of Azure AI project clients, per agent and from ClientRegistry.
+
+A local aiohttp server stands in for the project endpoint. It answers the deployments list with an empty
+page after SERVER_SECONDS and counts the new TCP connections clients open to it. AGENTS agents each make
+ROUNDS requests, all agents at once, through:
+- a new AIProjectClient per request, closed after it, as short-lived samples do
+- one AIProjectClient per agent, each with its own session and connections
+- the clients of one ClientRegistry, sharing one keep-alive pool
+- the same with limit_per_host=LIMIT_PER_HOST, queueing requests beyond it
+Plain http keeps the stub simple. Against the real endpoint each new connection also costs a TLS handshake.
+"""
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "agents"))
+from client_registry import ClientRegistry  # noqa: E402
+
+AGENTS = 8
+ROUNDS = 25
+SERVER_SECONDS = 0.005
+LIMIT_PER_HOST = 4
+
+
+class StubCredential:
+    """Async credential returning a fake token right away."""
+
+    async def get_token(self, *scopes: str, **kwargs) -> AccessToken:
+        return AccessToken("token", int(time.time()) + 3600)
+
+    async def close(self) -> None:
+        pass
+
+
+class StubServer:
+    """Local project endpoint counting the connections it accepts."""
+
+    def __init__(self) -> None:
+        self.requests = 0
+        self.new_connections = 0
+        # Every connection seen, kept alive so the ids of closed transports are not reused
+        self.connections: dict[int, object] = {}
+        self.runner: web.AppRunner | None = None
+        self.endpoint = ""
+
+    async def deployments(self, request: web.Request) -> web.Response:
+        self.requests += 1
+        if id(request.transport) not in self.connections:
+            self.connections[id(request.transport)] = request.transport
+            self.new_connections += 1
+        await asyncio.sleep(SERVER_SECONDS)
+        return web.json_response({"value": []})
+
+    async def start(self) -> None:
+        app = web.Application()
+        app.router.add_get("/api/projects/bench/deployments", self.deployments)
+        self.runner = web.AppRunner(app, access_log=None)
+        await self.runner.setup()
+        site = web.TCPSite(self.runner, "127.0.0.1", 0)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        self.endpoint = f"http://127.0.0.1:{port}/api/projects/bench"
+
+    def reset(self) -> None:
+        self.requests = 0
+        self.new_connections = 0
+
+    async def stop(self) -> None:
+        await self.runner.cleanup()
+
+
+async def list_deployments(client: AIProjectClient) -> None:
+    # The stub serves plain http, which the bearer token policy refuses unless told otherwise
+    async for _ in client.deployments.list(enforce_https=False):
+        pass
+
+
+async def client_per_request(endpoint: str) -> None:
+    for _ in range(ROUNDS):
+        async with AIProjectClient(endpoint=endpoint, credential=StubCredential()) as client:
+            await list_deployments(client)
+
+
+async def client_per_agent(endpoint: str) -> None:
+    async with AIProjectClient(endpoint=endpoint, credential=StubCredential()) as client:
+        for _ in range(ROUNDS):
+            await list_deployments(client)
+
+
+async def registry_client(registry: ClientRegistry, endpoint: str) -> None:
+    # What every agent of a process does: ask the registry, close its client when done
+    async with registry.project_client(endpoint) as client:
+        for _ in range(ROUNDS):
+            await list_deployments(client)
+
+
+async def timed(label: str, server: StubServer, agents) -> None:
+    server.reset()
+    start = time.perf_counter()
+    await asyncio.gather(*agents)
+    elapsed = time.perf_counter() - start
+    print(f"{label:<36}{server.requests:>10}{server.new_connections:>17}{server.requests / elapsed:>12.0f}")
+
+
+async def main() -> None:
+    server = StubServer()
+    await server.start()
+    print(f"{AGENTS} agents x {ROUNDS} requests, {SERVER_SECONDS * 1000:.0f} ms per request at the server")
+    print(f"{'':<36}{'requests':>10}{'new connections':>17}{'req/s':>12}")
+    try:
+        await timed(
+            "client per request", server, [client_per_request(server.endpoint) for _ in range(AGENTS)]
+        )
+        await timed("client per agent", server, [client_per_agent(server.endpoint) for _ in range(AGENTS)])
+
+        registry = ClientRegistry(credential=StubCredential())
+        await timed(
+            "registry", server, [registry_client(registry, server.endpoint) for _ in range(AGENTS)]
+        )
+        # Later agents of the process find the connections open
+        await timed(
+            "registry, warm pool", server, [registry_client(registry, server.endpoint) for _ in range(AGENTS)]
+        )
+        pool_stats = registry.stats()
+        await registry.aclose()
+
+        limited = ClientRegistry(credential=StubCredential(), limit_per_host=LIMIT_PER_HOST)
+        await timed(
+            f"registry, limit_per_host={LIMIT_PER_HOST}",
+            server,
+            [registry_client(limited, server.endpoint) for _ in range(AGENTS)],
+        )
+        limited_stats = limited.stats()
+        await limited.aclose()
+    finally:
+        await server.stop()
+
+    for label, stats in (("registry", pool_stats), (f"limit_per_host={LIMIT_PER_HOST}", limited_stats)):
+        for origin, pool in stats.items():
+            print(f"{label} pool {origin}: {pool}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
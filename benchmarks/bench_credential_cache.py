@@ -0,0 +1,105 @@
+import asyncio
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from azure.core.credentials import AccessToken
+
+"""
+Benchmark: token fetches of many clients, with one credential per client and with SharedTokenCredential.
+
+StubCliCredential stands in for AzureCliCredential: it takes FETCH_SECONDS per token, like the az
+subprocess, and counts its fetches. Scenarios:
+- CLIENTS clients each with their own credential, as the samples did, each asking for a token
+- the same clients sharing one SharedTokenCredential
+- a second process reading the token from the shared cache file
+- a credential signed in as another account, and a request with enable_cae, on the same cache file,
+  each of which must fetch a token of its own
+- a token close to expiry, refreshed in the background while callers keep the cached one
+"""
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "agents"))
+from credential_cache import SharedTokenCredential  # noqa: E402
+
+CLIENTS = 8
+FETCH_SECONDS = 0.3
+SCOPE = "https://ai.azure.com/.default"
+
+
+class StubCliCredential:
+    """Async credential returning fake tokens after a delay, counting fetches across instances."""
+
+    fetches = 0
+    lifetime = 3600
+
+    async def get_token(self, *scopes: str, **kwargs) -> AccessToken:
+        await asyncio.sleep(FETCH_SECONDS)
+        StubCliCredential.fetches += 1
+        return AccessToken(f"token-{StubCliCredential.fetches}", int(time.time()) + StubCliCredential.lifetime)
+
+    async def close(self) -> None:
+        pass
+
+
+async def timed(label: str, coroutine) -> None:
+    StubCliCredential.fetches = 0
+    start = time.perf_counter()
+    await coroutine
+    elapsed = time.perf_counter() - start
+    print(f"{label:<44}{StubCliCredential.fetches:>8}{elapsed * 1000:>10.0f}")
+
+
+async def child(cache_path: str) -> None:
+    credential = SharedTokenCredential(StubCliCredential, cache_path=cache_path)
+    await credential.get_token(SCOPE)
+    print(credential.stats().fetches, credential.stats().disk_hits)
+
+
+async def main() -> None:
+    if len(sys.argv) == 3 and sys.argv[1] == "--child":
+        await child(sys.argv[2])
+        return
+
+    cache_path = Path(tempfile.mkdtemp()) / "token_cache.json"
+    print(f"{CLIENTS} clients, {FETCH_SECONDS * 1000:.0f}ms per underlying fetch")
+    print(f"{'scenario':<44}{'fetches':>8}{'ms':>10}")
+
+    # Each client's pipeline asks its own credential once, then caches the token itself
+    await timed(
+        "one credential per client",
+        asyncio.gather(*(StubCliCredential().get_token(SCOPE) for _ in range(CLIENTS))),
+    )
+
+    shared = SharedTokenCredential(StubCliCredential, cache_path=cache_path)
+    await timed("shared credential, cold", asyncio.gather(*(shared.get_token(SCOPE) for _ in range(CLIENTS))))
+    await timed("shared credential, warm", asyncio.gather(*(shared.get_token(SCOPE) for _ in range(CLIENTS))))
+
+    StubCliCredential.fetches = 0
+    start = time.perf_counter()
+    process = await asyncio.create_subprocess_exec(
+        sys.executable, __file__, "--child", str(cache_path), stdout=asyncio.subprocess.PIPE
+    )
+    output, _ = await process.communicate()
+    fetches, disk_hits = output.decode().split()
+    elapsed = time.perf_counter() - start
+    label = "second process (incl. interpreter start)"
+    print(f"{label:<44}{fetches:>8}{elapsed * 1000:>10.0f}   disk hits: {disk_hits}")
+
+    other = SharedTokenCredential(StubCliCredential, cache_path=cache_path, identity=lambda: "someone-else")
+    await timed("other signed-in account, same cache file", other.get_token(SCOPE))
+    await timed("enable_cae, same cache file", shared.get_token(SCOPE, enable_cae=True))
+
+    # Tokens that expire in refresh_before + 1 seconds, so the next request after a second is in the window
+    expiring = SharedTokenCredential(StubCliCredential, cache_path=None, refresh_before=60)
+    StubCliCredential.lifetime = 61
+    await expiring.get_token(SCOPE)
+    await asyncio.sleep(1.1)
+    await timed("near expiry, callers served from cache", expiring.get_token(SCOPE))
+    await asyncio.sleep(FETCH_SECONDS * 1.5)
+    print(f"background refreshes: {expiring.stats().background_refreshes}, total fetches: {expiring.stats().fetches}")
+    print(f"shared credential: {shared.stats()}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
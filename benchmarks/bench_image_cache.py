@@ -0,0 +1,191 @@
+import asyncio
+import io
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from agent_framework import DataContent
+from aiohttp import web
+from PIL import Image, ImageDraw, ImageFilter
+
+"""
+Benchmark: inline payload bytes and preprocessing time of images, as sent and through ImagePreprocessor.
+
+Runs on the images in the folder given as the first argument, or on generated photo-like test images:
+gradients, shapes and sensor noise at camera and screenshot sizes. For each image it reports the inline
+payload (base64 data URI) of the original and of the preprocessed image, the time of a cold call that
+decodes, scales and encodes, and of a warm call served from the cache. Then totals for a few settings.
+Last, the images served over HTTP by a local server, to show what a URI costs within url_ttl, after it
+when the server confirms the image unchanged with its ETag, after it changed, and with no validators.
+Each of those calls must make exactly the requests and misses listed, or the run fails.
+"""
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "agents"))
+from image_cache import ImagePreprocessor  # noqa: E402
+
+# name -> (size, format) of the generated test images
+TEST_IMAGES = {
+    "boardwalk.jpg": ((2560, 1707), "JPEG"),
+    "camera.jpg": ((4032, 3024), "JPEG"),
+    "portrait.jpg": ((1536, 2048), "JPEG"),
+    "screenshot.png": ((1920, 1080), "PNG"),
+    "thumbnail.jpg": ((640, 427), "JPEG"),
+}
+EXTENSIONS = {".jpg", ".jpeg", ".png", ".webp", ".gif", ".bmp", ".tif", ".tiff"}
+# max_edge, format, quality
+SETTINGS = [(1024, "WEBP", 80), (1024, "JPEG", 85), (1536, "WEBP", 80), (768, "WEBP", 80)]
+URL_TTL = 0.5
+
+
+def generate(folder: Path) -> None:
+    for index, (name, (size, image_format)) in enumerate(TEST_IMAGES.items()):
+        width, height = size
+        image = Image.merge(
+            "RGB",
+            (
+                Image.linear_gradient("L").resize(size),
+                Image.radial_gradient("L").resize(size),
+                Image.linear_gradient("L").rotate(90 + index * 30).resize(size),
+            ),
+        )
+        draw = ImageDraw.Draw(image)
+        for shape in range(40):
+            x, y = (shape * 7919 + index * 104729) % width, (shape * 6271 + index * 130363) % height
+            color = ((shape * 53) % 256, (shape * 97) % 256, (shape * 193) % 256)
+            draw.ellipse((x, y, x + width // 8, y + height // 10), fill=color)
+        if image_format == "PNG":
+            draw.rectangle((0, 0, width, height // 12), fill=(40, 40, 48))
+            for line in range(30):
+                draw.text((40, height // 10 + line * 30), f"Line {line} of a screenshot with text", fill=(0, 0, 0))
+        else:
+            image = image.filter(ImageFilter.GaussianBlur(2))
+            noise = Image.effect_noise(size, 24).convert("RGB")
+            image = Image.blend(image, noise, 0.12)
+        image.save(folder / name, image_format, quality=92)
+
+
+def payload(data: bytes, media_type: str) -> int:
+    return len(DataContent(data=data, media_type=media_type).uri)
+
+
+class ImageServer:
+    """Serves one image at /etag with an ETag, honoring If-None-Match, and at /plain without validators."""
+
+    def __init__(self, data: bytes) -> None:
+        self.data = data
+        self.version = 1
+        self.downloads = 0
+        self.not_modified = 0
+
+    async def etag(self, request: web.Request) -> web.Response:
+        etag = f'"v{self.version}"'
+        if request.headers.get("If-None-Match") == etag:
+            self.not_modified += 1
+            return web.Response(status=304, headers={"ETag": etag})
+        self.downloads += 1
+        return web.Response(body=self.data, content_type="image/jpeg", headers={"ETag": etag})
+
+    async def plain(self, request: web.Request) -> web.Response:
+        self.downloads += 1
+        return web.Response(body=self.data, content_type="image/jpeg")
+
+
+async def url_rows(image: Path, cache_dir: Path) -> None:
+    server = ImageServer(image.read_bytes())
+    app = web.Application()
+    app.router.add_get("/etag", server.etag)
+    app.router.add_get("/plain", server.plain)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    base = f"http://127.0.0.1:{site._server.sockets[0].getsockname()[1]}"
+    preprocessor = ImagePreprocessor(cache_dir, url_ttl=URL_TTL)
+    print(f"\n{image.name} over HTTP, url_ttl={URL_TTL * 1000:.0f} ms")
+    print(f"{'call':<34}{'downloads':>10}{'304s':>6}{'misses':>8}{'ms':>8}")
+
+    async def row(label: str, path: str, expected: tuple[int, int, int]) -> str:
+        """Prepare the URL at path, checking the (downloads, 304s, misses) it caused."""
+        downloads, not_modified, misses = server.downloads, server.not_modified, preprocessor.misses
+        start = time.perf_counter()
+        content = await preprocessor.prepare(base + path)
+        elapsed = time.perf_counter() - start
+        counts = (server.downloads - downloads, server.not_modified - not_modified, preprocessor.misses - misses)
+        print(f"{label:<34}{counts[0]:>10}{counts[1]:>6}{counts[2]:>8}{elapsed * 1000:>8.1f}", end="")
+        print("" if counts == expected else f"  FAILED, expected {expected}")
+        if counts != expected:
+            raise SystemExit(1)
+        return content.uri
+
+    try:
+        first = await row("first use", "/etag", (1, 0, 1))
+        await row("within url_ttl", "/etag", (0, 0, 0))
+        await asyncio.sleep(URL_TTL)
+        await row("after url_ttl, unchanged", "/etag", (0, 1, 0))
+        await row("within url_ttl again", "/etag", (0, 0, 0))
+        await asyncio.sleep(URL_TTL)
+        with Image.open(image) as original:
+            changed = io.BytesIO()
+            original.rotate(90, expand=True).save(changed, "JPEG", quality=92)
+        server.data, server.version = changed.getvalue(), 2
+        updated = await row("after url_ttl, changed", "/etag", (1, 0, 1))
+        if updated == first:
+            print(f"{'':<34}FAILED, the cached image was served after it changed")
+            raise SystemExit(1)
+        await row("no validators, first use", "/plain", (1, 0, 0))
+        await asyncio.sleep(URL_TTL)
+        await row("no validators, after url_ttl", "/plain", (1, 0, 0))
+        print(preprocessor.stats())
+    finally:
+        await runner.cleanup()
+
+
+async def main() -> None:
+    with tempfile.TemporaryDirectory() as temp_dir:
+        folder = Path(sys.argv[1]) if len(sys.argv) > 1 else Path(temp_dir) / "images"
+        if len(sys.argv) == 1:
+            folder.mkdir()
+            generate(folder)
+        images = sorted(path for path in folder.iterdir() if path.suffix.lower() in EXTENSIONS)
+
+        preprocessor = ImagePreprocessor(cache_dir=Path(temp_dir) / "cache")
+        print(f"{len(images)} images, max_edge={preprocessor.max_edge} {preprocessor.format} q{preprocessor.quality}")
+        original_total = 0
+        print(f"{'image':<22}{'size':>11}{'original KB':>13}{'inline KB':>11}{'cold ms':>9}{'warm ms':>9}")
+        for path in images:
+            with Image.open(path) as image:
+                size = f"{image.width}x{image.height}"
+                media_type = Image.MIME[image.format]
+            start = time.perf_counter()
+            content = await preprocessor.prepare(path)
+            cold = time.perf_counter() - start
+            start = time.perf_counter()
+            await preprocessor.prepare(path)
+            warm = time.perf_counter() - start
+            original = payload(path.read_bytes(), media_type)
+            original_total += original
+            print(
+                f"{path.name:<22}{size:>11}{original / 1024:>13.0f}{len(content.uri) / 1024:>11.0f}"
+                f"{cold * 1000:>9.1f}{warm * 1000:>9.1f}"
+            )
+        print(preprocessor.stats())
+
+        print(f"\n{'settings':<22}{'inline KB':>11}{'of original':>13}{'cold ms':>9}")
+        for max_edge, image_format, quality in SETTINGS:
+            # A cache of its own, so every row pays for processing
+            cache_dir = Path(temp_dir) / f"{image_format}-{max_edge}"
+            preprocessor = ImagePreprocessor(cache_dir, max_edge, image_format, quality)
+            total = 0
+            for path in images:
+                total += len((await preprocessor.prepare(path)).uri)
+            print(
+                f"{f'{max_edge} {image_format} q{quality}':<22}{total / 1024:>11.0f}{total / original_total:>13.1%}"
+                f"{preprocessor.stats().processing_seconds * 1000:>9.0f}"
+            )
+
+        await url_rows(images[0], Path(temp_dir) / "url-cache")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
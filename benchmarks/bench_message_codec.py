@@ -0,0 +1,102 @@
+import random
+import sys
+import time
+from pathlib import Path
+
+from agent_framework import (
+    ChatMessage,
+    FunctionApprovalRequestContent,
+    FunctionCallContent,
+    FunctionResultContent,
+    Role,
+    TextContent,
+)
+
+"""
+Microbenchmark: chat message codecs used by RedisChatMessageStore.
+
+Encodes and decodes a corpus shaped like the weather assistant samples: user questions, assistant
+turns with several function calls, tool results, approval requests and long final answers. Reports
+encode and decode throughput and the stored bytes per message for every codec.
+"""
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "agents"))
+from agent_store_history_third_party import JsonMessageCodec, MsgpackMessageCodec  # noqa: E402
+
+CONVERSATIONS = 200
+ROUNDS = 5
+
+CITIES = ["Seattle, WA", "Portland, OR", "San Francisco, CA", "Madison, WI", "Austin, TX"]
+
+
+def build_corpus() -> list[ChatMessage]:
+    rng = random.Random(42)
+    corpus: list[ChatMessage] = []
+    for conversation in range(CONVERSATIONS):
+        cities = rng.sample(CITIES, 3)
+        calls = [
+            FunctionCallContent(call_id=f"call_{conversation}_{i}", name="get_weather", arguments={"location": city})
+            for i, city in enumerate(cities)
+        ]
+        detail_call = FunctionCallContent(
+            call_id=f"call_{conversation}_detail", name="get_weather_detail", arguments={"location": cities[0]}
+        )
+        corpus += [
+            ChatMessage(role=Role.USER, text=f"What is the weather like in {', '.join(cities)} this weekend?"),
+            ChatMessage(role=Role.ASSISTANT, contents=[TextContent(text="Let me check those cities."), *calls]),
+            *(
+                ChatMessage(
+                    role=Role.TOOL,
+                    contents=[
+                        FunctionResultContent(
+                            call_id=call.call_id, result=f"The weather in {call.arguments['location']} is cloudy."
+                        )
+                    ],
+                )
+                for call in calls
+            ),
+            ChatMessage(
+                role=Role.ASSISTANT,
+                contents=[FunctionApprovalRequestContent(id=f"approval_{conversation}", function_call=detail_call)],
+            ),
+            ChatMessage(
+                role=Role.ASSISTANT,
+                text=" ".join(
+                    f"In {city} expect {rng.choice(['clouds', 'rain', 'sun'])} with a high of {rng.randint(5, 30)}C."
+                    for city in cities * rng.randint(1, 20)
+                ),
+            ),
+        ]
+    return corpus
+
+
+def measure(name: str, codec, corpus: list[ChatMessage]) -> None:
+    start = time.perf_counter()
+    for _ in range(ROUNDS):
+        encoded = [codec.encode(message) for message in corpus]
+    encode_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for _ in range(ROUNDS):
+        for entry in encoded:
+            codec.decode(entry)
+    decode_seconds = time.perf_counter() - start
+
+    total = len(corpus) * ROUNDS
+    stored = sum(len(entry.encode() if isinstance(entry, str) else entry) for entry in encoded)
+    print(
+        f"{name:<16} encode={total / encode_seconds:9.0f} msg/s  decode={total / decode_seconds:9.0f} msg/s  "
+        f"bytes/msg={stored / len(corpus):7.1f}"
+    )
+
+
+def main() -> None:
+    corpus = build_corpus()
+    print(f"{len(corpus)} messages, {ROUNDS} rounds")
+    measure("json", JsonMessageCodec(), corpus)
+    measure("msgpack", MsgpackMessageCodec(compress_threshold=None), corpus)
+    measure("msgpack+zstd", MsgpackMessageCodec(), corpus)
+
+
+if __name__ == "__main__":
+    main()
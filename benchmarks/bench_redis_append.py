@@ -0,0 +1,117 @@
+import asyncio
+import statistics
+import sys
+import time
+from pathlib import Path
+from urllib.parse import urlparse
+
+import redis.asyncio as redis
+from agent_framework import ChatMessage, Role
+
+"""
+Benchmark: per-turn append latency of RedisChatMessageStore.
+
+Compares the original RPUSH -> LLEN -> LTRIM sequence (up to three round trips) against the
+scripted add_messages (one round trip). Every turn appends a user and an assistant message, the
+same shape an agent run produces.
+
+Runs against a local redis-server, by default redis://localhost:6379. Pass another URL as the
+first command line argument to point it elsewhere. Loopback round trips are nearly free, so the
+store talks to redis through a small proxy that delays every request by NETWORK_DELAY_MS to
+approximate the hop to a hosted cache. Set it to 0 to measure raw loopback.
+"""
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "agents"))
+from agent_store_history_third_party import APPEND_AND_TRIM_SCRIPT, RedisChatMessageStore  # noqa: E402
+
+TURNS = 500
+MAX_MESSAGES = 100
+NETWORK_DELAY_MS = 0.5
+
+
+async def start_delay_proxy(url: str, delay: float) -> tuple[asyncio.Server, str]:
+    """Forward a local port to the redis server, delaying each client request by ``delay`` seconds."""
+    target = urlparse(url)
+
+    async def pipe(reader: asyncio.StreamReader, writer: asyncio.StreamWriter, delay: float) -> None:
+        try:
+            while chunk := await reader.read(65536):
+                if delay:
+                    await asyncio.sleep(delay)
+                writer.write(chunk)
+                await writer.drain()
+        finally:
+            writer.close()
+
+    async def handle(client_reader: asyncio.StreamReader, client_writer: asyncio.StreamWriter) -> None:
+        server_reader, server_writer = await asyncio.open_connection(target.hostname, target.port or 6379)
+        try:
+            await asyncio.gather(
+                pipe(client_reader, server_writer, delay),
+                pipe(server_reader, client_writer, 0),
+                return_exceptions=True,
+            )
+        except asyncio.CancelledError:
+            # The event loop is shutting down with the connection still open.
+            server_writer.close()
+
+    server = await asyncio.start_server(handle, "127.0.0.1", 0)
+    host, port = server.sockets[0].getsockname()[:2]
+    return server, f"redis://{host}:{port}"
+
+
+def make_store(url: str, thread_id: str) -> RedisChatMessageStore:
+    store = RedisChatMessageStore(redis_url=url, thread_id=thread_id, max_messages=MAX_MESSAGES)
+    store._redis_client = redis.from_url(url, decode_responses=True)
+    store._append_script = store._redis_client.register_script(APPEND_AND_TRIM_SCRIPT)
+    return store
+
+
+async def legacy_add_messages(store: RedisChatMessageStore, messages: list[ChatMessage]) -> None:
+    """The add_messages implementation before scripting, kept here as the baseline."""
+    serialized_messages = [store._serialize_message(msg) for msg in messages]
+    await store._redis_client.rpush(store.redis_key, *serialized_messages)
+    if store.max_messages is not None:
+        current_count = await store._redis_client.llen(store.redis_key)
+        if current_count > store.max_messages:
+            await store._redis_client.ltrim(store.redis_key, -store.max_messages, -1)
+
+
+async def measure(store: RedisChatMessageStore, append) -> list[float]:
+    await store.clear()
+    samples: list[float] = []
+    for turn in range(TURNS):
+        messages = [
+            ChatMessage(role=Role.USER, text=f"Question number {turn}?"),
+            ChatMessage(role=Role.ASSISTANT, text=f"Answer number {turn}."),
+        ]
+        start = time.perf_counter()
+        await append(store, messages)
+        samples.append((time.perf_counter() - start) * 1_000_000)
+    await store.clear()
+    return samples
+
+
+def report(name: str, samples: list[float]) -> None:
+    quantiles = statistics.quantiles(samples, n=100)
+    print(f"{name:<10} p50={quantiles[49]:8.1f}us  p99={quantiles[98]:8.1f}us  mean={statistics.fmean(samples):8.1f}us")
+
+
+async def main() -> None:
+    url = sys.argv[1] if len(sys.argv) > 1 else "redis://localhost:6379"
+    proxy, proxy_url = await start_delay_proxy(url, NETWORK_DELAY_MS / 1000)
+    print(f"Benchmarking against {url} ({TURNS} turns, max_messages={MAX_MESSAGES}, delay={NETWORK_DELAY_MS}ms)")
+
+    legacy_store = make_store(proxy_url, "bench_legacy")
+    scripted_store = make_store(proxy_url, "bench_scripted")
+    try:
+        report("before", await measure(legacy_store, legacy_add_messages))
+        report("after", await measure(scripted_store, lambda store, messages: store.add_messages(messages)))
+    finally:
+        await legacy_store.aclose()
+        await scripted_store.aclose()
+        proxy.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
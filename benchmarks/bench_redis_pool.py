@@ -0,0 +1,84 @@
+import asyncio
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+from urllib.parse import urlparse
+
+import redis.asyncio as redis
+from agent_framework import ChatMessage, Role
+
+"""
+Load test: many concurrent threads sharing the Redis connection pool registry.
+
+Opens THREADS conversation threads at once, the way chat_message_store_factory does when many
+users arrive together. Every thread runs TURNS_PER_THREAD turns of add_messages + list_messages,
+with up to THINK_SECONDS of user think time before each turn.
+Reports per-turn latency, the pool metrics (in use, idle, wait time) and how many client
+connections the redis server saw, which stays at the pool size instead of growing with threads.
+
+Runs against a local redis-server, by default redis://localhost:6379. Pass another URL as the
+first command line argument to point it elsewhere.
+"""
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "agents"))
+from agent_store_history_third_party import RedisChatMessageStore, redis_pools  # noqa: E402
+
+THREADS = 10_000
+TURNS_PER_THREAD = 2
+MAX_MESSAGES = 100
+THINK_SECONDS = 30.0
+
+
+async def run_thread(store: RedisChatMessageStore, latencies: list[float]) -> None:
+    for turn in range(TURNS_PER_THREAD):
+        await asyncio.sleep(random.uniform(0, THINK_SECONDS))
+        start = time.perf_counter()
+        await store.list_messages()
+        await store.add_messages(
+            [
+                ChatMessage(role=Role.USER, text=f"Question number {turn}?"),
+                ChatMessage(role=Role.ASSISTANT, text=f"Answer number {turn}."),
+            ]
+        )
+        latencies.append((time.perf_counter() - start) * 1000)
+
+
+async def main() -> None:
+    url = urlparse(sys.argv[1] if len(sys.argv) > 1 else "redis://localhost:6379")
+    monitor = redis.Redis(host=url.hostname, port=url.port or 6379)
+    print(f"Opening {THREADS} threads against {url.geturl()} (pool max_connections={redis_pools.max_connections})")
+
+    stores = [
+        RedisChatMessageStore(
+            redis_url=url.hostname, redis_port=url.port or 6379, thread_id=f"load_{i}", max_messages=MAX_MESSAGES
+        )
+        for i in range(THREADS)
+    ]
+    latencies: list[float] = []
+    start = time.perf_counter()
+    try:
+        await asyncio.gather(*(run_thread(store, latencies) for store in stores))
+        elapsed = time.perf_counter() - start
+
+        clients = (await monitor.info("clients"))["connected_clients"]
+        quantiles = statistics.quantiles(latencies, n=100)
+        print(f"{len(latencies)} turns in {elapsed:.2f}s")
+        print(f"turn latency p50={quantiles[49]:.1f}ms p99={quantiles[98]:.1f}ms")
+        print(f"redis connected_clients={clients} (including this monitor)")
+        for stats in redis_pools.stats():
+            mean_wait = stats.total_wait_seconds / max(stats.acquisitions, 1) * 1000
+            print(
+                f"pool {stats.endpoint}: in_use={stats.in_use} idle={stats.idle} max={stats.max_connections} "
+                f"acquisitions={stats.acquisitions} mean_wait={mean_wait:.2f}ms "
+                f"max_wait={stats.max_wait_seconds * 1000:.1f}ms"
+            )
+    finally:
+        await monitor.delete(*(store.redis_key for store in stores))
+        await monitor.aclose()
+        await redis_pools.aclose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
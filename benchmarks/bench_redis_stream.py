@@ -0,0 +1,164 @@
+import asyncio
+import statistics
+import sys
+import time
+from pathlib import Path
+from urllib.parse import urlparse
+from uuid import uuid4
+
+import redis.asyncio as redis
+from agent_framework import ChatMessage, Role
+
+"""
+Benchmark: RedisStreamChatMessageStore across replicas, with checks of what it must guarantee.
+
+Two stores on the same thread stand in for two replicas: a writer appending turns and a reader
+following them. Checks, each failing the run if it does not hold:
+- XADD trimming keeps the stream near max_messages and list_messages returns exactly the newest ones
+- read_since on the reader returns only the entries the writer added since its last read, and the
+  reader's history matches the writer's after every turn
+- clear on the writer empties the reader's history on its next read, and later entries still arrive
+- tail blocks while nothing is written, in XREAD calls of block_ms, and yields each entry once
+Then reports the time of an incremental read against rereading the whole history, and how long a
+message takes from add_messages on the writer to tail on the reader.
+
+Runs against a local redis-server, by default redis://localhost:6379. Pass another URL as the
+first command line argument to point it elsewhere.
+"""
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "agents"))
+from agent_store_history_third_party import RedisStreamChatMessageStore, redis_pools  # noqa: E402
+
+MAX_MESSAGES = 50
+TRIM_TURNS = 500
+FOLLOW_TURNS = 200
+TAIL_MESSAGES = 200
+BLOCK_MS = 200
+IDLE_SECONDS = 1.0
+
+
+def turn(number: int) -> list[ChatMessage]:
+    return [
+        ChatMessage(role=Role.USER, text=f"Question number {number}?"),
+        ChatMessage(role=Role.ASSISTANT, text=f"Answer number {number}. " * 20),
+    ]
+
+
+def check(label: str, ok: bool, detail: str) -> None:
+    print(f"{label:<58}{'ok' if ok else 'FAILED':>8}  {detail}")
+    if not ok:
+        raise SystemExit(1)
+
+
+async def xread_calls(monitor: redis.Redis) -> int:
+    return (await monitor.info("commandstats")).get("cmdstat_xread", {}).get("calls", 0)
+
+
+async def main() -> None:
+    url = urlparse(sys.argv[1] if len(sys.argv) > 1 else "redis://localhost:6379")
+    monitor = redis.Redis(host=url.hostname, port=url.port or 6379)
+    thread_id = f"stream_bench_{uuid4()}"
+
+    def store(max_messages: int | None = None) -> RedisStreamChatMessageStore:
+        return RedisStreamChatMessageStore(
+            redis_url=url.hostname, redis_port=url.port or 6379, thread_id=thread_id, max_messages=max_messages
+        )
+
+    writer, reader = store(MAX_MESSAGES), store(MAX_MESSAGES)
+    print(f"Against {url.geturl()}, thread {thread_id}")
+    try:
+        for number in range(TRIM_TURNS):
+            await writer.add_messages(turn(number))
+        length = await monitor.xlen(writer.redis_key)
+        messages = await reader.list_messages()
+        newest = [message.text for message in turn(TRIM_TURNS - 1)]
+        check(
+            f"XADD MAXLEN ~{MAX_MESSAGES} after {TRIM_TURNS * 2} messages",
+            MAX_MESSAGES <= length < TRIM_TURNS * 2 // 4,
+            f"stream length {length}",
+        )
+        check(
+            "list_messages returns the newest max_messages",
+            len(messages) == MAX_MESSAGES and [message.text for message in messages[-2:]] == newest,
+            f"{len(messages)} messages, last is turn {TRIM_TURNS - 1}",
+        )
+        await writer.clear()
+
+        writer, reader = store(), store()
+        await reader.list_messages()
+        incremental = []
+        for number in range(FOLLOW_TURNS):
+            await writer.add_messages(turn(number))
+            start = time.perf_counter()
+            new = await reader.read_since()
+            incremental.append(time.perf_counter() - start)
+            if [message.text for message in new] != [message.text for message in turn(number)]:
+                check("read_since returns only the new entries", False, f"turn {number}: {len(new)} messages")
+        check("read_since returns only the new entries", True, f"2 messages in each of {FOLLOW_TURNS} turns")
+        history = [message.text for message in await reader.list_messages()]
+        same = history == [message.text for message in await writer.list_messages()]
+        check("reader history matches the writer's", same, f"{len(history)} messages")
+        start = time.perf_counter()
+        await store().list_messages()
+        full = time.perf_counter() - start
+        print(
+            f"{'':<66}  incremental read {statistics.median(incremental) * 1000:.2f} ms, "
+            f"full reread of {FOLLOW_TURNS * 2} messages {full * 1000:.2f} ms"
+        )
+
+        await writer.clear()
+        after_clear = await reader.list_messages()
+        await writer.add_messages(turn(FOLLOW_TURNS))
+        after_new = await reader.list_messages()
+        check("clear empties the other replica's history", after_clear == [], f"{len(after_clear)} messages")
+        check(
+            "entries written after clear still arrive",
+            [message.text for message in after_new] == [message.text for message in turn(FOLLOW_TURNS)],
+            f"{len(after_new)} messages",
+        )
+
+        received: list[tuple[str, float]] = []
+
+        async def follow() -> None:
+            async for message in reader.tail(block_ms=BLOCK_MS):
+                received.append((message.text, time.perf_counter()))
+
+        task = asyncio.create_task(follow())
+        await asyncio.sleep(0.1)
+        calls = await xread_calls(monitor)
+        await asyncio.sleep(IDLE_SECONDS)
+        idle_calls = await xread_calls(monitor) - calls
+        expected_calls = IDLE_SECONDS * 1000 / BLOCK_MS
+        check(
+            f"tail blocks while idle, in XREADs of {BLOCK_MS} ms",
+            not received and idle_calls <= expected_calls + 1,
+            f"{idle_calls} XREADs in {IDLE_SECONDS:.0f} s, nothing yielded",
+        )
+        latencies = []
+        for number in range(TAIL_MESSAGES):
+            message = ChatMessage(role=Role.USER, text=f"Live message {number}")
+            start = time.perf_counter()
+            await writer.add_messages([message])
+            while len(received) <= number:
+                await asyncio.sleep(0)
+            latencies.append(received[number][1] - start)
+        await asyncio.sleep(BLOCK_MS / 1000)
+        task.cancel()
+        texts = [text for text, _ in received]
+        check(
+            "tail yields every entry once, in order",
+            texts == [f"Live message {number}" for number in range(TAIL_MESSAGES)],
+            f"{len(texts)} of {TAIL_MESSAGES} messages",
+        )
+        quantiles = statistics.quantiles(latencies, n=100)
+        print(
+            f"{'':<66}  add_messages to tail p50={quantiles[49] * 1000:.2f} ms p99={quantiles[98] * 1000:.2f} ms"
+        )
+    finally:
+        await monitor.delete(writer.redis_key)
+        await monitor.aclose()
+        await redis_pools.aclose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
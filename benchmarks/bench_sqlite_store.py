@@ -0,0 +1,113 @@
+import asyncio
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from agent_framework import ChatMessage, FunctionCallContent, FunctionResultContent, Role
+
+"""
+Benchmark: concurrent writer throughput of SqliteChatMessageStore against RedisChatMessageStore.
+
+WRITERS conversation threads each append TURNS turns (a user and an assistant message) as fast as
+they can. Reports committed messages per second and, for SQLite, how many writes each transaction
+carried. Runs SQLite with synchronous=FULL (an fsync per commit) with and without group commit,
+and with the default synchronous=NORMAL. First checks that a history window cutting between a function
+call and its results does not start with the orphaned results.
+
+The Redis store runs against a local redis-server, by default redis://localhost:6379. Pass another
+URL as the first command line argument to point it elsewhere.
+"""
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "agents"))
+from agent_store_history_third_party import RedisChatMessageStore, redis_pools  # noqa: E402
+from chat_history_sqlite import SqliteChatMessageStore, close_databases, get_database  # noqa: E402
+
+WRITER_COUNTS = [1, 8, 64]
+TURNS = 50
+
+
+def make_turn(turn: int) -> list[ChatMessage]:
+    return [
+        ChatMessage(role=Role.USER, text=f"Turn {turn}: what is the weather looking like in Seattle?"),
+        ChatMessage(role=Role.ASSISTANT, text=f"Turn {turn}: cloudy with a high of 15C and light rain later."),
+    ]
+
+
+def check(label: str, ok: bool, detail: str) -> None:
+    print(f"{label:<52}{'ok' if ok else 'FAILED':>8}  {detail}")
+    if not ok:
+        raise SystemExit(1)
+
+
+async def check_window(directory: Path) -> None:
+    store = SqliteChatMessageStore(directory / "window.db", thread_id="window", history_window=2)
+    calls = [
+        FunctionCallContent(call_id="c1", name="get_weather", arguments={"location": "Seattle, WA"}),
+        FunctionCallContent(call_id="c2", name="get_weather", arguments={"location": "Portland, OR"}),
+    ]
+    await store.add_messages(
+        [
+            ChatMessage(role=Role.USER, text="How is the weather in Seattle and Portland?"),
+            ChatMessage(role=Role.ASSISTANT, contents=calls),
+            ChatMessage(role=Role.TOOL, contents=[FunctionResultContent(call_id="c1", result="cloudy")]),
+            ChatMessage(role=Role.TOOL, contents=[FunctionResultContent(call_id="c2", result="rain")]),
+        ]
+    )
+    roles = [message.role.value for message in await store.list_messages()]
+    check("window of 2 drops results without their call", roles == [], f"{roles}")
+    wider = [message.role.value for message in await store.list_recent_messages(3)]
+    check("window of 3 starts at the call", wider == ["assistant", "tool", "tool"], f"{wider}")
+
+
+async def run_writers(stores: list) -> float:
+    async def write(store) -> None:
+        for turn in range(TURNS):
+            await store.add_messages(make_turn(turn))
+
+    start = time.perf_counter()
+    await asyncio.gather(*(write(store) for store in stores))
+    return len(stores) * TURNS * 2 / (time.perf_counter() - start)
+
+
+async def measure_sqlite(directory: Path, writers: int, **settings) -> str:
+    path = directory / f"history_{len(list(directory.iterdir()))}.db"
+    database = get_database(path, **settings)
+    stores = [SqliteChatMessageStore(path, thread_id=f"bench_{i}") for i in range(writers)]
+    rate = await run_writers(stores)
+    return f"{rate:>9.0f} msg/s  {database.writes / max(database.commits, 1):6.1f} writes/commit"
+
+
+async def measure_redis(url: str, writers: int) -> str:
+    stores = [RedisChatMessageStore(redis_url=url, thread_id=f"bench_sqlite_{i}") for i in range(writers)]
+    try:
+        rate = await run_writers(stores)
+    finally:
+        for store in stores:
+            await store.clear()
+    return f"{rate:>9.0f} msg/s"
+
+
+async def main() -> None:
+    url = sys.argv[1] if len(sys.argv) > 1 else "redis://localhost:6379"
+    with tempfile.TemporaryDirectory() as directory:
+        await check_window(Path(directory))
+        print()
+        for writers in WRITER_COUNTS:
+            print(f"{writers} writers x {TURNS} turns")
+            results = {
+                "sqlite FULL, no grouping": await measure_sqlite(
+                    Path(directory), writers, synchronous="FULL", max_batch=1
+                ),
+                "sqlite FULL, group commit": await measure_sqlite(Path(directory), writers, synchronous="FULL"),
+                "sqlite NORMAL, group commit": await measure_sqlite(Path(directory), writers),
+                "redis": await measure_redis(url, writers),
+            }
+            for name, result in results.items():
+                print(f"  {name:<28} {result}")
+        await close_databases()
+    await redis_pools.aclose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,100 @@
+import asyncio
+import os
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+"""
+Benchmark: cold start of every entry point, and of an agent worker with and without bootstrap.warm_up.
+
+Part 1 runs each script in agents/ and workflows/ in a fresh interpreter with -X importtime, without
+calling main(), and reports the wall time, the time spent importing and the slowest top-level imports.
+Part 2 starts a worker that needs the SDK and a first token, with a stub credential taking
+FETCH_SECONDS like the az CLI: importing and then fetching, against warm_up() doing both at once.
+"""
+
+ROOT = Path(__file__).parent.parent
+ENTRY_POINTS = sorted([*ROOT.glob("agents/agent_*.py"), *ROOT.glob("workflows/workflow_*.py")])
+RUNS = 3
+FETCH_SECONDS = 0.5
+ENVIRONMENT = {
+    "AZURE_AI_PROJECT_ENDPOINT": "https://example.services.ai.azure.com/api/projects/bench",
+    "AZURE_AI_MODEL_DEPLOYMENT_NAME": "bench",
+    "APP_INSIGHT_INSTRUMENTATION_KEY": "InstrumentationKey=00000000-0000-0000-0000-000000000000",
+}
+
+WORKER = """
+import asyncio, sys, time
+start = time.perf_counter()
+sys.path.insert(0, {agents!r})
+from azure.core.credentials import AccessToken
+import bootstrap, credential_cache
+
+class StubCliCredential:
+    async def get_token(self, *scopes, **kwargs):
+        await asyncio.sleep({fetch_seconds})
+        return AccessToken("token", int(time.time()) + 3600)
+
+    async def close(self):
+        pass
+
+credential_cache._shared = credential_cache.SharedTokenCredential(StubCliCredential, cache_path=None)
+
+async def main():
+    if {overlap}:
+        await bootstrap.warm_up()
+    else:
+        bootstrap.load_environment()
+        for module in bootstrap.SDK_MODULES:
+            __import__(module)
+        await credential_cache.shared_credential().get_token(bootstrap.TOKEN_SCOPE)
+    bootstrap.agent_client()
+
+asyncio.run(main())
+print(time.perf_counter() - start, file=sys.stderr)
+"""
+
+
+def run(code: str, importtime: bool = False) -> tuple[float, str]:
+    """Run code in a fresh interpreter. Returns the wall time and its stderr."""
+    command = [sys.executable, *(["-X", "importtime"] if importtime else []), "-c", code]
+    start = time.perf_counter()
+    result = subprocess.run(command, capture_output=True, text=True, cwd=ROOT, env={**os.environ, **ENVIRONMENT})
+    elapsed = time.perf_counter() - start
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr[-2000:])
+    return elapsed, result.stderr
+
+
+def top_level_imports(stderr: str) -> list[tuple[float, str]]:
+    """Parse -X importtime output into (cumulative seconds, module) of the top-level imports."""
+    imports = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line.split("|")
+        if not name.startswith("  "):
+            imports.append((int(cumulative) / 1e6, name.strip()))
+    return imports
+
+
+def main() -> None:
+    print(f"{'entry point':<60}{'wall ms':>9}{'import ms':>11}   slowest imports")
+    for path in ENTRY_POINTS:
+        code = f"import runpy, sys; sys.path.insert(0, 'agents'); runpy.run_path({str(path)!r}, run_name='startup')"
+        best = min((run(code, importtime=True) for _ in range(RUNS)), key=lambda result: result[0])
+        imports = top_level_imports(best[1])
+        slowest = ", ".join(f"{name} {seconds * 1000:.0f}" for seconds, name in sorted(imports, reverse=True)[:3])
+        relative = path.relative_to(ROOT).as_posix()
+        print(f"{relative:<60}{best[0] * 1000:>9.0f}{sum(s for s, _ in imports) * 1000:>11.0f}   {slowest}")
+
+    print(f"\nworker start to first token and client, token fetch {FETCH_SECONDS * 1000:.0f}ms")
+    for label, overlap in (("import, then fetch", False), ("warm_up (overlapped)", True)):
+        code = WORKER.format(agents=str(ROOT / "agents"), fetch_seconds=FETCH_SECONDS, overlap=overlap)
+        timings = [float(run(code)[1].strip().splitlines()[-1]) for _ in range(RUNS)]
+        print(f"{label:<60}{min(timings) * 1000:>9.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+import asyncio
+import json
+import statistics
+import sys
+import time
+from pathlib import Path
+
+import aiohttp
+from agent_framework import ChatAgent
+
+"""
+Benchmark: time to first token and time to last token, with and without streaming.
+
+A FakeChatClient answers after MODEL_LATENCY seconds and then produces one word token every
+TOKEN_DELAY seconds. Measures a blocking agent.run (the first token arrives with the last), a
+direct agent.run_stream, and streaming through agents/agent_server.py over a WebSocket and over
+HTTP with newline-delimited JSON.
+"""
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "agents"))
+sys.path.insert(0, str(Path(__file__).parent))
+from agent_server import AgentSessionHost, create_app  # noqa: E402
+from fake_chat_client import FakeChatClient  # noqa: E402
+
+MODEL_LATENCY = 0.3
+TOKEN_DELAY = 0.02
+TURNS = 20
+QUESTION = "What is the weather like in Seattle?"
+
+
+async def blocking_run(agent: ChatAgent, thread) -> tuple[float, float]:
+    start = time.perf_counter()
+    await agent.run(QUESTION, thread=thread)
+    elapsed = time.perf_counter() - start
+    return elapsed, elapsed
+
+
+async def direct_stream(agent: ChatAgent, thread) -> tuple[float, float]:
+    start = time.perf_counter()
+    first = None
+    async for update in agent.run_stream(QUESTION, thread=thread):
+        if first is None and update.text:
+            first = time.perf_counter() - start
+    return first, time.perf_counter() - start
+
+
+async def websocket_stream(ws: aiohttp.ClientWebSocketResponse) -> tuple[float, float]:
+    start = time.perf_counter()
+    first = None
+    await ws.send_str(QUESTION)
+    while not (frame := await ws.receive_json()).get("done"):
+        if first is None:
+            first = time.perf_counter() - start
+    return first, time.perf_counter() - start
+
+
+async def http_stream(client: aiohttp.ClientSession, url: str) -> tuple[float, float]:
+    start = time.perf_counter()
+    first = None
+    async with client.post(url, json={"text": QUESTION}) as response:
+        async for line in response.content:
+            if first is None and "delta" in json.loads(line):
+                first = time.perf_counter() - start
+    return first, time.perf_counter() - start
+
+
+def report(name: str, samples: list[tuple[float, float]]) -> None:
+    first = statistics.median(sample[0] for sample in samples) * 1000
+    last = statistics.median(sample[1] for sample in samples) * 1000
+    print(f"{name:<16} ttft={first:7.1f}ms  ttlt={last:7.1f}ms")
+
+
+async def main() -> None:
+    client = FakeChatClient(latency=MODEL_LATENCY, token_delay=TOKEN_DELAY)
+    agent = ChatAgent(chat_client=client, instructions="You are a helpful assistant.")
+    print(f"model latency {MODEL_LATENCY * 1000:.0f}ms, {len(client.tokens)} tokens every {TOKEN_DELAY * 1000:.0f}ms")
+
+    thread = agent.get_new_thread()
+    report("run", [await blocking_run(agent, thread) for _ in range(TURNS)])
+    thread = agent.get_new_thread()
+    report("run_stream", [await direct_stream(agent, thread) for _ in range(TURNS)])
+
+    runner = aiohttp.web.AppRunner(create_app(AgentSessionHost(agent)))
+    await runner.setup()
+    site = aiohttp.web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    base = f"http://127.0.0.1:{runner.addresses[0][1]}"
+    try:
+        async with aiohttp.ClientSession() as http:
+            async with http.ws_connect(f"{base}/sessions/bench_ws/ws?stream=1") as ws:
+                report("server ws", [await websocket_stream(ws) for _ in range(TURNS)])
+            url = f"{base}/sessions/bench_http/messages?stream=1"
+            report("server ndjson", [await http_stream(http, url) for _ in range(TURNS)])
+    finally:
+        await runner.cleanup()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,150 @@
+import asyncio
+import json
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from agent_framework import AgentThread, ChatMessage, ChatMessageStore, Role
+
+"""
+Benchmark: save and load time of a local thread history against its length.
+
+Compares the original persistence of agent_persist_thread_history.py, which rewrites the whole
+serialized thread on every save, with JournalChatMessageStore, which appends each turn's messages
+to a journal and compacts it into a snapshot now and then. Save is measured per turn (a user and an
+assistant message), including the compactions it triggers. Load is the time to rebuild the thread
+from disk.
+
+First checks the journal store: turns appended concurrently are persisted in call order, the event
+loop keeps running through appends and compactions, and state holding messages replaces the history
+instead of adding to it.
+"""
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "agents"))
+from thread_journal import JournalChatMessageStore  # noqa: E402
+
+HISTORY_LENGTHS = [100, 1_000, 10_000]
+TURNS = 20
+CONCURRENT_TURNS = 100
+# Enough turns for the journal to outgrow the snapshot of HISTORY_LENGTHS[-1] messages and compact
+COMPACTING_TURNS = HISTORY_LENGTHS[-1] // 2
+TICK = 0.001
+
+
+def make_turn(turn: int) -> list[ChatMessage]:
+    return [
+        ChatMessage(role=Role.USER, text=f"Turn {turn}: what is the weather looking like in Seattle?"),
+        ChatMessage(role=Role.ASSISTANT, text=f"Turn {turn}: cloudy with a high of 15C and light rain later."),
+    ]
+
+
+def make_history(length: int) -> list[ChatMessage]:
+    return [message for turn in range(length // 2) for message in make_turn(turn)]
+
+
+def check(label: str, ok: bool, detail: str) -> None:
+    print(f"{label:<52}{'ok' if ok else 'FAILED':>8}  {detail}")
+    if not ok:
+        raise SystemExit(1)
+
+
+async def check_journal(directory: Path) -> None:
+    path = directory / "agent_thread"
+    store = JournalChatMessageStore(path, compact_every=16)
+    history = make_history(HISTORY_LENGTHS[-1])
+    await store.update_from_state({"messages": [message.to_dict() for message in history]})
+
+    stall = 0.0
+    running = True
+
+    async def tick() -> None:
+        nonlocal stall
+        while running:
+            start = time.perf_counter()
+            await asyncio.sleep(TICK)
+            stall = max(stall, time.perf_counter() - start - TICK)
+
+    ticker = asyncio.create_task(tick())
+    await asyncio.sleep(TICK * 2)
+    turns = [make_turn(turn) for turn in range(COMPACTING_TURNS)]
+    for messages in turns:
+        await store.add_messages(messages)
+    running = False
+    await ticker
+    compactions = store._generation - 1
+    start = time.perf_counter()
+    await store.compact()
+    compaction = time.perf_counter() - start
+    check(
+        f"{COMPACTING_TURNS} turns and {compactions} compaction keep the loop running",
+        compactions == 1 and stall < compaction / 2,
+        f"longest event loop stall {stall * 1000:.1f} ms, a compaction takes {compaction * 1000:.0f} ms",
+    )
+
+    concurrent = [make_turn(turn) for turn in range(CONCURRENT_TURNS)]
+    await asyncio.gather(*(store.add_messages(messages) for messages in concurrent))
+    expected = [message.text for messages in [history, *turns, *concurrent] for message in messages]
+    loaded = [message.text for message in JournalChatMessageStore(path).messages]
+    check(f"{CONCURRENT_TURNS} concurrent turns persist in call order", loaded == expected, f"{len(loaded)} messages")
+
+    replacement = make_turn(0)
+    await store.update_from_state({"messages": [message.to_dict() for message in replacement]})
+    loaded = [message.text for message in JournalChatMessageStore(path).messages]
+    check(
+        "state with messages replaces the history",
+        [message.text for message in store.messages] == loaded == [message.text for message in replacement],
+        f"{len(store.messages)} in memory, {len(loaded)} on disk",
+    )
+
+
+async def measure_rewrite(directory: Path, history: list[ChatMessage]) -> tuple[float, float]:
+    path = directory / "agent_thread.json"
+    thread = AgentThread(message_store=ChatMessageStore(history))
+    samples = []
+    for turn in range(TURNS):
+        await thread.on_new_messages(make_turn(turn))
+        start = time.perf_counter()
+        path.write_text(json.dumps(await thread.serialize()))
+        samples.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await AgentThread.deserialize(json.loads(path.read_text()), message_store=ChatMessageStore())
+    return statistics.fmean(samples), time.perf_counter() - start
+
+
+async def measure_journal(directory: Path, history: list[ChatMessage]) -> tuple[float, float]:
+    path = directory / "agent_thread"
+    store = JournalChatMessageStore(path)
+    store.messages = list(history)
+    await store.compact()
+    samples = []
+    for turn in range(TURNS):
+        start = time.perf_counter()
+        await store.add_messages(make_turn(turn))
+        samples.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    JournalChatMessageStore(path)
+    return statistics.fmean(samples), time.perf_counter() - start
+
+
+async def main() -> None:
+    with tempfile.TemporaryDirectory() as directory:
+        await check_journal(Path(directory))
+    print()
+    print(f"{'history':>8} {'rewrite save':>13} {'journal save':>13} {'rewrite load':>13} {'journal load':>13}")
+    for length in HISTORY_LENGTHS:
+        history = make_history(length)
+        with tempfile.TemporaryDirectory() as rewrite_dir, tempfile.TemporaryDirectory() as journal_dir:
+            rewrite_save, rewrite_load = await measure_rewrite(Path(rewrite_dir), history)
+            journal_save, journal_load = await measure_journal(Path(journal_dir), history)
+        print(
+            f"{length:>8} {rewrite_save * 1000:>11.2f}ms {journal_save * 1000:>11.2f}ms "
+            f"{rewrite_load * 1000:>11.1f}ms {journal_load * 1000:>11.1f}ms"
+        )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
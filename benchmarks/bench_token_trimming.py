@@ -0,0 +1,115 @@
+import asyncio
+import statistics
+import sys
+import time
+from pathlib import Path
+
+from agent_framework import ChatMessage, FunctionCallContent, FunctionResultContent, Role
+
+"""
+Benchmark: cost of token budget trimming against history length.
+
+For every history length the store is filled up to a token budget that holds exactly that many
+messages, then the time of one more turn (append plus trim) is measured. Compares:
+- in-memory naive: re-estimates the whole history on every turn, as a count-free trim otherwise must
+- in-memory tracked: TokenBudgetChatMessageStore with per-message estimates and a running total
+- redis tracked: RedisChatMessageStore with max_tokens, against a local redis-server
+First checks that the tracked store, trimming turns with tool calls, never keeps a tool result without its
+call and keeps its running total equal to the estimates of the messages it holds.
+
+Pass a redis URL as the first command line argument to use another server than redis://localhost:6379.
+"""
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "agents"))
+from agent_store_history_third_party import RedisChatMessageStore  # noqa: E402
+from chat_history_budget import TokenBudgetChatMessageStore, estimate_tokens  # noqa: E402
+
+HISTORY_LENGTHS = [100, 1_000, 10_000, 50_000]
+TURNS = 200
+
+
+def make_message(turn: int) -> ChatMessage:
+    return ChatMessage(role=Role.USER, text=f"Turn {turn:06d}: how is the weather looking in Seattle today?")
+
+
+class NaiveTokenBudgetStore:
+    """Trims to the budget by re-estimating every stored message on each turn."""
+
+    def __init__(self, max_tokens: int) -> None:
+        self.max_tokens = max_tokens
+        self.messages: list[ChatMessage] = []
+
+    async def add_messages(self, messages: list[ChatMessage]) -> None:
+        self.messages.extend(messages)
+        while len(self.messages) > 1 and sum(estimate_tokens(message) for message in self.messages) > self.max_tokens:
+            del self.messages[0]
+
+
+def tool_turn(turn: int) -> list[ChatMessage]:
+    call = FunctionCallContent(call_id=f"call_{turn}", name="get_weather", arguments={"location": "Seattle, WA"})
+    return [
+        make_message(turn),
+        ChatMessage(role=Role.ASSISTANT, contents=[call]),
+        ChatMessage(role=Role.TOOL, contents=[FunctionResultContent(call_id=call.call_id, result="Cloudy, 15C")]),
+        ChatMessage(role=Role.ASSISTANT, text="It is cloudy in Seattle with a high of 15C."),
+    ]
+
+
+async def check_tool_turns() -> None:
+    appends, orphans, drift = 0, 0, 0
+    for budget in range(5, 200, 3):
+        store = TokenBudgetChatMessageStore(max_tokens=budget)
+        for turn in range(20):
+            for message in tool_turn(turn):
+                await store.add_messages([message])
+                messages = store.messages
+                appends += 1
+                orphans += bool(messages) and isinstance(messages[0].contents[0], FunctionResultContent)
+                drift += store.total_tokens != sum(estimate_tokens(message) for message in messages)
+    ok = not orphans and not drift
+    print(f"tool turns, {appends} appends: {orphans} start with a result, {drift} totals off", end="  ")
+    print("ok\n" if ok else "FAILED")
+    if not ok:
+        raise SystemExit(1)
+
+
+async def measure(store, history_length: int, fill) -> float:
+    await fill(store, [make_message(turn) for turn in range(history_length)])
+    samples = []
+    for turn in range(history_length, history_length + TURNS):
+        message = make_message(turn)
+        start = time.perf_counter()
+        await store.add_messages([message])
+        samples.append((time.perf_counter() - start) * 1_000_000)
+    return statistics.median(samples)
+
+
+async def fill_memory(store, messages: list[ChatMessage]) -> None:
+    await store.add_messages(messages)
+
+
+async def fill_redis(store: RedisChatMessageStore, messages: list[ChatMessage]) -> None:
+    await store.clear()
+    for start in range(0, len(messages), 1000):
+        await store.add_messages(messages[start : start + 1000])
+
+
+async def main() -> None:
+    url = sys.argv[1] if len(sys.argv) > 1 else "redis://localhost:6379"
+    await check_tool_turns()
+    message_tokens = estimate_tokens(make_message(0))
+    print(f"{'history':>8} {'naive':>12} {'tracked':>12} {'redis':>12}   (median us per turn)")
+    for history_length in HISTORY_LENGTHS:
+        budget = history_length * message_tokens
+        naive = await measure(NaiveTokenBudgetStore(budget), history_length, fill_memory)
+        tracked = await measure(TokenBudgetChatMessageStore(max_tokens=budget), history_length, fill_memory)
+        redis_store = RedisChatMessageStore(redis_url=url, thread_id="bench_tokens", max_tokens=budget)
+        try:
+            scripted = await measure(redis_store, history_length, fill_redis)
+        finally:
+            await redis_store.clear()
+        print(f"{history_length:>8} {naive:>12.1f} {tracked:>12.1f} {scripted:>12.1f}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
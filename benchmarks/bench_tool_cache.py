@@ -0,0 +1,132 @@
+import asyncio
+import sys
+import time
+from pathlib import Path
+from typing import Annotated
+
+from agent_framework import FunctionInvocationContext, ai_function
+from pydantic import BaseModel
+
+"""
+Benchmark: ToolResultCache key canonicalization, TTL expiry, single flight and the cost of a hit.
+
+Calls go straight through the middleware, the way the function invoking chat client calls it, to a tool
+taking TOOL_SECONDS that counts its executions. Checks, each failing the run if it does not hold:
+- tools not listed in ttls are not cached by default
+- arguments in another key order, nested or as a model give the same key, other values do not
+- a result is served until its TTL runs out, then the tool runs again
+- CONCURRENT identical calls in flight at once run the tool once, different ones each run it
+Then reports the time of a cache hit against a call that runs the tool.
+"""
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "agents"))
+from tool_cache import ToolResultCache  # noqa: E402
+
+TOOL_SECONDS = 0.05
+TTL = 0.2
+CONCURRENT = 32
+HIT_ROUNDS = 20_000
+
+executions = 0
+
+
+@ai_function
+async def get_forecast(
+    location: Annotated[str, "The city and state, e.g. San Francisco, CA"],
+    days: Annotated[int, "Days ahead"] = 1,
+) -> str:
+    """Get the weather forecast for a location."""
+    global executions
+    executions += 1
+    await asyncio.sleep(TOOL_SECONDS)
+    return f"The weather in {location} in {days} days is cloudy with a high of 15C."
+
+
+class Query(BaseModel):
+    location: str
+    days: int
+
+
+async def call(cache: ToolResultCache, **arguments) -> str:
+    context = FunctionInvocationContext(function=get_forecast, arguments=get_forecast.input_model(**arguments))
+
+    async def next(context: FunctionInvocationContext) -> None:
+        context.result = await context.function.invoke(arguments=context.arguments)
+
+    await cache.process(context, next)
+    return context.result
+
+
+def check(label: str, ok: bool, detail: str) -> None:
+    print(f"{label:<52}{'ok' if ok else 'FAILED':>8}  {detail}")
+    if not ok:
+        raise SystemExit(1)
+
+
+async def main() -> None:
+    global executions
+
+    print(f"tool takes {TOOL_SECONDS * 1000:.0f} ms, TTL {TTL * 1000:.0f} ms")
+    cache = ToolResultCache()
+    for _ in range(3):
+        await call(cache, location="Seattle, WA")
+    check("not listed in ttls: every call runs", executions == 3, f"{executions} executions of 3 calls")
+
+    key = ToolResultCache.cache_key
+    same = {
+        key("get_forecast", {"location": "Seattle, WA", "days": 2}),
+        key("get_forecast", {"days": 2, "location": "Seattle, WA"}),
+        key("get_forecast", Query(location="Seattle, WA", days=2)),
+    }
+    check("key order and models give one key", len(same) == 1, f"{len(same)} distinct keys")
+    nested = {
+        key("search", {"filter": {"city": "Seattle", "units": "C"}, "limit": 5}),
+        key("search", {"limit": 5, "filter": {"units": "C", "city": "Seattle"}}),
+    }
+    check("nested key order gives one key", len(nested) == 1, f"{len(nested)} distinct keys")
+    different = {
+        key("get_forecast", {"location": "Seattle, WA", "days": 2}),
+        key("get_forecast", {"location": "Seattle, WA", "days": 3}),
+        key("get_forecast", {"location": "Seattle, WA", "days": "2"}),
+        key("get_weather", {"location": "Seattle, WA", "days": 2}),
+    }
+    check("other values, types or tools give other keys", len(different) == 4, f"{len(different)} distinct keys")
+
+    executions = 0
+    cache = ToolResultCache(ttls={"get_forecast": TTL})
+    await call(cache, location="Seattle, WA")
+    await call(cache, location="Seattle, WA")
+    within = executions
+    await asyncio.sleep(TTL * 1.5)
+    await call(cache, location="Seattle, WA")
+    check(
+        "served within the TTL, runs again after it",
+        within == 1 and executions == 2,
+        f"{within} execution within, {executions} after, {cache.stats()}",
+    )
+
+    executions = 0
+    cache = ToolResultCache(ttls={"get_forecast": TTL})
+    start = time.perf_counter()
+    results = await asyncio.gather(*(call(cache, location="Boston, MA") for _ in range(CONCURRENT)))
+    elapsed = time.perf_counter() - start
+    check(
+        f"{CONCURRENT} identical calls at once run once",
+        executions == 1 and len(set(results)) == 1 and cache.stats().coalesced == CONCURRENT - 1,
+        f"{executions} execution in {elapsed * 1000:.0f} ms, {cache.stats().coalesced} coalesced",
+    )
+    executions = 0
+    await asyncio.gather(*(call(cache, location="Boston, MA", days=days) for days in range(2, CONCURRENT + 2)))
+    check(f"{CONCURRENT} different calls at once each run", executions == CONCURRENT, f"{executions} executions")
+
+    cache = ToolResultCache(ttls={"get_forecast": None})
+    await call(cache, location="Chicago, IL")
+    start = time.perf_counter()
+    for _ in range(HIT_ROUNDS):
+        await call(cache, location="Chicago, IL")
+    hit = (time.perf_counter() - start) / HIT_ROUNDS
+    print(f"\ncache hit {hit * 1e6:.1f} us, against {TOOL_SECONDS * 1000:.0f} ms for running the tool")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
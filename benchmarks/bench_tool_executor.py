@@ -0,0 +1,95 @@
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+from agent_framework import ChatAgent, FunctionInvocationContext, FunctionMiddleware
+
+"""
+Benchmark: one model turn that calls N slow tools, with and without ToolExecutor.
+
+The fake model asks for N calls of the same tool in one response. Tools:
+- slow_io_tool blocks for TOOL_SECONDS like a sync HTTP client would
+- cpu_tool burns about TOOL_SECONDS of CPU in pure Python
+Without ToolExecutor sync tools run on the event loop one after another. With it, I/O-bound tools run
+on threads and cpu_tool on a process pool. One more row caps slow_io_tool at 4 concurrent calls.
+Every turn with ToolExecutor also has a middleware after it, which must see every offloaded call.
+"""
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "agents"))
+sys.path.insert(0, str(Path(__file__).parent))
+from fake_chat_client import FakeChatClient  # noqa: E402
+from tool_executor import ToolExecutor  # noqa: E402
+
+CALL_COUNTS = [1, 4, 8, 16]
+TOOL_SECONDS = 0.1
+CPU_LOOPS = 1_500_000
+
+
+class CallCounter(FunctionMiddleware):
+    """Counts the calls reaching it, to check that middleware after ToolExecutor still runs."""
+
+    def __init__(self) -> None:
+        self.calls = 0
+
+    async def process(self, context: FunctionInvocationContext, next) -> None:
+        self.calls += 1
+        await next(context)
+
+
+def slow_io_tool(city: str) -> str:
+    """Look up something slow about a city."""
+    time.sleep(TOOL_SECONDS)
+    return f"Done for {city}"
+
+
+def cpu_tool(city: str) -> str:
+    """Crunch numbers about a city."""
+    total = 0
+    for i in range(CPU_LOOPS):
+        total += i * i
+    return f"Done for {city}: {total % 97}"
+
+
+async def run_turn(tool, calls: int, middleware: list) -> float:
+    client = FakeChatClient(function_calls=[(tool.__name__, {"city": f"City {i}"}) for i in range(calls)])
+    agent = ChatAgent(chat_client=client, tools=[tool], middleware=middleware)
+    start = time.perf_counter()
+    await agent.run("Go")
+    return time.perf_counter() - start
+
+
+async def main() -> None:
+    start = time.perf_counter()
+    cpu_tool("calibration")
+    print(f"tool time: io={TOOL_SECONDS * 1000:.0f}ms cpu={(time.perf_counter() - start) * 1000:.0f}ms per call")
+
+    threads = ToolExecutor(max_workers=32)
+    limited = ToolExecutor(max_workers=32, limits={"slow_io_tool": 4})
+    processes = ToolExecutor(process_tools={"cpu_tool"})
+    counter = CallCounter()
+    rows = [
+        ("io inline", slow_io_tool, []),
+        ("io threads", slow_io_tool, [threads, counter]),
+        ("io threads limit=4", slow_io_tool, [limited, counter]),
+        ("cpu inline", cpu_tool, []),
+        ("cpu threads", cpu_tool, [threads, counter]),
+        ("cpu processes", cpu_tool, [processes, counter]),
+    ]
+    # Start the worker processes before timing
+    await run_turn(cpu_tool, 1, [processes])
+
+    print(f"{'mode':<20}" + "".join(f"{f'N={calls}':>10}" for calls in CALL_COUNTS) + "   (ms per turn)")
+    try:
+        for name, tool, middleware in rows:
+            timings = [await run_turn(tool, calls, middleware) for calls in CALL_COUNTS]
+            print(f"{name:<20}" + "".join(f"{timing * 1000:>10.0f}" for timing in timings))
+        offloaded = 4 * sum(CALL_COUNTS)
+        print(f"middleware after ToolExecutor saw {counter.calls} of {offloaded} offloaded calls")
+    finally:
+        for executor in (threads, limited, processes):
+            executor.shutdown()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,75 @@
+import asyncio
+import contextlib
+import io
+import sys
+import time
+from pathlib import Path
+
+from agent_framework import AIFunction, FunctionInvocationContext
+
+"""
+Microbenchmark: per-call overhead of the ToolMetrics function middleware.
+
+Invokes a middleware CALLS times around a no-op next() and subtracts the cost of calling next()
+directly, leaving the time the middleware itself adds to every tool call. Compares ToolMetrics with
+the print-based logging middleware it replaces (printing into a buffer, so no terminal is involved),
+and checks the histogram quantiles against exact ones.
+"""
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "agents"))
+from tool_metrics import ToolMetrics  # noqa: E402
+
+CALLS = 200_000
+
+
+def get_weather(location: str) -> str:
+    """Get the weather for a given location."""
+    return f"The weather in {location} is cloudy."
+
+
+async def logging_agent_middleware(context, next) -> None:
+    print(f"Calling function: {context.function.name}")
+    await next(context)
+    print(f"Function result: {context.result}")
+
+
+async def call_next(context: FunctionInvocationContext) -> None:
+    context.result = "cloudy"
+
+
+async def time_calls(invoke, context: FunctionInvocationContext) -> float:
+    start = time.perf_counter()
+    for _ in range(CALLS):
+        await invoke(context, call_next)
+    return (time.perf_counter() - start) / CALLS
+
+
+async def main() -> None:
+    function = AIFunction(func=get_weather, name="get_weather")
+    context = FunctionInvocationContext(function=function, arguments=None)
+    baseline = await time_calls(lambda context, next: next(context), context)
+
+    metrics = ToolMetrics()
+    instrumented = await time_calls(metrics.process, context) - baseline
+    with contextlib.redirect_stdout(io.StringIO()):
+        printed = await time_calls(logging_agent_middleware, context) - baseline
+    print(f"ToolMetrics overhead:      {instrumented * 1e6:6.2f}us per call")
+    print(f"print middleware overhead: {printed * 1e6:6.2f}us per call")
+
+    start = time.perf_counter()
+    metrics.prometheus_text()
+    print(f"prometheus export:         {(time.perf_counter() - start) * 1e3:6.2f}ms")
+
+    # Histogram accuracy against exact quantiles of known durations
+    check = ToolMetrics()
+    samples = sorted(int(1_000 * 1.001**i) for i in range(10_000))
+    for sample in samples:
+        check.record("check", sample)
+    stats = check.snapshot()["check"]
+    for name, q in (("p50", 0.5), ("p90", 0.9), ("p99", 0.99)):
+        exact = samples[int(q * len(samples)) - 1] / 1e9
+        print(f"{name}: histogram={getattr(stats, name) * 1e3:8.3f}ms exact={exact * 1e3:8.3f}ms")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,169 @@
+import asyncio
+import json
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from agent_framework import ChatAgent
+from agent_framework.exceptions import ServiceResponseException
+from opentelemetry import trace
+
+from fake_chat_client import FakeChatClient
+
+"""
+Benchmark: per-turn cost and exported volume of agent tracing, with sampling and truncation.
+
+Every configuration runs TURNS agent turns in a process of its own, as the tracer provider can only be set
+once per process. A turn sends a long prompt, calls one tool and gets a long reply from FakeChatClient,
+which fails ERROR_RATE of its requests and adds up to JITTER seconds to each. SLOW_RATE of the turns
+are slow. Spans go to an OtlpJsonFileSpanExporter. Reports the CPU time per turn of the whole process,
+the batch export thread included, the overhead over a run without tracing, the traces, spans and bytes
+exported, and how many of the failed and slow turns made it into the export. Besides the turns made slow,
+the first turn and turns stalled by a large export can take more than SLOW_TURN_SECONDS too.
+"""
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "agents"))
+from trace_sampling import OtlpJsonFileSpanExporter, setup_sampled_observability  # noqa: E402
+
+TURNS = 500
+JITTER = 0.005
+ERROR_RATE = 0.02
+# Share of turns whose two model requests take SLOW_LATENCY each, well above SLOW_TURN_SECONDS
+SLOW_RATE = 0.03
+SLOW_LATENCY = 0.05
+SLOW_TURN_SECONDS = 0.05
+INSTRUCTIONS = "You are a helpful assistant that answers questions about the weather. " * 10
+PROMPT = "Summarize the forecast below for a commuter in two sentences.\n" + "Light rain and 15C in Seattle. " * 500
+REPLY = "It is cloudy in Seattle with a high of 15C and light rain expected later today. " * 20
+
+# name -> setup_sampled_observability arguments, None for no tracing
+CONFIGS: dict[str, dict | None] = {
+    "no tracing": None,
+    "spans, no sensitive data": {"enable_sensitive_data": False},
+    "sensitive, all": {"enable_sensitive_data": True, "attribute_limits": None},
+    "sensitive, truncated": {"enable_sensitive_data": True},
+    "sensitive, head 10%": {"enable_sensitive_data": True, "attribute_limits": None, "head_ratio": 0.1},
+    "sensitive, tail 10% + slow + errors": {
+        "enable_sensitive_data": True,
+        "attribute_limits": None,
+        "keep_ratio": 0.1,
+        "slow_turn_seconds": SLOW_TURN_SECONDS,
+    },
+    "tail 10% + slow + errors, truncated": {
+        "enable_sensitive_data": True,
+        "keep_ratio": 0.1,
+        "slow_turn_seconds": SLOW_TURN_SECONDS,
+    },
+}
+
+
+def get_weather(location: str) -> str:
+    """Get the weather for a location."""
+    return f"The weather in {location} is cloudy with a high of 15C."
+
+
+def exported(path: Path) -> dict:
+    """Count the traces in an OTLP JSON lines file, and the failed and slow ones among them."""
+    counts = {"traces": 0, "error_traces": 0, "slow_traces": 0}
+    if not path.exists():
+        return counts
+    for line in path.read_text(encoding="utf-8").splitlines():
+        for resource_spans in json.loads(line)["resourceSpans"]:
+            for scope_spans in resource_spans["scopeSpans"]:
+                for span in scope_spans["spans"]:
+                    if span.get("parentSpanId"):
+                        continue
+                    counts["traces"] += 1
+                    if span.get("status", {}).get("code") == "STATUS_CODE_ERROR":
+                        counts["error_traces"] += 1
+                    elif int(span["endTimeUnixNano"]) - int(span["startTimeUnixNano"]) >= SLOW_TURN_SECONDS * 1e9:
+                        counts["slow_traces"] += 1
+    return counts
+
+
+async def child(name: str, directory: str) -> None:
+    config = CONFIGS[name]
+    path = Path(directory) / f"{list(CONFIGS).index(name)}.jsonl"
+    file_exporter = None
+    if config is not None:
+        file_exporter = OtlpJsonFileSpanExporter(path)
+        setup_sampled_observability(exporters=[file_exporter], **config)
+
+    client = FakeChatClient(
+        reply=REPLY,
+        function_calls=[("get_weather", {"location": "Seattle"})],
+        jitter=JITTER,
+        error_rate=ERROR_RATE,
+        seed=1,
+    )
+    agent = ChatAgent(chat_client=client, instructions=INSTRUCTIONS, tools=[get_weather])
+    await agent.run(PROMPT)
+
+    errors = slow = 0
+    slow_turns = random.Random(2)
+    cpu_start = time.process_time()
+    for _ in range(TURNS):
+        client.latency = SLOW_LATENCY if slow_turns.random() < SLOW_RATE else 0.0
+        try:
+            await agent.run(PROMPT)
+        except ServiceResponseException:
+            errors += 1
+            continue
+        slow += client.latency > 0
+    # Exports what the batch processor still holds, so its cost is counted too
+    provider = trace.get_tracer_provider()
+    if hasattr(provider, "shutdown"):
+        provider.shutdown()
+    cpu = time.process_time() - cpu_start
+
+    result = {
+        "cpu_per_turn": cpu / TURNS,
+        "errors": errors,
+        "slow": slow,
+        "spans": file_exporter.spans if file_exporter else 0,
+        "bytes": file_exporter.bytes if file_exporter else 0,
+        **exported(path),
+    }
+    (Path(directory) / "result.json").write_text(json.dumps(result), encoding="utf-8")
+
+
+async def run_config(name: str, directory: str) -> dict:
+    # Console log and metric exporters are added when none is given, and would print here
+    process = await asyncio.create_subprocess_exec(
+        sys.executable, __file__, "--child", name, directory, stdout=asyncio.subprocess.DEVNULL
+    )
+    await process.wait()
+    return json.loads((Path(directory) / "result.json").read_text(encoding="utf-8"))
+
+
+async def main() -> None:
+    if len(sys.argv) == 4 and sys.argv[1] == "--child":
+        await child(sys.argv[2], sys.argv[3])
+        return
+
+    print(
+        f"{TURNS} turns, prompt {len(PROMPT)} chars, reply {len(REPLY)} chars, one tool call, "
+        f"{ERROR_RATE:.0%} errors per request, slow from {SLOW_TURN_SECONDS * 1000:.0f} ms"
+    )
+    print(
+        f"{'configuration':<38}{'us/turn':>9}{'overhead':>10}{'traces':>8}{'spans':>7}{'KB':>8}"
+        f"{'errors kept':>13}{'slow kept':>11}"
+    )
+    baseline = None
+    with tempfile.TemporaryDirectory() as temp_dir:
+        for name in CONFIGS:
+            result = await run_config(name, temp_dir)
+            cpu = result["cpu_per_turn"] * 1e6
+            baseline = cpu if baseline is None else baseline
+            errors_kept = f"{result['error_traces']}/{result['errors']}"
+            slow_kept = f"{result['slow_traces']}/{result['slow']}"
+            print(
+                f"{name:<38}{cpu:>9.0f}{cpu - baseline:>10.0f}{result['traces']:>8}{result['spans']:>7}"
+                f"{result['bytes'] / 1024:>8.0f}{errors_kept:>13}{slow_kept:>11}"
+            )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
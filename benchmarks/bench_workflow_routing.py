@@ -0,0 +1,141 @@
+import asyncio
+import sys
+import time
+from pathlib import Path
+from typing import Any
+
+from agent_framework import (
+    AgentExecutorResponse,
+    AgentRunResponse,
+    ChatMessage,
+    Role,
+    WorkflowBuilder,
+    WorkflowContext,
+    executor,
+)
+from pydantic import BaseModel
+from typing_extensions import Never
+
+"""
+Benchmark: routing cost of a structured agent response over conditional edges, parsing per use and once.
+
+An agent executor stand-in sends an AgentExecutorResponse whose text is a DetectionResult like the one of
+the conditional edge workflow, email included. It fans out over N conditional edges, one per route, and
+exactly one fires. Every condition and the executor it leads to read the DetectionResult, either with
+model_validate_json each, as the workflows did, or with typed_value. Reports, for N from 1 to 32, the time
+of the conditions and the executor alone, and of a whole workflow run.
+"""
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "agents"))
+from typed_response import typed_value  # noqa: E402
+
+FAN_OUT = [1, 2, 4, 8, 16, 32]
+# Timings are the best of BATCHES batches, as a workflow run is noisy next to a parse
+BATCHES = 5
+ROUTING_ROUNDS = 500
+WORKFLOW_RUNS = 200
+EMAIL = "Hey there, I noticed you might be interested in our latest offer, no pressure, but it expires soon. " * 20
+
+
+class DetectionResult(BaseModel):
+    route: int
+    is_spam: bool
+    reason: str
+    email_content: str
+
+
+def response_text(route: int) -> str:
+    detection = DetectionResult(route=route, is_spam=False, reason="A known sender.", email_content=EMAIL)
+    return detection.model_dump_json()
+
+
+def new_response(text: str) -> AgentExecutorResponse:
+    """A response as an AgentExecutor sends it, new for every message like in a workflow."""
+    run_response = AgentRunResponse(messages=[ChatMessage(role=Role.ASSISTANT, text=text)])
+    return AgentExecutorResponse("detector", run_response)
+
+
+def parse_each(response: AgentExecutorResponse) -> DetectionResult:
+    return DetectionResult.model_validate_json(response.agent_run_response.text)
+
+
+def parse_once(response: AgentExecutorResponse) -> DetectionResult:
+    return typed_value(response, DetectionResult)
+
+
+def condition(route: int, parse):
+    def matches(message: Any) -> bool:
+        if not isinstance(message, AgentExecutorResponse):
+            return True
+        try:
+            return parse(message).route == route
+        except Exception:
+            return False
+
+    return matches
+
+
+def routing_seconds(fan_out: int, parse) -> float:
+    """Seconds per message to evaluate fan_out conditions and run the parse of the executor reached."""
+    conditions = [condition(route, parse) for route in range(fan_out)]
+    texts = [response_text(route) for route in range(fan_out)]
+    best = float("inf")
+    for _ in range(BATCHES):
+        start = time.perf_counter()
+        for index in range(ROUTING_ROUNDS):
+            response = new_response(texts[index % fan_out])
+            fired = [matches(response) for matches in conditions]
+            assert fired.count(True) == 1
+            parse(response)
+        best = min(best, (time.perf_counter() - start) / ROUTING_ROUNDS)
+    return best
+
+
+def build_workflow(fan_out: int, parse):
+    @executor(id="detector")
+    async def detector(route: int, ctx: WorkflowContext[AgentExecutorResponse]) -> None:
+        await ctx.send_message(new_response(response_text(route)))
+
+    builder = WorkflowBuilder().set_start_executor(detector)
+    for route in range(fan_out):
+
+        async def handle(response: AgentExecutorResponse, ctx: WorkflowContext[Never, str]) -> None:
+            await ctx.yield_output(parse(response).reason)
+
+        builder.add_edge(detector, executor(id=f"route_{route}")(handle), condition=condition(route, parse))
+    return builder.build()
+
+
+async def workflow_seconds(fan_out: int, parse) -> float:
+    workflow = build_workflow(fan_out, parse)
+    for route in range(fan_out):
+        await workflow.run(route)
+    best = float("inf")
+    for _ in range(BATCHES):
+        start = time.perf_counter()
+        for index in range(WORKFLOW_RUNS):
+            outputs = (await workflow.run(index % fan_out)).get_outputs()
+            assert len(outputs) == 1
+        best = min(best, (time.perf_counter() - start) / WORKFLOW_RUNS)
+    return best
+
+
+async def main() -> None:
+    print(f"response text {len(response_text(0))} chars, one edge per route, one fires")
+    print(
+        f"{'fan-out':<9}{'parses':>8}{'routing us':>12}{'once us':>9}{'saved':>7}"
+        f"{'run us':>9}{'once us':>9}{'saved':>7}"
+    )
+    for fan_out in FAN_OUT:
+        each = routing_seconds(fan_out, parse_each)
+        once = routing_seconds(fan_out, parse_once)
+        run_each = await workflow_seconds(fan_out, parse_each)
+        run_once = await workflow_seconds(fan_out, parse_once)
+        print(
+            f"{fan_out:<9}{fan_out + 1:>8}{each * 1e6:>12.1f}{once * 1e6:>9.1f}{1 - once / each:>7.0%}"
+            f"{run_each * 1e6:>9.0f}{run_once * 1e6:>9.0f}{1 - run_once / run_each:>7.0%}"
+        )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,133 @@
+import asyncio
+import random
+from collections.abc import AsyncIterable, MutableSequence, Sequence
+from typing import Any
+
+from agent_framework import (
+    BaseChatClient,
+    ChatMessage,
+    ChatOptions,
+    ChatResponse,
+    ChatResponseUpdate,
+    FunctionCallContent,
+    Role,
+    use_chat_middleware,
+    use_function_invocation,
+)
+from agent_framework.exceptions import ServiceResponseException
+from agent_framework.observability import use_observability
+
+"""
+Chat client stand-in for load tests and benchmarks that must not call a model.
+
+Answers every request with a canned reply after a fixed delay, so measurements show the cost of
+the code around the model call. Streaming splits the reply into word tokens with a delay per token.
+Optionally the first response of every turn asks for a fixed set of function calls instead, latency
+varies at random, and a share of requests fails like an overloaded service. With service_threads,
+responses carry a conversation id like those of the agent service, so agents keep threads by id and
+not in a message store.
+"""
+
+
+@use_function_invocation
+@use_observability
+@use_chat_middleware
+class FakeChatClient(BaseChatClient):
+    """Chat client that replies with fixed text after simulated model latency."""
+
+    OTEL_PROVIDER_NAME = "fake"
+
+    def __init__(
+        self,
+        reply: str = "It is cloudy in Seattle with a high of 15C and light rain expected later today.",
+        latency: float = 0.0,
+        token_delay: float = 0.0,
+        function_calls: Sequence[tuple[str, dict[str, Any]]] = (),
+        jitter: float = 0.0,
+        error_rate: float = 0.0,
+        seed: int | None = None,
+        service_threads: bool = False,
+        **kwargs: Any,
+    ) -> None:
+        """Create the client.
+
+        Args:
+            reply: Text of every response.
+            latency: Seconds before a response, or before the first token when streaming.
+            token_delay: Seconds between streamed tokens. Non-streaming responses wait for all of them too.
+            function_calls: (name, arguments) of function calls to request, all in one response, when the
+                           last message is not a tool result. The reply follows once the results are in.
+            jitter: Up to this many seconds, drawn uniformly, are added to the latency of every request.
+            error_rate: Share of requests that raise ServiceResponseException after their latency.
+            seed: Seed of the random jitter and errors, for repeatable runs.
+            service_threads: Return a conversation id with every response, the one of the request or a new one,
+                            as AzureAIAgentClient does.
+        """
+        super().__init__(**kwargs)
+        self.reply = reply
+        self.latency = latency
+        self.token_delay = token_delay
+        self.function_calls = list(function_calls)
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.service_threads = service_threads
+        self.requests = 0
+        self.errors = 0
+        self.threads_created = 0
+        self._random = random.Random(seed)
+
+    @property
+    def tokens(self) -> list[str]:
+        words = self.reply.split(" ")
+        return [word if index == 0 else f" {word}" for index, word in enumerate(words)]
+
+    async def _wait(self, delay: float) -> None:
+        """Sleep for delay plus jitter, then fail if this request drew an error."""
+        delay += self._random.uniform(0, self.jitter) if self.jitter else 0.0
+        if delay:
+            await asyncio.sleep(delay)
+        if self.error_rate and self._random.random() < self.error_rate:
+            self.errors += 1
+            raise ServiceResponseException("Simulated service error")
+
+    def _conversation_id(self, chat_options: ChatOptions) -> str | None:
+        if not self.service_threads:
+            return None
+        if chat_options.conversation_id:
+            return chat_options.conversation_id
+        self.threads_created += 1
+        return f"thread_{self.threads_created}"
+
+    async def _inner_get_response(
+        self, *, messages: MutableSequence[ChatMessage], chat_options: ChatOptions, **kwargs: Any
+    ) -> ChatResponse:
+        self.requests += 1
+        conversation_id = self._conversation_id(chat_options)
+        if self.function_calls and messages[-1].role != Role.TOOL:
+            await self._wait(self.latency)
+            calls = [
+                FunctionCallContent(call_id=f"call_{self.requests}_{index}", name=name, arguments=arguments)
+                for index, (name, arguments) in enumerate(self.function_calls)
+            ]
+            return ChatResponse(
+                messages=[ChatMessage(role=Role.ASSISTANT, contents=calls)], conversation_id=conversation_id
+            )
+        await self._wait(self.latency + self.token_delay * (len(self.tokens) - 1))
+        response = ChatResponse(
+            messages=[ChatMessage(role=Role.ASSISTANT, text=self.reply)], conversation_id=conversation_id
+        )
+        if chat_options.response_format:
+            # Like the service clients, which parse structured output into the value
+            response.try_parse_value(chat_options.response_format)
+        return response
+
+    async def _inner_get_streaming_response(
+        self, *, messages: MutableSequence[ChatMessage], chat_options: ChatOptions, **kwargs: Any
+    ) -> AsyncIterable[ChatResponseUpdate]:
+        self.requests += 1
+        conversation_id = self._conversation_id(chat_options)
+        await self._wait(self.latency)
+        for index, token in enumerate(self.tokens):
+            if index and self.token_delay:
+                await asyncio.sleep(self.token_delay)
+            yield ChatResponseUpdate(role=Role.ASSISTANT, text=token, conversation_id=conversation_id)
@@ -1,5 +1,6 @@
 import asyncio
 import os
+import sys
 from dataclasses import dataclass
 from typing import Any, Literal
 from uuid import uuid4
@@ -18,18 +19,14 @@ from agent_framework import (
     Case,
     Default,
 )
-from agent_framework.azure import AzureOpenAIChatClient
-from azure.ai.projects.aio import AIProjectClient
-from agent_framework.azure import AzureAIAgentClient
-from azure.identity import AzureCliCredential
 from pydantic import BaseModel
 from pathlib import Path
-from dotenv import load_dotenv
 
-# Load .env file from the parent directory
-script_dir = Path(__file__).parent
-load_dotenv(script_dir.parent / "maf.env")
-print(f"Using endpoint: {os.environ['AZURE_AI_PROJECT_ENDPOINT']}")
+sys.path.insert(0, str(Path(__file__).parent.parent / "agents"))
+from bootstrap import agent_client, load_environment  # noqa: E402
+from typed_response import typed_value  # noqa: E402
+
+load_environment()
 
 # Creating base classes for inputs and outputs
 class DetectionResult(BaseModel):
@@ -59,9 +56,9 @@ def get_condition(expected_result: bool):
             return True
 
         try:
-            # Prefer parsing a structured DetectionResult from the agent JSON text.
-            # Using model_validate_json ensures type safety and raises if the shape is wrong.
-            detection = DetectionResult.model_validate_json(message.agent_run_response.text)
+            # The structured DetectionResult of the agent JSON text, validated and raising if the shape is wrong.
+            # Parsed by the first condition and shared with the other condition and the executors downstream.
+            detection = typed_value(message, DetectionResult)
             # Route only when the spam flag matches the expected path.
             return detection.is_spam == expected_result
         except Exception:
@@ -76,7 +73,7 @@ def get_condition(expected_result: bool):
 async def handle_email_response(response: AgentExecutorResponse, ctx: WorkflowContext[Never, str]) -> None:
     """Handle legitimate emails by drafting a professional response."""
     # Downstream of the email assistant. Parse a validated EmailResponse and yield the workflow output.
-    email_response = EmailResponse.model_validate_json(response.agent_run_response.text)
+    email_response = typed_value(response, EmailResponse)
     await ctx.yield_output(f"Email sent:\n{email_response.response}")
 
 
@@ -84,7 +81,7 @@ async def handle_email_response(response: AgentExecutorResponse, ctx: WorkflowCo
 async def handle_spam_classifier_response(response: AgentExecutorResponse, ctx: WorkflowContext[Never, str]) -> None:
     """Handle spam emails by marking them appropriately."""
     # Spam path. Confirm the DetectionResult and yield the workflow output. Guard against accidental non spam input.
-    detection = DetectionResult.model_validate_json(response.agent_run_response.text)
+    detection = typed_value(response, DetectionResult)
     if detection.is_spam:
         await ctx.yield_output(f"Email marked as spam: {detection.reason}")
     else:
@@ -97,8 +94,8 @@ async def to_email_assistant_request(
     response: AgentExecutorResponse, ctx: WorkflowContext[AgentExecutorRequest]
 ) -> None:
     """Transform spam detection response into a request for the email assistant."""
-    # Parse the detection result and extract the email content for the assistant
-    detection = DetectionResult.model_validate_json(response.agent_run_response.text)
+    # The detection result the edge condition parsed, to extract the email content for the assistant
+    detection = typed_value(response, DetectionResult)
 
     # Create a new request for the email assistant with the original email content
     request = AgentExecutorRequest(
@@ -109,21 +106,13 @@ async def to_email_assistant_request(
 
 # Create the AI agents:
 # Create agents
-# AzureCliCredential uses your current az login. This avoids embedding secrets in code.
-project_client = AIProjectClient(
-            endpoint=os.environ["AZURE_AI_PROJECT_ENDPOINT"],
-            credential=AzureCliCredential()
-        )
-chat_client=AzureAIAgentClient(
-                project_client=project_client, 
-                model_deployment_name=os.environ["AZURE_AI_MODEL_DEPLOYMENT_NAME"],
-                async_credential=AzureCliCredential()
-            )
+# One client per agent, all on the shared az login credential and connection pool. This avoids embedding
+# secrets in code.
 
 # Agent 1. Classifies spam and returns a DetectionResult object.
 # response_format enforces that the LLM returns parsable JSON for the Pydantic model.
 spam_detection_agent = AgentExecutor(
-    chat_client.create_agent(
+    agent_client().create_agent(
         instructions=(
             "You are a spam detection assistant that identifies spam emails. "
             "Always return JSON with fields is_spam (bool), reason (string), and email_content (string). "
@@ -136,7 +125,7 @@ spam_detection_agent = AgentExecutor(
 
 # Agent 2. Drafts a professional reply. Also uses structured JSON output for reliability.
 email_assistant_agent = AgentExecutor(
-    chat_client.create_agent(
+    agent_client().create_agent(
         instructions=(
             "You are an email assistant that helps users draft professional responses to emails. "
             "Your input might be a JSON object that includes 'email_content'; base your reply on that content. "
@@ -186,5 +175,5 @@ async def main():
     if outputs:
         print(f"Workflow output: {outputs[0]}")
 
-asyncio.run(main())
-
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -4,6 +4,7 @@
 
 import asyncio
 import os
+import sys
 from dataclasses import dataclass
 from typing import Literal
 from uuid import uuid4
@@ -20,14 +21,13 @@ from agent_framework import (
     WorkflowOutputEvent,
     executor,
 )
-from agent_framework.azure import AzureOpenAIChatClient
-from azure.identity import AzureCliCredential
 from pydantic import BaseModel
 from typing_extensions import Never
 from pathlib import Path
-from dotenv import load_dotenv
-from azure.ai.projects.aio import AIProjectClient
-from agent_framework.azure import AzureAIAgentClient
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "agents"))
+from bootstrap import agent_client, load_environment  # noqa: E402
+from typed_response import typed_value  # noqa: E402
 
 """
 Sample: Multi-Selection Edge Group for email triage and response.
@@ -52,10 +52,7 @@ Prerequisites:
 - Experience with shared state in workflows for persisting and reusing objects.
 """
 
-# Load .env file from the parent directory
-script_dir = Path(__file__).parent
-load_dotenv(script_dir.parent / "maf.env")
-print(f"Using endpoint: {os.environ['AZURE_AI_PROJECT_ENDPOINT']}")
+load_environment()
 
 EMAIL_STATE_PREFIX = "email:"
 CURRENT_EMAIL_ID_KEY = "current_email_id"
@@ -106,7 +103,7 @@ async def store_email(email_text: str, ctx: WorkflowContext[AgentExecutorRequest
 
 @executor(id="to_analysis_result")
 async def to_analysis_result(response: AgentExecutorResponse, ctx: WorkflowContext[AnalysisResult]) -> None:
-    parsed = AnalysisResultAgent.model_validate_json(response.agent_run_response.text)
+    parsed = typed_value(response, AnalysisResultAgent)
     email_id: str = await ctx.get_shared_state(CURRENT_EMAIL_ID_KEY)
     email: Email = await ctx.get_shared_state(f"{EMAIL_STATE_PREFIX}{email_id}")
     await ctx.send_message(
@@ -133,7 +130,7 @@ async def submit_to_email_assistant(analysis: AnalysisResult, ctx: WorkflowConte
 
 @executor(id="finalize_and_send")
 async def finalize_and_send(response: AgentExecutorResponse, ctx: WorkflowContext[Never, str]) -> None:
-    parsed = EmailResponse.model_validate_json(response.agent_run_response.text)
+    parsed = typed_value(response, EmailResponse)
     await ctx.yield_output(f"Email sent: {parsed.response}")
 
 
@@ -148,7 +145,7 @@ async def summarize_email(analysis: AnalysisResult, ctx: WorkflowContext[AgentEx
 
 @executor(id="merge_summary")
 async def merge_summary(response: AgentExecutorResponse, ctx: WorkflowContext[AnalysisResult]) -> None:
-    summary = EmailSummaryModel.model_validate_json(response.agent_run_response.text)
+    summary = typed_value(response, EmailSummaryModel)
     email_id: str = await ctx.get_shared_state(CURRENT_EMAIL_ID_KEY)
     email: Email = await ctx.get_shared_state(f"{EMAIL_STATE_PREFIX}{email_id}")
     # Build an AnalysisResult mirroring to_analysis_result but with summary
@@ -190,19 +187,9 @@ async def database_access(analysis: AnalysisResult, ctx: WorkflowContext[Never,
 
 
 async def main() -> None:
-    # Agents
-    project_client = AIProjectClient(
-            endpoint=os.environ["AZURE_AI_PROJECT_ENDPOINT"],
-            credential=AzureCliCredential()
-        )
-    chat_client=AzureAIAgentClient(
-                    project_client=project_client, 
-                    model_deployment_name=os.environ["AZURE_AI_MODEL_DEPLOYMENT_NAME"],
-                    async_credential=AzureCliCredential()
-                )
-
+    # Agents. Each gets its own client, all sharing the process's connection pool.
     email_analysis_agent = AgentExecutor(
-        chat_client.create_agent(
+        agent_client().create_agent(
             instructions=(
                 "You are a spam detection assistant that identifies spam emails. "
                 "Always return JSON with fields 'spam_decision' (one of NotSpam, Spam, Uncertain) "
@@ -214,7 +201,7 @@ async def main() -> None:
     )
 
     email_assistant_agent = AgentExecutor(
-        chat_client.create_agent(
+        agent_client().create_agent(
             instructions=(
                 "You are an email assistant that helps users draft responses to emails with professionalism."
             ),
@@ -224,7 +211,7 @@ async def main() -> None:
     )
 
     email_summary_agent = AgentExecutor(
-        chat_client.create_agent(
+        agent_client().create_agent(
             instructions=("You are an assistant that helps users summarize emails."),
             response_format=EmailSummaryModel,
         ),
@@ -2,6 +2,7 @@
 
 import asyncio
 import os
+import sys
 from dataclasses import dataclass
 from typing import Any, Literal
 from uuid import uuid4
@@ -18,19 +19,15 @@ from agent_framework import (  # Core chat primitives used to form LLM requests
     WorkflowContext,  # Per-run context and event bus
     executor,  # Decorator to turn a function into a workflow executor
 )
-from agent_framework.azure import AzureOpenAIChatClient  # Thin client for Azure OpenAI chat models
-from azure.identity import AzureCliCredential  # Uses your az CLI login for credentials
-from azure.ai.projects.aio import AIProjectClient
-from agent_framework.azure import AzureAIAgentClient
 from pydantic import BaseModel  # Structured outputs with validation
 from typing_extensions import Never
 from pathlib import Path
-from dotenv import load_dotenv
 
-# Load .env file from the parent directory
-script_dir = Path(__file__).parent
-load_dotenv(script_dir.parent / "maf.env")
-print(f"Using endpoint: {os.environ['AZURE_AI_PROJECT_ENDPOINT']}")
+sys.path.insert(0, str(Path(__file__).parent.parent / "agents"))
+from bootstrap import agent_client, load_environment  # noqa: E402
+from typed_response import typed_value  # noqa: E402
+
+load_environment()
 
 
 """
@@ -51,7 +48,8 @@ on that type.
 Prerequisites:
 - Familiarity with WorkflowBuilder, executors, edges, and events.
 - Understanding of switch-case edge groups and how Case and Default are evaluated in order.
-- Working Azure OpenAI configuration for AzureOpenAIChatClient, with Azure CLI login and required environment variables.
+- Working Azure AI project configuration for AzureAIAgentClient, with Azure CLI login and required environment
+  variables.
 - Access to workflow/resources/ambiguous_email.txt, or accept the inline fallback string.
 """
 
@@ -116,7 +114,7 @@ async def store_email(email_text: str, ctx: WorkflowContext[AgentExecutorRequest
 @executor(id="to_detection_result")
 async def to_detection_result(response: AgentExecutorResponse, ctx: WorkflowContext[DetectionResult]) -> None:
     # Parse the detector JSON into a typed model. Attach the current email id for downstream lookups.
-    parsed = DetectionResultAgent.model_validate_json(response.agent_run_response.text)
+    parsed = typed_value(response, DetectionResultAgent)
     email_id: str = await ctx.get_shared_state(CURRENT_EMAIL_ID_KEY)
     await ctx.send_message(DetectionResult(spam_decision=parsed.spam_decision, reason=parsed.reason, email_id=email_id))
 
@@ -137,7 +135,7 @@ async def submit_to_email_assistant(detection: DetectionResult, ctx: WorkflowCon
 @executor(id="finalize_and_send")
 async def finalize_and_send(response: AgentExecutorResponse, ctx: WorkflowContext[Never, str]) -> None:
     # Terminal step for the drafting branch. Yield the email response as output.
-    parsed = EmailResponse.model_validate_json(response.agent_run_response.text)
+    parsed = typed_value(response, EmailResponse)
     await ctx.yield_output(f"Email sent: {parsed.response}")
 
 
@@ -165,19 +163,10 @@ async def handle_uncertain(detection: DetectionResult, ctx: WorkflowContext[Neve
 async def main():
     """Main function to run the workflow."""
 
-    project_client = AIProjectClient(
-            endpoint=os.environ["AZURE_AI_PROJECT_ENDPOINT"],
-            credential=AzureCliCredential()
-        )
-    chat_client=AzureAIAgentClient(
-                    project_client=project_client, 
-                    model_deployment_name=os.environ["AZURE_AI_MODEL_DEPLOYMENT_NAME"],
-                    async_credential=AzureCliCredential()
-                )
-
-    # Agents. response_format enforces that the LLM returns JSON that Pydantic can validate.
+    # Agents, each with its own client on the process's connection pool.
+    # response_format enforces that the LLM returns JSON that Pydantic can validate.
     spam_detection_agent = AgentExecutor(
-        chat_client.create_agent(
+        agent_client().create_agent(
             instructions=(
                 "You are a spam detection assistant that identifies spam emails. "
                 "Be less confident in your assessments. "
@@ -190,7 +179,7 @@ async def main():
     )
 
     email_assistant_agent = AgentExecutor(
-        chat_client.create_agent(
+        agent_client().create_agent(
             instructions=(
                 "You are an email assistant that helps users draft responses to emails with professionalism."
             ),
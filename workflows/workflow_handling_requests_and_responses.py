@@ -3,6 +3,7 @@
 import asyncio
 from dataclasses import dataclass
 import os
+import sys
 
 from agent_framework import (
     AgentExecutor,  # Executor that runs the agent
@@ -21,13 +22,11 @@ from agent_framework import (
     RequestResponse,
     RequestInfoExecutor,
 )
-from agent_framework.azure import AzureOpenAIChatClient
-from azure.identity import AzureCliCredential
 from pydantic import BaseModel
 from pathlib import Path
-from dotenv import load_dotenv
-from azure.ai.projects.aio import AIProjectClient
-from agent_framework.azure import AzureAIAgentClient
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "agents"))
+from bootstrap import agent_client, load_environment  # noqa: E402
 
 """
 Sample: Human in the loop guessing game
@@ -46,8 +45,8 @@ Demonstrate:
 - Driving the loop in application code with run_stream and send_responses_streaming.
 
 Prerequisites:
-- Azure OpenAI configured for AzureOpenAIChatClient with required environment variables.
-- Authentication via azure-identity. Use AzureCliCredential and run az login before executing the sample.
+- Azure AI project configured for AzureAIAgentClient with required environment variables.
+- Authentication via azure-identity. Run az login first, the shared credential wraps AzureCliCredential.
 - Basic familiarity with WorkflowBuilder, executors, edges, events, and streaming runs.
 """
 
@@ -60,10 +59,7 @@ Prerequisites:
 # - The executor can then continue the workflow, e.g., by sending a new message to the agent.
 
 
-# Load .env file from the parent directory
-script_dir = Path(__file__).parent
-load_dotenv(script_dir.parent / "maf.env")
-print(f"Using endpoint: {os.environ['AZURE_AI_PROJECT_ENDPOINT']}")
+load_environment()
 
 @dataclass
 class HumanFeedbackRequest:
@@ -152,15 +148,7 @@ class TurnManager(Executor):
 async def main() -> None:
     # Create the chat agent and wrap it in an AgentExecutor.
     # response_format enforces that the model produces JSON compatible with GuessOutput.
-    project_client = AIProjectClient(
-            endpoint=os.environ["AZURE_AI_PROJECT_ENDPOINT"],
-            credential=AzureCliCredential()
-        )
-    chat_client=AzureAIAgentClient(
-                    project_client=project_client, 
-                    model_deployment_name=os.environ["AZURE_AI_MODEL_DEPLOYMENT_NAME"],
-                    async_credential=AzureCliCredential()
-    )
+    chat_client = agent_client()
     agent = chat_client.create_agent(
         instructions=(
             "You guess a number between 1 and 10. "